@@ -0,0 +1,99 @@
+"""
+Memory of the in-memory corpus representations, measured with tracemalloc:
+- the former uniqueness notebook: a list of dicts, attribute -> sha256 hex digest of the value (pickle),
+- the former cleaning notebook: per attribute, the set of the base64 hashes of its values,
+- CompactCorpus (fingerprint_analysis.corpus) with all the attributes and their values,
+- per attribute, the distinct value ids of the CompactCorpus.
+
+Usage (from data_analysis_scripts): python -m benchmarks.corpus_memory [PREPARE_DIR] [--files N]
+Without PREPARE_DIR, fingerprints are prepared from a synthetic corpus (benchmarks.synthetic).
+"""
+import gc
+import json
+import tracemalloc
+import argparse
+import numpy as np
+from benchmarks.synthetic import generate_corpus
+from benchmarks.hashing_benchmark import legacy_hash_value, legacy_hash_dict
+from fingerprint_preparation.preparation import preapre_fingerprint
+from fingerprint_analysis.columnar import DEVICE_ID_ATTRIBUTE, list_prepared_files, iter_prepared_fingerprints
+from fingerprint_analysis.corpus import CompactCorpus
+
+
+def load_fingerprints(prepare_dir, max_files):
+    """Prepared fingerprints as JSON text, like the files read by the notebooks."""
+    files = list_prepared_files(prepare_dir)[:max_files]
+    return [(filename, json.dumps(data)) for filename, data in iter_prepared_fingerprints(prepare_dir, files)]
+
+def generate_fingerprints(nb_devices, seed=0):
+    fingerprints = []
+    for archive_name, data in generate_corpus(nb_devices, 2, seed):
+        cleaned_data = preapre_fingerprint(data, archive_name)
+        if cleaned_data:
+            fingerprints.append((f"{archive_name.split('.')[0]}.json", json.dumps(cleaned_data)))
+    return fingerprints
+
+def measure(build, fingerprints):
+    """Bytes still allocated by the object build returns (and its build time peak)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build(fingerprints)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+def legacy_fingerprints(fingerprints):
+    rows = []
+    for _, text in fingerprints:
+        data = json.loads(text)
+        row = {attribute: legacy_hash_dict(value) for attribute, value in data.items()}
+        row["device_id"] = data.get(DEVICE_ID_ATTRIBUTE, "")
+        rows.append(row)
+    return rows
+
+def legacy_attribute_sets(fingerprints):
+    attribute_stats = {}
+    for _, text in fingerprints:
+        for key, value in json.loads(text).items():
+            if key not in attribute_stats:
+                attribute_stats[key] = {"coverage": 0, "values": set()}
+            attribute_stats[key]["coverage"] += 1
+            attribute_stats[key]["values"].add(legacy_hash_value(value))
+    return attribute_stats
+
+def compact_corpus(fingerprints):
+    corpus = CompactCorpus()
+    for filename, text in fingerprints:
+        corpus.add(filename, json.loads(text))
+    return corpus.compact()
+
+def compact_attribute_sets(fingerprints):
+    corpus = compact_corpus(fingerprints)
+    row_keys = np.frombuffer(corpus.row_keys, dtype=np.int32)
+    row_values = np.frombuffer(corpus.row_values, dtype=np.int32)
+    # Distinct (key id, value id) pairs, the value sets of every attribute
+    return np.unique(row_keys.astype(np.int64) << 32 | row_values)
+
+def run(fingerprints):
+    results = {
+        "list of dicts of hex digests": measure(legacy_fingerprints, fingerprints),
+        "CompactCorpus (with values)": measure(compact_corpus, fingerprints),
+        "attribute sets of base64 hashes": measure(legacy_attribute_sets, fingerprints),
+        "attribute value id sets": measure(compact_attribute_sets, fingerprints),
+    }
+    nb_values = sum(len(json.loads(text)) for _, text in fingerprints)
+    print(f"{len(fingerprints)} fingerprints, {nb_values} values")
+    for name, (current, peak) in results.items():
+        print(f"{name:34} {current / 1e6:9.2f} MB  ({current / len(fingerprints) / 1e3:7.2f} kB per fingerprint, peak {peak / 1e6:.2f} MB)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("prepare_dir", nargs="?")
+    parser.add_argument("--files", type=int, default=2000, help="number of prepared fingerprints to load")
+    parser.add_argument("--devices", type=int, default=500, help="number of generated devices")
+    args = parser.parse_args()
+    run(load_fingerprints(args.prepare_dir, args.files) if args.prepare_dir else generate_fingerprints(args.devices))
@@ -0,0 +1,92 @@
+"""
+Benchmark of the canonical value hashing against the pickle + sha256 functions of the notebooks.
+
+Usage (from data_analysis_scripts): python -m benchmarks.hashing_benchmark [PREPARE_DIR] [--files N]
+Without PREPARE_DIR, values are generated.
+"""
+import os
+import sys
+import json
+import time
+import random
+import pickle
+import hashlib
+import base64
+import argparse
+from fingerprint_analysis.hashing import hash_value, hash_dict, hash_values
+
+
+def legacy_hash_value(d, length=12):
+    h = hashlib.sha256(pickle.dumps(d)).digest()
+    return base64.urlsafe_b64encode(h).decode()[:length]
+
+def legacy_hash_dict(d):
+    return hashlib.sha256(pickle.dumps(d)).hexdigest()
+
+def load_values(prepare_dir, max_files):
+    """Every value of the first max_files prepared fingerprints."""
+    values = []
+    for filename in sorted(os.listdir(prepare_dir))[:max_files]:
+        if filename.endswith(".json"):
+            with open(os.path.join(prepare_dir, filename), 'r') as json_file:
+                values.extend(json.load(json_file).values())
+    return values
+
+def generate_values(count, seed=0):
+    """Mix of the value shapes of prepared fingerprints: scalars, lists of names and flattened dicts."""
+    rng = random.Random(seed)
+    # Like in a corpus, values repeat across fingerprints
+    words = [f"com.vendor{i}.app{i % 7}" for i in range(200)]
+    numbers = [rng.randint(0, 1 << 40) for _ in range(5000)]
+    values = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.45:
+            values.append(rng.choice(words))
+        elif kind < 0.65:
+            values.append(rng.choice(numbers))
+        elif kind < 0.7:
+            values.append(rng.random())
+        elif kind < 0.75:
+            values.append(rng.random() < 0.5)
+        elif kind < 0.9:
+            values.append(rng.sample(words, rng.randint(1, 40)))
+        else:
+            values.append({f"field{i}": rng.choice([rng.choice(words), rng.randint(0, 100), None]) for i in range(rng.randint(1, 15))})
+    return values
+
+def timed(function, values, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(values)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(values, repeat=5):
+    """Best time of every function over values, printed with the speedup over its legacy function."""
+    results = {
+        "legacy hash_value": timed(lambda vs: [legacy_hash_value(v) for v in vs], values, repeat),
+        "hash_value": timed(lambda vs: [hash_value(v) for v in vs], values, repeat),
+        "hash_values (batch)": timed(hash_values, values, repeat),
+        "legacy hash_dict": timed(lambda vs: [legacy_hash_dict(v) for v in vs], values, repeat),
+        "hash_dict": timed(lambda vs: [hash_dict(v) for v in vs], values, repeat),
+    }
+    print(f"{len(values)} values, best of {repeat}")
+    for name, seconds in results.items():
+        legacy = results["legacy hash_dict" if "dict" in name else "legacy hash_value"]
+        print(f"{name:22} {seconds * 1e3:9.1f} ms  {len(values) / seconds / 1e6:6.2f} M values/s  x{legacy / seconds:.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("prepare_dir", nargs="?")
+    parser.add_argument("--files", type=int, default=200, help="number of prepared fingerprints to load")
+    parser.add_argument("--values", type=int, default=200000, help="number of generated values")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    values = load_values(args.prepare_dir, args.files) if args.prepare_dir else generate_values(args.values)
+    if not values:
+        sys.exit("No values to hash")
+    run(values, args.repeat)
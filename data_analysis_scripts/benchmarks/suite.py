@@ -0,0 +1,169 @@
+"""
+Benchmark suite of the preparation and analysis steps, on a synthetic corpus (benchmarks.synthetic).
+
+Times ShellAttributeParser.parse for every shell attribute, SdkAttributeParser.parse, CpAttributeParser.parse,
+preapre_fingerprint, the cleaning statistics and the greedy uniqueness search (best of --repeat runs).
+Results are compared with a baseline file recorded by an earlier run with --save-baseline: the run fails
+(exit code 1) if a benchmark is slower than its baseline by more than --threshold. Baselines are only
+comparable on the same machine and with the same corpus options.
+
+Usage (from data_analysis_scripts): python -m benchmarks.suite [--baseline FILE] [--save-baseline] [--threshold 0.2]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+from benchmarks.synthetic import generate_corpus
+from fingerprint_parser.shell_attributes_parser import ShellAttributeParser
+from fingerprint_parser.sdk_attributes_parser import SdkAttributeParser
+from fingerprint_parser.cp_attributes_parser import CpAttributeParser
+from fingerprint_preparation.preparation import preapre_fingerprint
+from fingerprint_preparation.record_store import RecordStoreWriter
+from fingerprint_analysis.columnar import build_attribute_matrix
+from fingerprint_analysis.cleaning_stats import CleaningStatsAccumulator
+from fingerprint_analysis.uniqueness import UniquenessSearch
+
+BASELINE_FILE = "benchmark_baseline.json"
+THRESHOLD = 0.2
+# Benchmarks faster than this are too noisy to fail a run
+MIN_TIME = 1e-3
+
+
+def raw_items(data):
+    return [(key, value) for item in data for key, value in item.items()]
+
+def timed(function, repeat):
+    """Best time of function over repeat runs. The SDK parser cache is cleared before every run."""
+    best = float('inf')
+    for _ in range(repeat):
+        SdkAttributeParser.cache_clear()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def parse_attributes(parse, attributes):
+    for key, value in attributes:
+        parse(key, value)
+
+def benchmarks(corpus, work_dir, nb_attributes=5):
+    """name -> function of every benchmark over corpus, the list of (archive name, data.json content)."""
+    items = [(name, raw_items(data)) for name, data in corpus]
+    timestamps = [int(name.split("_")[1].split(".")[0]) for name, _ in corpus]
+    shell = {key: [] for key in ShellAttributeParser.SHELL_ATTRIBUTES}
+    sdk = []
+    cp = []
+    for _, attributes in items:
+        for key, value in attributes:
+            if ShellAttributeParser.isShellAttribute(key):
+                shell[key].append(value)
+            elif SdkAttributeParser.isSdkAttribute(key):
+                sdk.append((key, value))
+            elif CpAttributeParser.isCpAttribute(key):
+                cp.append((key, value))
+
+    def parse_shell(key):
+        values = shell[key]
+        return lambda: [ShellAttributeParser.parse(key, value, timestamp) for value, timestamp in zip(values, timestamps)]
+
+    prepared = [(f"{name.split('.')[0]}.json", preapre_fingerprint(data, name)) for name, data in corpus]
+    prepared = [(filename, data) for filename, data in prepared if data]
+    # Steps of the cleaning notebook: every fingerprint selected, the devices with several ones for the stability
+    device_files = {}
+    for filename, data in prepared:
+        device_files.setdefault(data["content://settings/secure.android_id"], []).append(filename)
+    selected = [filename for filename, _ in prepared]
+
+    def cleaning():
+        accumulator = CleaningStatsAccumulator(selected, device_files)
+        for filename, data in prepared:
+            accumulator.add(filename, data)
+        accumulator.write_csvs(work_dir)
+
+    with RecordStoreWriter(os.path.join(work_dir, "prepared")) as store:
+        for filename, data in prepared:
+            store.write(filename, data)
+    matrix = build_attribute_matrix(os.path.join(work_dir, "prepared"), os.path.join(work_dir, "matrix"), report_every=0)
+    attributes = [attribute for attribute in matrix.attributes if attribute not in ("uuid", "timestamp")]
+    codes = matrix.matrix(attributes)
+
+    functions = {f"shell.{key}": parse_shell(key) for key in ShellAttributeParser.SHELL_ATTRIBUTES}
+    functions["sdk.parse"] = lambda: parse_attributes(SdkAttributeParser.parse, sdk)
+    functions["cp.parse"] = lambda: parse_attributes(CpAttributeParser.parse, cp)
+    functions["preapre_fingerprint"] = lambda: [preapre_fingerprint(data, name) for name, data in corpus]
+    functions["cleaning"] = cleaning
+    functions["uniqueness.greedy"] = lambda: UniquenessSearch(codes, attributes).greedy(nb_attributes, verbose=False)
+    return functions
+
+def run(functions, repeat=5, only=None):
+    """Best time of every benchmark (those whose name starts with only if it is given)."""
+    results = {}
+    for name, function in functions.items():
+        if only is None or name.startswith(only):
+            results[name] = timed(function, repeat)
+    return results
+
+def load_baseline(path):
+    with open(path, 'r') as baseline_file:
+        return json.load(baseline_file)
+
+def save_baseline(path, config, results):
+    with open(path, 'w') as baseline_file:
+        json.dump({"config": config, "results": results}, baseline_file, indent=4)
+
+def regressions(results, baseline_results, threshold=THRESHOLD, min_time=MIN_TIME):
+    """name -> (baseline, time) of the benchmarks slower than their baseline by more than threshold."""
+    return {
+        name: (baseline_results[name], seconds) for name, seconds in results.items()
+        if name in baseline_results and max(seconds, baseline_results[name]) >= min_time
+        and seconds > baseline_results[name] * (1 + threshold)
+    }
+
+def report(results, baseline_results=None):
+    baseline_results = baseline_results or {}
+    for name, seconds in results.items():
+        line = f"{name:32} {seconds * 1e3:10.2f} ms"
+        if name in baseline_results and baseline_results[name] > 0:
+            line += f"  baseline {baseline_results[name] * 1e3:10.2f} ms  x{seconds / baseline_results[name]:.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--fingerprints", type=int, default=3, help="maximal number of fingerprints per device")
+    parser.add_argument("--scale", type=float, default=1.0, help="size multiplier of the large values")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="run the benchmarks whose name starts with this prefix")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="record the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown over the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    config = {"devices": args.devices, "fingerprints": args.fingerprints, "scale": args.scale, "seed": args.seed}
+    corpus = list(generate_corpus(args.devices, args.fingerprints, args.seed, args.scale))
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run(benchmarks(corpus, work_dir), args.repeat, args.only)
+
+    baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) else None
+    if baseline is not None and baseline["config"] != config:
+        print(f"Baseline {args.baseline} was recorded with {baseline['config']}, not compared")
+        baseline = None
+    print(f"{len(corpus)} fingerprints, best of {args.repeat}")
+    report(results, baseline["results"] if baseline else None)
+
+    if args.save_baseline:
+        if baseline is not None and args.only:
+            # Keep the baseline of the benchmarks that did not run
+            results = {**baseline["results"], **results}
+        save_baseline(args.baseline, config, results)
+        print(f"Baseline saved to {args.baseline}")
+    elif baseline is not None:
+        slower = regressions(results, baseline["results"], args.threshold)
+        for name, (before, after) in slower.items():
+            print(f"REGRESSION {name}: {before * 1e3:.2f} ms -> {after * 1e3:.2f} ms")
+        if slower:
+            sys.exit(1)
@@ -0,0 +1,269 @@
+"""
+Seeded generator of synthetic raw fingerprints (data.json payloads), for benchmarks and tests without production data.
+
+Every fingerprint has all ShellAttributeParser.SHELL_ATTRIBUTES in the shape of the real command outputs,
+SDK reflection values (numbers, booleans, toString() of objects and arrays, lists of *Info{...}, nested dicts)
+and the rows of CpAttributeParser.SETTINGS_CP_ATTRIBUTES. Devices keep their identity values across their
+fingerprints while logs, uptime and running processes change. `scale` multiplies the size of the large
+values (logs, dumpsys, getprop, packages and SDK attributes).
+
+Usage (from data_analysis_scripts): python -m benchmarks.synthetic OUTPUT_DIR [--devices N] [--fingerprints N] [--scale S]
+writes OUTPUT_DIR/fingerprints/<uuid>_<timestamp>.zip archives like the collected ones.
+"""
+import os
+import json
+import random
+import zipfile
+import argparse
+from fingerprint_parser.shell_attributes_parser import ShellAttributeParser
+from fingerprint_parser.cp_attributes_parser import CpAttributeParser
+
+MODELS = [
+    ("Google", "Pixel 5", "redfin", "qcom"), ("Samsung", "SM-G991B", "o1s", "exynos2100"),
+    ("Xiaomi", "M2007J20CG", "surya", "qcom"), ("OnePlus", "IN2013", "OnePlus8", "qcom"),
+    ("Huawei", "ELE-L29", "HWELE", "kirin980"), ("Motorola", "moto g(8)", "rav", "qcom"),
+]
+EMULATORS = [("Genymotion", "Android SDK built for x86", "vbox86p", "vbox86")]
+PACKAGES = [
+    "com.android.chrome", "com.google.android.gms", "com.whatsapp", "com.facebook.katana", "org.telegram.messenger",
+    "com.spotify.music", "com.instagram.android", "com.google.android.youtube", "com.android.vending", "com.twitter.android",
+    "com.netflix.mediaclient", "com.microsoft.teams", "com.ubercab", "com.amazon.mShop.android.shopping", "org.mozilla.firefox",
+]
+SERVICES = ["activity", "package", "window", "input", "power", "wifi", "location", "audio", "telephony.registry", "bluetooth_manager"]
+TYPEFACES = ["Roboto-Regular.ttf", "Roboto-Bold.ttf", "NotoSansCJK-Regular.ttc", "NotoColorEmoji.ttf", "DroidSansMono.ttf", "CarroisGothicSC-Regular.ttf"]
+RINGTONES = ["Atria.ogg", "Callisto.ogg", "Dione.ogg", "Ganymede.ogg", "Luna.ogg", "Oberon.ogg", "Phobos.ogg", "Titania.ogg"]
+SDK_CLASSES = ["android.os.Build", "android.os.Build.VERSION", "android.provider.Settings.Secure", "android.view.Display",
+               "android.telephony.TelephonyManager", "android.net.wifi.WifiManager", "android.content.pm.PackageManager",
+               "android.app.ActivityManager", "android.media.AudioManager", "android.hardware.SensorManager"]
+SKIPPED_VALUES = ["ERR", "NULL", "UNDEFINED", ""]
+
+
+def device_profile(device_index, seed=0, emulator_rate=0.05):
+    """Values of a device that do not change between its fingerprints."""
+    rng = random.Random(f"{seed}-device-{device_index}")
+    manufacturer, model, device, hardware = rng.choice(EMULATORS if rng.random() < emulator_rate else MODELS)
+    return {
+        "uuid": f"{rng.getrandbits(64):016x}",
+        "android_id": f"{rng.getrandbits(64):016x}",
+        "manufacturer": manufacturer,
+        "model": model,
+        "device": device,
+        "hardware": hardware,
+        "sdk_int": rng.randint(26, 34),
+        "kernel": f"4.{rng.choice([9, 14, 19])}.{rng.randint(100, 250)}",
+        "memory_kb": rng.choice([2, 3, 4, 6, 8, 12]) * 1024 * 1024 - rng.randint(0, 200000),
+        "swap_kb": rng.choice([0, 1048572, 2097148]),
+        "nproc": rng.choice([4, 6, 8]),
+        "ip": f"192.168.{rng.randint(0, 10)}.{rng.randint(2, 254)}",
+        "mac": ":".join(f"{rng.getrandbits(8):02x}" for _ in range(6)),
+        "packages": rng.sample(PACKAGES, rng.randint(3, len(PACKAGES))),
+        "typefaces": rng.sample(TYPEFACES, rng.randint(2, len(TYPEFACES))),
+        "ringtones": rng.sample(RINGTONES, rng.randint(2, len(RINGTONES))),
+        "timezone": rng.choice(["Europe/Paris", "America/New_York", "Asia/Tokyo", "UTC"]),
+        "developer_mode": rng.random() < 0.2,
+        "rooted": rng.random() < 0.05,
+    }
+
+def listing(rng, names, with_total=True):
+    lines = [f"total {len(names) * 8}"] if with_total else []
+    for name in names:
+        lines.append(f"-rw-r--r-- 1 root root {rng.randint(1000, 10 ** 7)} 2009-01-01 08:00 {name}")
+    return lines
+
+def log_lines(rng, profile, nb_lines):
+    lines = [
+        f"[    0.000000] Linux version {profile['kernel']} (builder@build-{rng.randint(1, 99)}) (gcc version 4.9.x 20150123 (prerelease)) #1 SMP PREEMPT Mon Jan 4 12:00:00 UTC 2021",
+        f"[    0.000000] Command line: console=ttyMSM0,115200n8 androidboot.hardware={profile['hardware']}",
+        f"[    0.000000] KERNEL supported cpus:",
+        "[    0.000000]   Intel GenuineIntel",
+        "[    0.000000]   AMD AuthenticAMD",
+        "[    0.000000] Linux perf events: enabled",
+    ]
+    if profile["manufacturer"] == "Genymotion":
+        lines.append("[    0.000000] Hypervisor detected: KVM")
+    messages = ["binder: release proc", "healthd: battery l=80 v=4123 t=31.0", "wlan: connected", "audit: type=1400 avc: denied",
+                "lowmemorykiller: Killing 'com.app'", f"usb 1-1: Product: {profile['model']}", f"usb 1-1: Manufacturer: {profile['manufacturer']}"]
+    for i in range(nb_lines):
+        lines.append(f"[{rng.uniform(1, 100000):12.6f}] {rng.choice(messages)} {i}")
+    return lines
+
+def shell_values(rng, profile, scale):
+    """Raw output lines of every shell attribute."""
+    memory_mb = profile["memory_kb"] // 1024
+    cpu_lines = []
+    for processor in range(profile["nproc"]):
+        cpu_lines += [f"processor\t: {processor}", "BogoMIPS\t: 38.40", "Features\t: fp asimd evtstrm aes pmull sha1 sha2 crc32",
+                      "CPU implementer\t: 0x51", "CPU architecture: 8", "CPU variant\t: 0xd", f"CPU part\t: 0x{rng.choice(['804', '805']) if processor > 3 else '805'}",
+                      "CPU revision\t: 14", ""]
+    cpu_lines.append(f"Hardware\t: Qualcomm Technologies, Inc {profile['hardware'].upper()}")
+    getprop = [f"[ro.product.model]: [{profile['model']}]", f"[ro.product.manufacturer]: [{profile['manufacturer']}]",
+               f"[ro.product.device]: [{profile['device']}]", f"[ro.build.version.sdk]: [{profile['sdk_int']}]",
+               f"[persist.sys.timezone]: [{profile['timezone']}]", "[ro.secure]: [1]", "[dalvik.vm.heapsize]: [512m]",
+               "[ro.product.cpu.abilist]: [arm64-v8a,armeabi-v7a,armeabi]"]
+    getprop += [f"[ro.vendor.prop{i}]: [{i * 7 % 13}]" for i in range(int(200 * scale))]
+    uptime_days = rng.randint(0, 30)
+    values = {
+        "memory_information": ["              total        used        free      shared  buff/cache   available",
+                               f"Mem:           {memory_mb}        {memory_mb // 2}         {memory_mb // 8}          10        {memory_mb // 4}        {memory_mb // 3}",
+                               f"Swap:          {profile['swap_kb'] // 1024}           0        {profile['swap_kb'] // 1024}"],
+        "meminfo": [f"MemTotal:        {profile['memory_kb']} kB", f"MemFree:          {rng.randint(10000, 500000)} kB",
+                    f"MemAvailable:    {rng.randint(500000, 2000000)} kB", "Buffers:            5000 kB", "Cached:          900000 kB",
+                    f"SwapCached:            0 kB", f"SwapTotal:       {profile['swap_kb']} kB", f"SwapFree:        {profile['swap_kb']} kB"],
+        "cpuinfo": cpu_lines,
+        "getprop": getprop,
+        "acpi_battery": [f"Battery 0: Discharging, {rng.randint(5, 100)}%", "Adapter 0: off-line", f"Thermal 0: ok, {rng.uniform(25, 45):.1f} degrees C", "Cooling 0: Processor 0 of 3"],
+        "df": ["Filesystem            1K-blocks    Used Available Use% Mounted on",
+               "/dev/root               3030800 2874356    140060  96% /",
+               "tmpfs                   1894060    1196   1892864   1% /dev",
+               "/dev/block/dm-5       114576084 3645668 110799344   4% /data"],
+        "network_interfaces": [f"wlan0     Link encap:Ethernet  HWaddr {profile['mac']}  Driver icnss",
+                               f"          inet addr:{profile['ip']}  Bcast:192.168.1.255  Mask:255.255.255.0 ",
+                               "          UP BROADCAST RUNNING MULTICAST  MTU:1500  Metric:1",
+                               f"          RX packets:{rng.randint(1000, 99999)} errors:0 dropped:0 overruns:0 frame:0 ",
+                               "",
+                               "lo        Link encap:Local Loopback  ",
+                               "          inet addr:127.0.0.1  Mask:255.0.0.0 ",
+                               "          UP LOOPBACK RUNNING  MTU:65536  Metric:1",
+                               ""],
+        "netstat": ["Active Internet connections (w/o servers)",
+                    "Proto Recv-Q Send-Q Local Address           Foreign Address         State"]
+                   + [f"tcp        0      0 {profile['ip']}:{rng.randint(30000, 60000)}      142.250.{rng.randint(0, 255)}.{rng.randint(1, 254)}:443         ESTABLISHED" for _ in range(rng.randint(1, 6))]
+                   + ["Active UNIX domain sockets (w/o servers)", "Proto RefCnt Flags       Type       State         I-Node Path"],
+        "dumpsys": ["Currently running services:"] + [f"  {service}" for service in rng.sample(SERVICES, rng.randint(3, len(SERVICES)))]
+                   + ["-" * 77] + [f"DUMP OF SERVICE {service}:" for service in SERVICES] * max(1, int(20 * scale)),
+        "dmesg_first_1000_lines": log_lines(rng, profile, int(300 * scale)),
+        "dmesg_last_1000_lines": log_lines(rng, profile, int(300 * scale)),
+        "system_logs": log_lines(rng, profile, int(1000 * scale)),
+        "system_uptime": [f" {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} up {uptime_days} days,  {rng.randint(0, 23)}:{rng.randint(10, 59):02d},  0 users,  load average: 1.00, 0.90, 0.80"],
+        "system_root_structure": listing(rng, ["acct", "apex", "bin", "cache", "config", "d", "data", "dev", "etc", "mnt", "odm", "proc", "product", "sdcard", "storage", "sys", "system", "vendor"]),
+        "system_typefaces": listing(rng, profile["typefaces"]),
+        "ringtones_list": listing(rng, profile["ringtones"]),
+        "ringtones_list_ext": listing(rng, profile["ringtones"][:2]),
+        "kernel_information": [f"Linux localhost {profile['kernel']}-perf+ #1 SMP PREEMPT Mon Jan 4 12:00:00 UTC 2021 {'x86_64' if profile['manufacturer'] == 'Genymotion' else 'aarch64'}"],
+        "nproc": [str(profile["nproc"])],
+        "hostname": ["localhost"],
+        "user_accounts": ["root:x:0:0::/:/system/bin/sh", "shell:x:2000:2000::/:/system/bin/sh"],
+        "groups": ["u0_a123 inet everybody"],
+        "arp_cache": ["IP address       HW type     Flags       HW address            Mask     Device",
+                      f"192.168.1.1      0x1         0x2         {profile['mac']}     *        wlan0"],
+        "getprop_net_dns1": ["8.8.8.8"],
+        "getprop_net_dns2": ["8.8.4.4"],
+        "getprop_net_dns3": [rng.choice(SKIPPED_VALUES)],
+        "getprop_net_dns4": [""],
+        "installed_packages": [f"package:{package}" for package in profile["packages"]],
+        "running_processes": [f"u0_a{rng.randint(10, 300)}  {rng.randint(1000, 30000)}  {package}" for package in profile["packages"]],
+    }
+    # Commands only checked for execution
+    for key in ShellAttributeParser.IGNORED_SHELL_ATTRIBUTES:
+        values.setdefault(key, [f"{key} output line {i}" for i in range(rng.randint(1, 5))])
+    return {key: values.get(key, [f"{key} output"]) for key in ShellAttributeParser.SHELL_ATTRIBUTES}
+
+def sdk_values(rng, profile, scale):
+    """Raw values of the SDK reflection attributes."""
+    values = {
+        "android.os.Build.MANUFACTURER": profile["manufacturer"],
+        "android.os.Build.MODEL": profile["model"],
+        "android.os.Build.DEVICE": profile["device"],
+        "android.os.Build.HARDWARE": profile["hardware"],
+        "android.os.Build.PRODUCT": profile["device"],
+        "android.os.Build.BOARD": profile["hardware"],
+        "android.os.Build.BRAND": profile["manufacturer"].lower(),
+        "android.os.Build.FINGERPRINT": f"{profile['manufacturer'].lower()}/{profile['device']}/{profile['device']}:11/RQ3A/7:user/release-keys",
+        "android.os.Build.VERSION.SDK_INT": str(profile["sdk_int"]),
+        "android.os.Build.VERSION.RELEASE": str(profile["sdk_int"] - 19),
+        "android.provider.Settings.Secure.ANDROID_ID": profile["android_id"],
+        "android.app.ActivityManager.isLowRamDevice": "false",
+        "android.view.Display.getRefreshRate": "60.0",
+        "android.content.pm.PackageManager.getInstalledPackages": [f"PackageInfo{{{rng.getrandbits(28):x} {package}}}" for package in profile["packages"]],
+        "android.content.pm.PackageManager.getSystemSharedLibraryNames": ["android.test.base", "android.test.mock", "com.android.location.provider"],
+        "android.hardware.SensorManager.getSensorList": [f"{{Sensor name=\"{name}\", vendor=\"Qualcomm\", version=1, type={i}}}" for i, name in enumerate(["Accelerometer", "Gyroscope", "Light", "Proximity"])],
+        "android.accounts.AccountManager.getAccounts": ["Account {name=user@example.com, type=com.google}"],
+        "android.content.ClipboardManager.getText": "secret",
+        "android.media.AudioManager.getDevices": {"speaker": "2", "earpiece": "1", "usb": ["UsbInfo{a1 usb.audio}", "UsbInfo{b2 usb.midi}"]},
+        "java.lang.Thread.getStackTrace": ["dalvik.system.VMStack.getThreadStackTrace(Native Method)"],
+    }
+    # Reflection results of the other getters: toString() of objects and arrays, numbers, booleans and skipped values
+    for i in range(int(400 * scale)):
+        class_name = SDK_CLASSES[i % len(SDK_CLASSES)]
+        kind = i % 8
+        if kind == 0:
+            value = f"{class_name}@{rng.getrandbits(28):x}"
+        elif kind == 1:
+            value = f"[Ljava.lang.String;@{rng.getrandbits(28):x}"
+        elif kind == 2:
+            value = str((i * 31) % 1000)
+        elif kind == 3:
+            value = rng.choice(["true", "false"]) if i % 3 else "true"
+        elif kind == 4:
+            value = f"{(i % 17) / 4}"
+        elif kind == 5:
+            value = [f"ServiceInfo{{{rng.getrandbits(28):x} {rng.choice(PACKAGES)}.Service{j}}}" for j in range(3)]
+        elif kind == 6:
+            value = SKIPPED_VALUES[i % len(SKIPPED_VALUES)]
+        else:
+            value = {"width": str(1080 + i % 3), "height": "2340", "flags": ["FLAG_SECURE", "FLAG_SUPPORTS_PROTECTED_BUFFERS"]}
+        values[f"{class_name}.get{i}"] = value
+    return values
+
+def cp_values(rng, profile):
+    """Rows of the settings content providers and markers of the other ones."""
+    rows = {
+        "content://settings/secure": [{"name": "android_id", "value": profile["android_id"]}, {"name": "default_input_method", "value": "com.google.android.inputmethod.latin/.LatinIME"}, {"name": "location_mode", "value": "3"}],
+        "content://settings/global": [{"name": "adb_enabled", "value": "1" if profile["developer_mode"] else "0"}, {"name": "auto_time", "value": "1"}, {"name": "development_settings_enabled", "value": "1" if profile["developer_mode"] else "0"}],
+        "content://settings/system": [{"name": "screen_brightness", "value": str(rng.randint(10, 255))}, {"name": "time_12_24", "value": rng.choice(["12", "24"])}, {"name": "font_scale", "value": "1.0"}],
+        "content://settings/system/ringtone": [{"name": "ringtone", "value": f"content://media/internal/audio/media/{rng.randint(1, 50)}"}],
+        "content://settings/system/alarm_alert": [{"name": "alarm_alert", "value": "content://media/internal/audio/media/12"}],
+        "content://settings/system/notification_sound": [{"name": "notification_sound", "value": "content://media/internal/audio/media/7"}],
+        "content://com.android.contacts/contacts": ["1 row"],
+        "content://sms/inbox": "ERR",
+    }
+    assert set(CpAttributeParser.SETTINGS_CP_ATTRIBUTES) <= set(rows)
+    return rows
+
+def generate_fingerprint(profile, timestamp, seed=0, scale=1.0):
+    """Raw data.json content of one fingerprint of a device: a list of single key dicts."""
+    rng = random.Random(f"{seed}-{profile['uuid']}-{timestamp}")
+    values = {}
+    values.update(sdk_values(rng, profile, scale))
+    values.update(shell_values(rng, profile, scale))
+    values.update(cp_values(rng, profile))
+    values["isDeviceRooted"] = profile["rooted"]
+    values["isDeveloperModeEnabled"] = int(profile["developer_mode"])
+    values["execution_time"] = rng.randint(2000, 20000)
+    items = [{key: value} for key, value in values.items()]
+    rng.shuffle(items)
+    return items
+
+def generate_corpus(nb_devices, fingerprints_per_device=2, seed=0, scale=1.0, start_timestamp=1700000000000):
+    """Yields (archive name, data.json content) of nb_devices devices, with 1 to fingerprints_per_device fingerprints each."""
+    rng = random.Random(seed)
+    for device_index in range(nb_devices):
+        profile = device_profile(device_index, seed)
+        timestamp = start_timestamp + rng.randint(0, 10 ** 9)
+        for _ in range(rng.randint(1, fingerprints_per_device)):
+            yield f"{profile['uuid']}_{timestamp}.zip", generate_fingerprint(profile, timestamp, seed, scale)
+            timestamp += rng.randint(3600, 30 * 86400) * 1000
+
+def write_corpus(output_dir, nb_devices, fingerprints_per_device=2, seed=0, scale=1.0):
+    """Write the archives of a synthetic corpus into output_dir/fingerprints, returns their paths."""
+    fingerprints_dir = os.path.join(output_dir, "fingerprints")
+    os.makedirs(fingerprints_dir, exist_ok=True)
+    paths = []
+    for archive_name, data in generate_corpus(nb_devices, fingerprints_per_device, seed, scale):
+        path = os.path.join(fingerprints_dir, archive_name)
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("data.json", json.dumps(data))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dir")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--fingerprints", type=int, default=2, help="maximal number of fingerprints per device")
+    parser.add_argument("--scale", type=float, default=1.0, help="size multiplier of the large values")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    paths = write_corpus(args.output_dir, args.devices, args.fingerprints, args.seed, args.scale)
+    print(f"{len(paths)} archives written to {os.path.join(args.output_dir, 'fingerprints')}")
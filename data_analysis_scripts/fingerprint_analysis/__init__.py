@@ -0,0 +1,11 @@
+from fingerprint_analysis.hashing import hash_value, hash_dict, hash_values, hash_dicts
+from fingerprint_analysis.columnar import AttributeMatrix, build_attribute_matrix, load_attribute_matrix
+from fingerprint_analysis.uniqueness import UniquenessSearch, greedy_uniqueness_search
+from fingerprint_analysis.redundancy import find_redundant_attributes, remove_redundant_attributes, find_near_redundant_attributes
+from fingerprint_analysis.combination_search import CombinationSearch, combination_search
+from fingerprint_analysis.cleaning_stats import CleaningStatsAccumulator, ApproximateCleaningStats, accumulate_cleaning_stats, compute_cleaning_stats
+from fingerprint_analysis.incremental_stats import IncrementalCleaningStats
+from fingerprint_analysis.matching import FingerprintIndex, build_fingerprint_index, load_attribute_weights
+from fingerprint_analysis.corpus import CompactCorpus, load_compact_corpus
+from fingerprint_analysis.sketches import AttributeSketch, HyperLogLog, MisraGries, BottomK
+from fingerprint_analysis.stability import DeviceTimeline, sliding_window_stability
@@ -0,0 +1,360 @@
+import os
+import abc
+import csv
+import json
+import math
+from fingerprint_analysis.columnar import DEVICE_ID_ATTRIBUTE, iter_prepared_fingerprints
+from fingerprint_analysis.hashing import hash_value
+from fingerprint_analysis.sketches import HLL_PRECISION, HEAVY_HITTERS, SAMPLE_SIZE, AttributeSketch, sketch_hash
+
+ALL_CLEANED_CSV = "all_cleaned_attributes.csv"
+STABILITY_CSV = "stability_cleaned_attributes.csv"
+STABLE_ENTROPIES_CSV = "top_cleaned_stable_attribute_entropies.csv"
+ALL_STABLE_ENTROPIES_CSV = "top_cleaned_all_stable_attribute_entropies.csv"
+# Minimal normalized entropy of the attributes kept in each entropy file
+STABLE_MIN_ENTROPY = 0.5
+ALL_STABLE_MIN_ENTROPY = 0.1
+
+
+def compute_entropy(values, total_devices):
+    """Computes Shannon entropy and normalized entropy."""
+    entropy = -sum((count / total_devices) * math.log2(count / total_devices) for count in values.values() if count > 0)
+    max_entropy = math.log2(total_devices)
+    normalized_entropy = entropy / max_entropy if max_entropy > 0 else 0
+    return entropy, normalized_entropy
+
+def compute_unique_values(values):
+    return sum(1 for _,v in values.items() if v == 1)
+
+def remove_redudants_from_attribute_stats(attribute_stats):
+    """
+    Keep a single attribute of every group of attributes having the same values and distribution:
+    the first one in the order of attribute_stats, like remove_redundant_attributes.
+    """
+    seen = set()
+    filtered = {}
+    for attribute, info in attribute_stats.items():
+        hashed_info = hash_value(info)
+        if hashed_info not in seen:
+            seen.add(hashed_info)
+            filtered[attribute] = info
+    return filtered
+
+def write_entropies_csv(file_path, attribute_stats, total_devices, min_normalized_entropy):
+    """Writes the entropies of the attributes having at least min_normalized_entropy."""
+    with open(file_path, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["Attribute", "Cardinality", "Unique Values","Coverage", "Shannon Entropy", "Normalized Entropy"])
+
+        for attribute, info in attribute_stats.items():
+            cardinality = len(info["values"])
+            coverage = info["coverage"]
+            unique_values = compute_unique_values(info["values"])
+
+            entropy, normalized_entropy = compute_entropy(info["values"], total_devices)
+            if normalized_entropy >= min_normalized_entropy:
+                writer.writerow([attribute, cardinality, unique_values, coverage, entropy, normalized_entropy])
+
+
+class ValueCounts(dict):
+    """Value hash -> count, counted with add like the value sets and sketches."""
+    def add(self, value_hash):
+        self[value_hash] = self.get(value_hash, 0) + 1
+
+
+class CleaningStats(abc.ABC):
+    """
+    Attribute filters of the cleaning steps and their CSV files, over statistics kept by subclasses:
+    - total_fingerprints and attributes_stats: coverage and values of every attribute over all fingerprints,
+    - attribute_changes(): value changes of the attributes on the devices having several fingerprints,
+    - device_ids and distributions: value counts of every attribute over one fingerprint per device.
+    """
+    def cleaned_attributes(self):
+        """Step 2: attributes that are neither fixed nor different in every fingerprint."""
+        return [
+            attribute for attribute, info in self.attributes_stats.items()
+            if 1 < len(info["values"]) < self.total_fingerprints
+        ]
+
+    @abc.abstractmethod
+    def attribute_changes(self, attributes):
+        """
+        Step 3: attribute -> Change_values_Count, Change_devices_Count, Fingerprint_Count and Devices_count
+        of attributes, over the devices having several fingerprints.
+        """
+
+    def attribute_distributions(self, attributes):
+        """Steps 4 and 6: distributions of attributes over the selected fingerprints, without redundant ones."""
+        return remove_redudants_from_attribute_stats({
+            attribute: self.distributions[attribute] for attribute in attributes if attribute in self.distributions
+        })
+
+    def write_entropies(self, file_path, attribute_stats, total_devices, min_normalized_entropy):
+        write_entropies_csv(file_path, attribute_stats, total_devices, min_normalized_entropy)
+
+    def write_csvs(self, output_dir="."):
+        """Writes the files of every step, returns the kept attributes of both entropy files."""
+        cleaned_attributes = self.cleaned_attributes()
+        with open(os.path.join(output_dir, ALL_CLEANED_CSV), mode='w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["Attribute", "Cardinality", "Coverage Fingerprints"])
+            for attribute in cleaned_attributes:
+                info = self.attributes_stats[attribute]
+                writer.writerow([attribute, len(info["values"]), info["coverage"]])
+
+        changes = self.attribute_changes(cleaned_attributes)
+        stable_attributes = []
+        all_stable_attributes = []
+        with open(os.path.join(output_dir, STABILITY_CSV), mode='w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["Attribute", "Total Value Changes", "Total Device Changes","Coverage Fingerprints", "Coverage Devices", "IsStable", "IsAllStable"])
+            for attribute, info in changes.items():
+                stable = info["Change_devices_Count"] < info["Devices_count"]
+                stableAll = info["Change_devices_Count"] == 0
+                if stable:
+                    stable_attributes.append(attribute)
+                if stableAll:
+                    all_stable_attributes.append(attribute)
+                writer.writerow([attribute, info["Change_values_Count"], info["Change_devices_Count"], info["Fingerprint_Count"], info["Devices_count"], stable, stableAll])
+
+        cleaned_stable_attribute_stats = self.attribute_distributions(stable_attributes)
+        self.write_entropies(os.path.join(output_dir, STABLE_ENTROPIES_CSV), cleaned_stable_attribute_stats, len(self.device_ids), STABLE_MIN_ENTROPY)
+        cleaned_all_stable_attribute_stats = self.attribute_distributions(all_stable_attributes)
+        self.write_entropies(os.path.join(output_dir, ALL_STABLE_ENTROPIES_CSV), cleaned_all_stable_attribute_stats, len(self.device_ids), ALL_STABLE_MIN_ENTROPY)
+        return cleaned_stable_attribute_stats, cleaned_all_stable_attribute_stats
+
+
+class CleaningStatsAccumulator(CleaningStats):
+    """
+    Statistics of every step of the cleaning pipeline, accumulated in one pass over the fingerprints.
+
+    Every fingerprint is added once (add) and every value hashed once. The accumulator updates together:
+    - coverage and distinct values of every attribute over all fingerprints (steps 1 and 2),
+    - the distinct values of every attribute per device, for the stability devices (step 3),
+    - the value distributions over the selected fingerprints (steps 4 to 6).
+    The attribute filters of the steps only depend on the first two, they are applied when writing.
+    Subclasses change how values are hashed (hash) and what keeps them (new_stats: any container with add).
+    """
+    def __init__(self, selected_fingerprints, stability_fingerprints):
+        self.selected_fingerprints = set(selected_fingerprints)
+        # Devices with enough data to compute changes, and the devices every file counts for
+        self.fingerprint_counts = {}
+        self.file_devices = {}
+        for device_id, fp_paths in stability_fingerprints.items():
+            if len(fp_paths) < 2:
+                continue
+            self.fingerprint_counts[device_id] = len(fp_paths)
+            for path in fp_paths:
+                self.file_devices.setdefault(path, []).append(device_id)
+
+        self.total_fingerprints = 0
+        self.attributes_stats = {}
+        self.device_values = {device_id: {} for device_id in self.fingerprint_counts}
+        self.device_ids = set()
+        self.distributions = {}
+
+    def hash(self, value):
+        return hash_value(value)
+
+    def new_stats(self, key, distribution=False):
+        """Empty statistics of an attribute: its value set, or its value counts for a distribution."""
+        return {"coverage": 0, "values": ValueCounts() if distribution else set()}
+
+    def stats(self, attributes_stats, key, distribution=False):
+        stats = attributes_stats.get(key)
+        if stats is None:
+            stats = attributes_stats[key] = self.new_stats(key, distribution)
+        return stats
+
+    def add(self, filename, data):
+        self.total_fingerprints += 1
+        selected = filename in self.selected_fingerprints
+        if selected:
+            self.device_ids.add(data.get(DEVICE_ID_ATTRIBUTE, ""))
+        device_values = [self.device_values[device_id] for device_id in self.file_devices.get(filename, ())]
+
+        for key, value in data.items():
+            hashed = self.hash(value)
+            stats = self.stats(self.attributes_stats, key)
+            stats["coverage"] += 1
+            stats["values"].add(hashed)
+
+            # Empty values are not counted by the next steps
+            if not value:
+                continue
+            if selected:
+                distribution = self.stats(self.distributions, key, distribution=True)
+                distribution["coverage"] += 1
+                distribution["values"].add(hashed)
+            for values in device_values:
+                values.setdefault(key, set()).add(hashed)
+
+    def attribute_changes(self, attributes):
+        """Step 3: value changes of attributes over the fingerprints of every device."""
+        attributes = set(attributes)
+        changes = {}
+        for device_id, values in self.device_values.items():
+            for attribute, device_attribute_values in values.items():
+                if attribute not in attributes:
+                    continue
+                info = changes.get(attribute)
+                if info is None:
+                    info = changes[attribute] = {
+                        "Change_values_Count": 0,
+                        "Change_devices_Count": 0,
+                        "Fingerprint_Count": 0,
+                        "Devices_count": 0
+                    }
+                change_count = len(device_attribute_values) - 1
+                info["Change_values_Count"] += change_count
+                # Devices that have changed the value
+                if change_count > 0:
+                    info["Change_devices_Count"] += 1
+                info["Fingerprint_Count"] += self.fingerprint_counts[device_id]
+                info["Devices_count"] += 1
+        return changes
+
+
+def write_sketch_entropies_csv(file_path, attribute_stats, total_devices, min_normalized_entropy):
+    """
+    write_entropies_csv of attribute sketches: Cardinality, Unique Values and the entropies are estimates,
+    followed by their standard errors and the low/high bounds of the Shannon entropy.
+    """
+    max_entropy = math.log2(total_devices) if total_devices > 1 else 0
+    with open(file_path, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["Attribute", "Cardinality", "Unique Values","Coverage", "Shannon Entropy", "Normalized Entropy",
+                         "Cardinality Error", "Unique Values Error", "Shannon Entropy Low", "Shannon Entropy High"])
+
+        for attribute, info in attribute_stats.items():
+            sketch = info["values"]
+            cardinality, cardinality_error = sketch.cardinality()
+            unique_values, unique_values_error = sketch.unique_values()
+            entropy, entropy_low, entropy_high = sketch.entropy(total_devices)
+            normalized_entropy = entropy / max_entropy if max_entropy > 0 else 0
+            if normalized_entropy >= min_normalized_entropy:
+                writer.writerow([attribute, round(cardinality), round(unique_values), info["coverage"], entropy, normalized_entropy,
+                                 cardinality_error, unique_values_error, entropy_low, entropy_high])
+
+
+class ApproximateCleaningStats(CleaningStatsAccumulator):
+    """
+    CleaningStatsAccumulator keeping an AttributeSketch (fingerprint_analysis.sketches) instead of the value
+    set of every attribute and its distribution over the selected fingerprints: fixed memory per attribute,
+    whatever the number of fingerprints. Cardinalities, unique values and entropies are estimates with their
+    errors (see write_sketch_entropies_csv). The per device values of the stability devices are kept exactly.
+
+    Accumulators of disjoint parts of the fingerprints (workers, shards) are combined with merge, or written
+    with save and read back with load.
+    """
+    def __init__(self, selected_fingerprints, stability_fingerprints, precision=HLL_PRECISION, heavy_hitters=HEAVY_HITTERS, sample_size=SAMPLE_SIZE):
+        super().__init__(selected_fingerprints, stability_fingerprints)
+        self.sketch_parameters = (precision, heavy_hitters, sample_size)
+
+    def hash(self, value):
+        return sketch_hash(value)
+
+    def new_stats(self, key, distribution=False):
+        return {"coverage": 0, "values": AttributeSketch(*self.sketch_parameters)}
+
+    def cleaned_attributes(self):
+        """
+        Step 2 over the sketches: an attribute is different in every fingerprint if it has a value in all of them
+        and none of its sampled values was seen twice (the cardinality estimate can miss the number of fingerprints).
+        """
+        return [
+            attribute for attribute, info in self.attributes_stats.items()
+            if len(info["values"]) > 1 and not (info["coverage"] == self.total_fingerprints and info["values"].all_distinct())
+        ]
+
+    def attribute_distributions(self, attributes):
+        """Steps 4 and 6 over the sketches, attributes with equal sketches being redundant."""
+        filtered = {}
+        signatures = set()
+        for attribute in attributes:
+            if attribute not in self.distributions:
+                continue
+            signature = self.distributions[attribute]["values"].signature()
+            if signature not in signatures:
+                signatures.add(signature)
+                filtered[attribute] = self.distributions[attribute]
+        return filtered
+
+    def write_entropies(self, file_path, attribute_stats, total_devices, min_normalized_entropy):
+        write_sketch_entropies_csv(file_path, attribute_stats, total_devices, min_normalized_entropy)
+
+    def merge(self, other):
+        """Add the statistics of an accumulator of other fingerprints (same selected and stability fingerprints)."""
+        self.total_fingerprints += other.total_fingerprints
+        self.device_ids |= other.device_ids
+        for sketches, other_sketches in ((self.attributes_stats, other.attributes_stats), (self.distributions, other.distributions)):
+            for key, other_stats in other_sketches.items():
+                stats = self.stats(sketches, key)
+                stats["coverage"] += other_stats["coverage"]
+                stats["values"].merge(other_stats["values"])
+        for device_id, values in other.device_values.items():
+            device_values = self.device_values.setdefault(device_id, {})
+            for key, hashes in values.items():
+                device_values.setdefault(key, set()).update(hashes)
+        return self
+
+    def save(self, path):
+        def sketches_state(sketches):
+            return {key: {"coverage": stats["coverage"], "values": stats["values"].to_dict()} for key, stats in sketches.items()}
+
+        with open(path, 'w') as json_file:
+            json.dump({
+                "sketch_parameters": self.sketch_parameters,
+                "total_fingerprints": self.total_fingerprints,
+                "device_ids": sorted(self.device_ids),
+                "attributes_stats": sketches_state(self.attributes_stats),
+                "distributions": sketches_state(self.distributions),
+                "device_values": {
+                    device_id: {key: sorted(hashes) for key, hashes in values.items()}
+                    for device_id, values in self.device_values.items()
+                },
+            }, json_file)
+
+    @classmethod
+    def load(cls, path, selected_fingerprints, stability_fingerprints):
+        """Accumulator written by save, with the selected and stability fingerprints it was created with."""
+        with open(path, 'r') as json_file:
+            state = json.load(json_file)
+
+        def sketches(sketches_state):
+            return {
+                key: {"coverage": stats["coverage"], "values": AttributeSketch.from_dict(stats["values"])}
+                for key, stats in sketches_state.items()
+            }
+
+        accumulator = cls(selected_fingerprints, stability_fingerprints, *state["sketch_parameters"])
+        accumulator.total_fingerprints = state["total_fingerprints"]
+        accumulator.device_ids = set(state["device_ids"])
+        accumulator.attributes_stats = sketches(state["attributes_stats"])
+        accumulator.distributions = sketches(state["distributions"])
+        for device_id, values in state["device_values"].items():
+            accumulator.device_values[device_id] = {key: set(hashes) for key, hashes in values.items()}
+        return accumulator
+
+
+def accumulate_cleaning_stats(folder_path, selected_fingerprints, stability_fingerprints, files=None, approximate=False, report_every=1000):
+    """
+    Accumulator of the prepared fingerprints of folder_path (all of them or files), exact or approximate
+    (ApproximateCleaningStats, whose accumulators of several parts of the files can be merged).
+    """
+    accumulator_class = ApproximateCleaningStats if approximate else CleaningStatsAccumulator
+    accumulator = accumulator_class(selected_fingerprints, stability_fingerprints)
+    for filename, data in iter_prepared_fingerprints(folder_path, files):
+        accumulator.add(filename, data)
+        if report_every and accumulator.total_fingerprints % report_every == 0:
+            print(f"{accumulator.total_fingerprints} -- {filename}")
+    return accumulator
+
+def compute_cleaning_stats(folder_path, selected_fingerprints, stability_fingerprints, output_dir=".", report_every=1000, approximate=False):
+    """
+    Runs the cleaning steps with a single read of every prepared fingerprint of folder_path
+    and writes their CSV files into output_dir. approximate=True keeps fixed memory sketches of the values.
+    """
+    accumulator = accumulate_cleaning_stats(folder_path, selected_fingerprints, stability_fingerprints, approximate=approximate, report_every=report_every)
+    accumulator.write_csvs(output_dir)
+    return accumulator
@@ -0,0 +1,282 @@
+import os
+import json
+from array import array
+import numpy as np
+from fingerprint_analysis.hashing import canonical_encode
+
+DEVICE_ID_ATTRIBUTE = "content://settings/secure.android_id"
+META_FILE = "meta.json"
+FILES_FILE = "files.json"
+DEVICES_FILE = "devices.json"
+DEVICE_ORDER_FILE = "device_order.npy"
+DEVICE_OFFSETS_FILE = "device_offsets.npy"
+MISSING = -1
+# Changed when the encoding of the store changes, older stores are rebuilt
+STORE_VERSION = 3
+
+
+def value_key(value):
+    """
+    Identity of a prepared value: two values get the same code if and only if they have the same key.
+    The key is the canonical encoding of fingerprint_analysis.hashing, equal values hash the same.
+    """
+    return canonical_encode(value)
+
+def code_dtype(cardinality):
+    """Smallest signed integer type holding every code and MISSING."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if cardinality <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def device_index(device, timestamp):
+    """
+    Rows sorted by device code then timestamp (then row), and the offsets of every device in them:
+    the fingerprints of device d are the rows order[offsets[d]:offsets[d + 1]], oldest first.
+    """
+    order = np.lexsort((np.asarray(timestamp), np.asarray(device)))
+    offsets = np.zeros(int(device.max()) + 2 if len(device) else 1, dtype=np.int64)
+    np.cumsum(np.bincount(device, minlength=len(offsets) - 1), out=offsets[1:])
+    return order, offsets
+
+def list_prepared_files(folder_path):
+    """Sorted prepared file names of a prepare directory or of a record store."""
+    from fingerprint_preparation.record_store import RecordStore, is_record_store
+    if is_record_store(folder_path):
+        with RecordStore(folder_path) as store:
+            return store.names()
+    return sorted(filename for filename in os.listdir(folder_path) if filename.endswith(".json"))
+
+def iter_prepared_fingerprints(folder_path, files=None):
+    """
+    (file name, fingerprint) pairs of a prepare directory or of a record store, for all the prepared
+    files (sorted) or the given ones. Records of a store are read in storage order.
+    """
+    from fingerprint_preparation.record_store import RecordStore, is_record_store
+    if is_record_store(folder_path):
+        with RecordStore(folder_path) as store:
+            yield from store.items(store.names() if files is None else files)
+        return
+    for filename in list_prepared_files(folder_path) if files is None else files:
+        with open(os.path.join(folder_path, filename), 'r') as json_file:
+            yield filename, json.load(json_file)
+
+
+class _ColumnBuilder:
+    """Sparse column being built: the rows where the attribute is present and their codes."""
+    __slots__ = ("codes", "rows", "row_codes", "values")
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+        self.rows = array('q')
+        self.row_codes = array('q')
+
+    def add(self, row, value):
+        key = value_key(value)
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.values)
+            self.values.append(key)
+        self.rows.append(row)
+        self.row_codes.append(code)
+
+    def dense(self, nb_rows):
+        codes = np.full(nb_rows, MISSING, dtype=code_dtype(len(self.values)))
+        codes[np.frombuffer(self.rows, dtype=np.int64)] = np.frombuffer(self.row_codes, dtype=np.int64)
+        return codes
+
+
+def build_attribute_matrix(folder_path, output_dir, files=None, report_every=1000):
+    """
+    One time build of the columnar store of a prepared corpus.
+    Every attribute becomes an integer coded column (MISSING where the fingerprint does not have it)
+    with its dictionary of values, plus device id, timestamp and file name columns.
+    """
+    os.makedirs(os.path.join(output_dir, "columns"), exist_ok=True)
+    os.makedirs(os.path.join(output_dir, "values"), exist_ok=True)
+
+    columns = {}
+    devices = {}
+    device_codes = array('q')
+    timestamps = array('q')
+    # File name of every row, in reading order
+    row_files = []
+    for row, (filename, data) in enumerate(iter_prepared_fingerprints(folder_path, files)):
+        row_files.append(filename)
+        for key, value in data.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = _ColumnBuilder()
+            column.add(row, value)
+        device_codes.append(devices.setdefault(str(data.get(DEVICE_ID_ATTRIBUTE, "")), len(devices)))
+        timestamps.append(int(data.get("timestamp", 0)))
+        if report_every and (row + 1) % report_every == 0:
+            print(f"{row + 1} -- {filename}")
+
+    nb_rows = len(row_files)
+    attributes = {}
+    for index, (attribute, column) in enumerate(columns.items()):
+        name = f"{index:05d}"
+        np.save(os.path.join(output_dir, "columns", f"{name}.npy"), column.dense(nb_rows))
+        with open(os.path.join(output_dir, "values", f"{name}.jsonl"), 'w') as values_file:
+            for key in column.values:
+                values_file.write(key + "\n")
+        attributes[attribute] = {"column": name, "cardinality": len(column.values), "coverage": len(column.rows)}
+
+    device = np.frombuffer(device_codes, dtype=np.int64)
+    np.save(os.path.join(output_dir, "device.npy"), device.astype(code_dtype(len(devices))))
+    np.save(os.path.join(output_dir, "timestamp.npy"), np.frombuffer(timestamps, dtype=np.int64))
+    order, offsets = device_index(device, np.frombuffer(timestamps, dtype=np.int64))
+    np.save(os.path.join(output_dir, DEVICE_ORDER_FILE), order)
+    np.save(os.path.join(output_dir, DEVICE_OFFSETS_FILE), offsets)
+    with open(os.path.join(output_dir, DEVICES_FILE), 'w') as devices_file:
+        json.dump(list(devices), devices_file)
+    with open(os.path.join(output_dir, FILES_FILE), 'w') as files_file:
+        json.dump(row_files, files_file)
+    with open(os.path.join(output_dir, META_FILE), 'w') as meta_file:
+        json.dump({"version": STORE_VERSION, "rows": nb_rows, "attributes": attributes}, meta_file, indent=4)
+    return AttributeMatrix(output_dir)
+
+
+def load_attribute_matrix(folder_path, matrix_dir, rebuild=False):
+    """
+    Open the columnar store of folder_path, building it the first time.
+    The store is rebuilt when its version changed or when folder_path no longer holds the prepared
+    files it was built from (e.g. newly prepared fingerprints).
+    """
+    meta_path = os.path.join(matrix_dir, META_FILE)
+    if not rebuild and os.path.exists(meta_path):
+        with open(meta_path, 'r') as meta_file:
+            rebuild = json.load(meta_file).get("version") != STORE_VERSION
+        if not rebuild:
+            with open(os.path.join(matrix_dir, FILES_FILE), 'r') as files_file:
+                store_files = json.load(files_file)
+            prepared_files = list_prepared_files(folder_path)
+            rebuild = sorted(store_files) != prepared_files
+            if rebuild:
+                print(f"{len(prepared_files)} prepared files instead of the {len(store_files)} of {matrix_dir}, rebuilding")
+    if rebuild or not os.path.exists(meta_path):
+        return build_attribute_matrix(folder_path, matrix_dir)
+    return AttributeMatrix(matrix_dir)
+
+
+class AttributeMatrix:
+    """
+    Read access to a columnar store written by build_attribute_matrix.
+    Columns are memory-mapped and value dictionaries decoded on first use.
+    """
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.mmap_mode = 'r' if mmap else None
+        with open(os.path.join(path, META_FILE), 'r') as meta_file:
+            meta = json.load(meta_file)
+        self.nb_rows = meta["rows"]
+        self.attribute_info = meta["attributes"]
+        with open(os.path.join(path, FILES_FILE), 'r') as files_file:
+            self.files = json.load(files_file)
+        with open(os.path.join(path, DEVICES_FILE), 'r') as devices_file:
+            self.devices = json.load(devices_file)
+        self.device = np.load(os.path.join(path, "device.npy"), mmap_mode=self.mmap_mode)
+        self.timestamp = np.load(os.path.join(path, "timestamp.npy"), mmap_mode=self.mmap_mode)
+        self._columns = {}
+        self._values = {}
+        self._row_index = None
+        self._device_index = None
+
+    @property
+    def attributes(self):
+        return list(self.attribute_info)
+
+    def __contains__(self, attribute):
+        return attribute in self.attribute_info
+
+    def __len__(self):
+        return self.nb_rows
+
+    def cardinality(self, attribute):
+        return self.attribute_info[attribute]["cardinality"]
+
+    def coverage(self, attribute):
+        return self.attribute_info[attribute]["coverage"]
+
+    def codes(self, attribute, rows=None):
+        """Codes of an attribute (MISSING where absent), for all rows or the given row indexes."""
+        codes = self._columns.get(attribute)
+        if codes is None:
+            name = self.attribute_info[attribute]["column"]
+            codes = self._columns[attribute] = np.load(os.path.join(self.path, "columns", f"{name}.npy"), mmap_mode=self.mmap_mode)
+        return codes if rows is None else codes[rows]
+
+    def values(self, attribute):
+        """Decoded values of an attribute, indexed by code."""
+        values = self._values.get(attribute)
+        if values is None:
+            name = self.attribute_info[attribute]["column"]
+            with open(os.path.join(self.path, "values", f"{name}.jsonl"), 'r') as values_file:
+                values = self._values[attribute] = [json.loads(line) for line in values_file]
+        return values
+
+    def value(self, attribute, code):
+        return None if code == MISSING else self.values(attribute)[code]
+
+    def falsy_codes(self, attribute):
+        """Codes of the values the notebooks skip with `if value:` (empty strings and lists, 0, False...)."""
+        return np.array([code for code, value in enumerate(self.values(attribute)) if not value], dtype=np.int64)
+
+    def present(self, attribute, rows=None, truthy=False):
+        """Mask of the rows having the attribute (with a truthy value if truthy is set)."""
+        codes = self.codes(attribute, rows)
+        mask = codes != MISSING
+        if truthy:
+            falsy = self.falsy_codes(attribute)
+            if len(falsy):
+                mask &= ~np.isin(codes, falsy)
+        return mask
+
+    def value_counts(self, attribute, rows=None, truthy=False):
+        """
+        Number of rows per code, as a dict code -> count.
+        Codes are in order of first appearance in rows, like a dict filled while iterating the fingerprints.
+        """
+        codes = self.codes(attribute, rows)
+        codes = codes[self.present(attribute, rows, truthy)]
+        unique_codes, first_rows, counts = np.unique(codes, return_index=True, return_counts=True)
+        order = np.argsort(first_rows, kind="stable")
+        return {int(code): int(count) for code, count in zip(unique_codes[order], counts[order])}
+
+    def rows(self, files):
+        """Row indexes of the given prepared file names (unknown names are ignored)."""
+        if self._row_index is None:
+            self._row_index = {filename: row for row, filename in enumerate(self.files)}
+        return np.array(sorted(self._row_index[f] for f in files if f in self._row_index), dtype=np.int64)
+
+    def device_index(self):
+        """
+        (order, offsets) of the device index (see device_index): the rows of every device code sorted by timestamp.
+        Stores built before the index was added compute it on first use.
+        """
+        if self._device_index is None:
+            order_path = os.path.join(self.path, DEVICE_ORDER_FILE)
+            if os.path.exists(order_path):
+                self._device_index = (np.load(order_path, mmap_mode=self.mmap_mode), np.load(os.path.join(self.path, DEVICE_OFFSETS_FILE)))
+            else:
+                self._device_index = device_index(self.device, self.timestamp)
+        return self._device_index
+
+    def device_ids(self, rows=None):
+        device = self.device if rows is None else self.device[rows]
+        return [self.devices[code] for code in device]
+
+    def matrix(self, attributes, rows=None):
+        """2D array of codes (rows x attributes), in the given attribute order."""
+        nb_rows = self.nb_rows if rows is None else len(rows)
+        matrix = np.empty((nb_rows, len(attributes)), dtype=np.int32)
+        for j, attribute in enumerate(attributes):
+            matrix[:, j] = self.codes(attribute, rows) if attribute in self else MISSING
+        return matrix
+
+    def frame(self, attributes, rows=None):
+        """pandas DataFrame of codes, one column per attribute."""
+        import pandas as pd
+        return pd.DataFrame(self.matrix(attributes, rows), columns=list(attributes))
@@ -0,0 +1,236 @@
+"""
+Search modes of the attribute combinations beyond the greedy one.
+
+- beam: keeps the beam_width best combinations of every size k instead of a single one.
+- bounded: exact search of the best k attributes combination, pruned with an upper bound.
+
+Both score combinations in a process pool. The code matrix is put once in a shared memory block
+that every worker attaches to, so it is never copied per worker or per task.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from fingerprint_analysis.uniqueness import refine, count_unique, combination_values
+
+# Set in every worker by attach_worker
+_matrix = None
+_shared_block = None
+_best = None
+# Default number of nodes explored per branch of the bounded search (None: no limit)
+MAX_NODES = 1000
+
+
+class SharedCodeMatrix:
+    """Code matrix (rows x attributes) copied once into a shared memory block."""
+    def __init__(self, matrix):
+        matrix = np.ascontiguousarray(matrix)
+        self.shape = matrix.shape
+        self.dtype = matrix.dtype.str
+        self.block = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.block.buf)
+        self.array[:] = matrix
+
+    @property
+    def spec(self):
+        """What a worker needs to attach to the block."""
+        return self.block.name, self.shape, self.dtype
+
+    def close(self):
+        self.array = None
+        self.block.close()
+        self.block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_worker(spec, best):
+    """Pool initializer: map the shared code matrix, the block stays owned by the parent process."""
+    global _matrix, _shared_block, _best
+    name, shape, dtype = spec
+    # Workers share the resource tracker of the parent, the block is only unlinked by SharedCodeMatrix.close
+    _shared_block = shared_memory.SharedMemory(name=name)
+    _matrix = np.ndarray(shape, dtype=dtype, buffer=_shared_block.buf)
+    _best = best
+
+def partition(columns):
+    """Anonymity sets (group ids and sizes) of the combination of columns."""
+    groups = np.zeros(len(_matrix), dtype=np.int64)
+    sizes = np.array([len(_matrix)], dtype=np.int64)
+    for column in columns:
+        groups, sizes = refine(groups, _matrix[:, column])
+    return groups, sizes
+
+def score_extensions(parent, candidates):
+    """Worker: number of unique fingerprints of parent + c for every candidate column c."""
+    groups, sizes = partition(parent)
+    active = sizes[groups] > 1
+    already_unique = len(groups) - int(np.count_nonzero(active))
+    return [already_unique + count_unique(groups[active], _matrix[active, column]) for column in candidates]
+
+def suffix_partitions(candidates):
+    """Group ids of the combination of candidates[i:] for every i (upper bound of any completion)."""
+    suffixes = [None] * (len(candidates) + 1)
+    groups = np.zeros(len(_matrix), dtype=np.int64)
+    suffixes[len(candidates)] = groups
+    for i in range(len(candidates) - 1, -1, -1):
+        groups, _ = refine(groups, _matrix[:, candidates[i]])
+        suffixes[i] = groups
+    return suffixes
+
+def bounded_search_branch(k, first, candidates, max_nodes=None):
+    """
+    Worker: best k combination of candidates starting with candidates[first], depth first.
+    A branch is cut when refining it with every remaining candidate can not beat the best
+    count found so far (shared by all workers): adding attributes never merges fingerprints.
+    Returns (unique count, columns) of the best combination found (None if nothing beats the
+    shared best) and whether the branch was fully explored.
+    """
+    suffixes = suffix_partitions(candidates)
+    best_unique, best_columns = -1, None
+    nodes = 0
+    stack = [(np.zeros(len(_matrix), dtype=np.int64), first, [])]
+    while stack:
+        groups, start, combo = stack.pop()
+        nodes += 1
+        if max_nodes is not None and nodes > max_nodes:
+            return best_unique, best_columns, False
+        remaining = k - len(combo)
+        if count_unique(groups, suffixes[start]) <= _best.value:
+            continue
+        # The first level only takes candidates[first], the other branches belong to other tasks
+        last = first if not combo else len(candidates) - remaining
+        if remaining == 1:
+            # Leaves are scored without building their partition, each counts as a node
+            nodes += last - start + 1
+            for i in range(start, last + 1):
+                unique = count_unique(groups, _matrix[:, candidates[i]])
+                with _best.get_lock():
+                    if unique > _best.value:
+                        _best.value = unique
+                        best_unique, best_columns = unique, combo + [candidates[i]]
+            continue
+        # Pushed in reverse so that children are explored in candidate order
+        for i in range(last, start - 1, -1):
+            child, _ = refine(groups, _matrix[:, candidates[i]])
+            stack.append((child, i + 1, combo + [candidates[i]]))
+    return best_unique, best_columns, True
+
+
+class CombinationSearch:
+    """
+    Runs the search modes over a code matrix (rows x attributes, AttributeMatrix.matrix) and returns
+    per k statistics in the fingerprints_combinations_stats format of the uniqueness notebook.
+    """
+    def __init__(self, matrix, attributes, workers=None):
+        self.matrix = np.ascontiguousarray(matrix)
+        self.attributes = list(attributes)
+        self.workers = workers
+
+    @classmethod
+    def from_frame(cls, fingerprints_df, attributes, workers=None):
+        return cls(fingerprints_df[list(attributes)].to_numpy(), attributes, workers)
+
+    def __enter__(self):
+        self.shared = SharedCodeMatrix(self.matrix)
+        self.best = multiprocessing.Value('q', -1)
+        self.executor = None
+        if self.workers and self.workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=attach_worker, initargs=(self.shared.spec, self.best))
+        else:
+            # Serial mode: this process plays the worker
+            global _matrix, _best
+            _matrix, _best = self.shared.array, self.best
+        return self
+
+    def __exit__(self, *exc):
+        global _matrix, _best
+        if self.executor is not None:
+            self.executor.shutdown()
+        _matrix, _best = None, None
+        self.shared.close()
+
+    def map(self, function, *iterables):
+        if self.executor is None:
+            return list(map(function, *iterables))
+        return list(self.executor.map(function, *iterables))
+
+    def stats(self, columns):
+        """fingerprints_combinations_stats entry of a combination of columns."""
+        groups = np.zeros(len(self.matrix), dtype=np.int64)
+        sizes = np.array([len(self.matrix)], dtype=np.int64)
+        for column in columns:
+            groups, sizes = refine(groups, self.matrix[:, column])
+        return {
+            "coverage": len(self.matrix),
+            "values": combination_values(self.matrix, groups, sizes, list(columns)),
+            "attributes": [self.attributes[column] for column in columns]
+        }
+
+    def beam(self, nb_attributes, beam_width=8, verbose=True):
+        """
+        Beam search: the beam_width best combinations of size k are extended with every other
+        attribute, the best beam_width distinct combinations of size k + 1 are kept.
+        With beam_width=1 this is the greedy search of UniquenessSearch.
+        """
+        fingerprints_combinations_stats = {}
+        beam = [()]
+        for k in range(1, min(nb_attributes, len(self.attributes)) + 1):
+            extensions = [[column for column in range(len(self.attributes)) if column not in parent] for parent in beam]
+            scores = self.map(score_extensions, beam, extensions)
+            children = []
+            for parent, candidates, parent_scores in zip(beam, extensions, scores):
+                children.extend((unique, parent + (column,)) for column, unique in zip(candidates, parent_scores))
+            # Stable sort: on ties the first parent and the first candidate win, like the greedy search
+            children.sort(key=lambda child: -child[0])
+            beam, seen = [], set()
+            for unique, combo in children:
+                if frozenset(combo) not in seen:
+                    seen.add(frozenset(combo))
+                    beam.append(combo)
+                    if len(beam) == beam_width:
+                        break
+            fingerprints_combinations_stats[str(k)] = self.stats(beam[0])
+            if verbose:
+                print(f"Top {k} attributes having {children[0][0]} unique values:", fingerprints_combinations_stats[str(k)]["attributes"])
+        return fingerprints_combinations_stats
+
+    def bounded(self, nb_attributes, beam_width=8, max_nodes=MAX_NODES, verbose=True):
+        """
+        Best combination of every size k. The beam search result is the starting lower bound, a
+        combination only replaces it when it makes strictly more fingerprints unique. max_nodes
+        limits the nodes (partial and scored combinations) explored per branch (first attribute): the result is then not proven optimal.
+        With max_nodes=None every branch is fully explored, which is only tractable for a few attributes.
+        """
+        beam_stats = self.beam(nb_attributes, beam_width, verbose=False)
+        columns = {attribute: j for j, attribute in enumerate(self.attributes)}
+        candidates = list(range(len(self.attributes)))
+        fingerprints_combinations_stats = {}
+        for k in range(1, len(beam_stats) + 1):
+            best_columns = [columns[attribute] for attribute in beam_stats[str(k)]["attributes"]]
+            best_unique = sum(1 for count in beam_stats[str(k)]["values"].values() if count == 1)
+            self.best.value = best_unique
+            firsts = list(range(len(candidates) - k + 1))
+            exact = True
+            for unique, branch_columns, complete in self.map(bounded_search_branch, [k] * len(firsts), firsts, [candidates] * len(firsts), [max_nodes] * len(firsts)):
+                exact = exact and complete
+                if branch_columns is not None and unique > best_unique:
+                    best_unique, best_columns = unique, branch_columns
+            fingerprints_combinations_stats[str(k)] = self.stats(best_columns)
+            if verbose:
+                print(f"Top {k} attributes having {best_unique} unique values{'' if exact else ' (node limit reached)'}:", fingerprints_combinations_stats[str(k)]["attributes"])
+        return fingerprints_combinations_stats
+
+
+def combination_search(fingerprints_df, attribute_pool, nb_attributes, mode="beam", beam_width=8, max_nodes=MAX_NODES, workers=None, verbose=True):
+    """Beam ("beam") or bounded exact ("bounded") search over the attribute columns of fingerprints_df."""
+    with CombinationSearch.from_frame(fingerprints_df, attribute_pool, workers) as search:
+        if mode == "beam":
+            return search.beam(nb_attributes, beam_width, verbose)
+        elif mode == "bounded":
+            return search.bounded(nb_attributes, beam_width, max_nodes, verbose)
+        raise ValueError(f"Unknown search mode '{mode}'")
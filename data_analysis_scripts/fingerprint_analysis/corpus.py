@@ -0,0 +1,159 @@
+"""
+Memory compact in-memory corpus of prepared fingerprints.
+
+Attribute names are interned once in a key table and every distinct value of an attribute once in its
+value table, so a fingerprint is only its (key id, value id) pairs: int32 entries of two arrays shared by
+all the fingerprints (row_keys, row_values), fingerprint i owning the slice offsets[i]:offsets[i + 1].
+Equal values get the same value id (same identity as the columnar store, see columnar.value_key), so value
+ids replace the hashed values of the notebooks. The value table keeps the JSON text of every value as written
+(list order, dict key order), so every fingerprint is readable as a read-only dict equal to the prepared one
+(corpus[i]). Values equal up to their dict key order share the value id and the text of the first one.
+"""
+import sys
+import json
+from array import array
+from collections.abc import Mapping
+import numpy as np
+from fingerprint_analysis.columnar import DEVICE_ID_ATTRIBUTE, MISSING, value_key, iter_prepared_fingerprints
+
+
+class FingerprintView(Mapping):
+    """Read-only dict view of a fingerprint of a CompactCorpus, values are decoded on access."""
+    __slots__ = ("corpus", "row")
+
+    def __init__(self, corpus, row):
+        self.corpus = corpus
+        self.row = row
+
+    def key_position(self, key):
+        key_id = self.corpus.key_ids.get(key)
+        if key_id is None:
+            return None
+        start, end = self.corpus.offsets[self.row], self.corpus.offsets[self.row + 1]
+        try:
+            return self.corpus.row_keys.index(key_id, start, end)
+        except ValueError:
+            return None
+
+    def __getitem__(self, key):
+        position = self.key_position(key)
+        if position is None:
+            raise KeyError(key)
+        return self.corpus.decode(self.corpus.row_keys[position], self.corpus.row_values[position])
+
+    def __contains__(self, key):
+        return self.key_position(key) is not None
+
+    def __iter__(self):
+        keys = self.corpus.keys
+        for position in range(self.corpus.offsets[self.row], self.corpus.offsets[self.row + 1]):
+            yield keys[self.corpus.row_keys[position]]
+
+    def __len__(self):
+        return self.corpus.offsets[self.row + 1] - self.corpus.offsets[self.row]
+
+    def codes(self):
+        """Attribute -> value id of the fingerprint, the notebooks' hashed fingerprint."""
+        corpus = self.corpus
+        start, end = corpus.offsets[self.row], corpus.offsets[self.row + 1]
+        return {corpus.keys[key_id]: value_id for key_id, value_id in zip(corpus.row_keys[start:end], corpus.row_values[start:end])}
+
+
+class CompactCorpus:
+    """
+    Prepared fingerprints stored as interned attribute keys and per attribute value ids (see module docstring).
+    Fingerprints are appended with add, or read from a prepare directory by load_compact_corpus.
+    """
+    def __init__(self):
+        self.keys = []
+        self.key_ids = {}
+        # Per key id: JSON texts of the values by value id, and value key -> value id
+        self.values = []
+        self.value_ids = []
+        self.offsets = array('q', [0])
+        self.row_keys = array('i')
+        self.row_values = array('i')
+        self.files = []
+
+    def __len__(self):
+        return len(self.files)
+
+    def __getitem__(self, row):
+        if not -len(self) <= row < len(self):
+            raise IndexError(row)
+        return FingerprintView(self, row % len(self))
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield FingerprintView(self, row)
+
+    def key_id(self, key):
+        key_id = self.key_ids.get(key)
+        if key_id is None:
+            key_id = self.key_ids[key] = len(self.keys)
+            self.keys.append(sys.intern(key))
+            self.values.append([])
+            self.value_ids.append({})
+        return key_id
+
+    def add(self, filename, data):
+        """Append a prepared fingerprint, returns its row."""
+        for key, value in data.items():
+            key_id = self.key_id(key)
+            encoded = value_key(value)
+            value_ids = self.value_ids[key_id]
+            value_id = value_ids.get(encoded)
+            if value_id is None:
+                value_id = value_ids[encoded] = len(self.values[key_id])
+                # The value key is the text as written for most values (scalars, lists of scalars)
+                written = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+                self.values[key_id].append(encoded if written == encoded else written)
+            self.row_keys.append(key_id)
+            self.row_values.append(value_id)
+        self.offsets.append(len(self.row_keys))
+        self.files.append(filename)
+        return len(self.files) - 1
+
+    def decode(self, key_id, value_id):
+        return json.loads(self.values[key_id][value_id])
+
+    def cardinality(self, attribute):
+        return len(self.values[self.key_ids[attribute]])
+
+    def matrix(self, attributes, rows=None):
+        """2D array of value ids (rows x attributes, MISSING where absent), like AttributeMatrix.matrix."""
+        row_keys = np.frombuffer(self.row_keys, dtype=np.int32)
+        row_values = np.frombuffer(self.row_values, dtype=np.int32)
+        # Column of every key id, -1 for the keys that are not selected
+        columns = np.full(len(self.keys) + 1, -1, dtype=np.int64)
+        for j, attribute in enumerate(attributes):
+            if attribute in self.key_ids:
+                columns[self.key_ids[attribute]] = j
+        entry_columns = columns[row_keys]
+        selected = entry_columns >= 0
+        entry_rows = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(np.frombuffer(self.offsets, dtype=np.int64)))
+        matrix = np.full((len(self), len(attributes)), MISSING, dtype=np.int32)
+        matrix[entry_rows[selected], entry_columns[selected]] = row_values[selected]
+        return matrix if rows is None else matrix[rows]
+
+    def device_ids(self, rows=None):
+        rows = range(len(self)) if rows is None else rows
+        return [str(self[row].get(DEVICE_ID_ATTRIBUTE, "")) for row in rows]
+
+    def compact(self):
+        """Drop the value key -> value id lookups once every fingerprint is added (add can not be used after)."""
+        self.value_ids = None
+        return self
+
+
+def load_compact_corpus(folder_path, files=None, attributes=None, report_every=10000):
+    """CompactCorpus of the prepared fingerprints of folder_path (all of them or files), with all or the given attributes."""
+    corpus = CompactCorpus()
+    attributes = None if attributes is None else set(attributes) | {DEVICE_ID_ATTRIBUTE}
+    for count, (filename, data) in enumerate(iter_prepared_fingerprints(folder_path, files), 1):
+        if attributes is not None:
+            data = {key: value for key, value in data.items() if key in attributes}
+        corpus.add(filename, data)
+        if report_every and count % report_every == 0:
+            print(f"{count} -- {filename}")
+    return corpus
@@ -0,0 +1,135 @@
+"""
+Canonical value hashing shared by the analysis steps.
+
+Values are encoded to a canonical JSON text before hashing, so that equal values always hash the same,
+whatever the process, the dict insertion order or the set iteration order:
+- scalars keep their JSON type: "1", 1, 1.0 and true are four different values,
+- dicts are sorted by key,
+- lists and tuples are ordered sequences: log lines, mounts... keep their order (the parsers sort the lists
+  they build from sets), tuples are e.g. the values of an attribute combination,
+- sets and frozensets are unordered collections: their items are sorted.
+The text is hashed with blake2b. Hashes of scalars, most of the fingerprint values, are cached per process.
+"""
+import base64
+import hashlib
+from functools import lru_cache
+from json.encoder import encode_basestring
+
+DIGEST_SIZE = 16
+# Number of distinct scalar values whose hash is cached (per process)
+HASH_CACHE_SIZE = 1 << 16
+
+NON_FINITE_FLOATS = {"nan": "NaN", "inf": "Infinity", "-inf": "-Infinity"}
+
+
+def encode_float(value):
+    text = float.__repr__(value)
+    return NON_FINITE_FLOATS.get(text, text)
+
+def encode_none(value):
+    return "null"
+
+def encode_bool(value):
+    return "true" if value else "false"
+
+def encode_items(values):
+    try:
+        # Fast path: lists of strings
+        return list(map(encode_basestring, values))
+    except TypeError:
+        return list(map(canonical_encode, values))
+
+def encode_sequence(values):
+    return '[' + ','.join(encode_items(values)) + ']'
+
+def encode_collection(values):
+    items = encode_items(values)
+    items.sort()
+    return '[' + ','.join(items) + ']'
+
+def encode_dict(value):
+    try:
+        keys = sorted(value)
+    except TypeError:
+        keys = sorted(value, key=str)
+    return '{' + ','.join([encode_basestring(str(key)) + ':' + canonical_encode(value[key]) for key in keys]) + '}'
+
+ENCODERS = {
+    str: encode_basestring,
+    int: int.__repr__,
+    float: encode_float,
+    bool: encode_bool,
+    type(None): encode_none,
+    list: encode_sequence,
+    set: encode_collection,
+    frozenset: encode_collection,
+    tuple: encode_sequence,
+    dict: encode_dict,
+}
+
+
+def canonical_encode(value):
+    """Canonical JSON text of a value (see module documentation)."""
+    encoder = ENCODERS.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    for value_type, encoder in ENCODERS.items():
+        if isinstance(value, value_type):
+            return encoder(value)
+    # Other scalars (numpy numbers...) through their Python value
+    if hasattr(value, "item"):
+        return canonical_encode(value.item())
+    return encode_basestring(str(value))
+
+SCALAR_TYPES = frozenset([str, int, float, bool, type(None)])
+
+def digest(value):
+    return hashlib.blake2b(canonical_encode(value).encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+# typed: 1, 1.0 and True are cached separately
+@lru_cache(maxsize=HASH_CACHE_SIZE, typed=True)
+def scalar_hash_value(value, length):
+    return base64.urlsafe_b64encode(digest(value)).decode()[:length]
+
+@lru_cache(maxsize=HASH_CACHE_SIZE, typed=True)
+def scalar_hash_dict(value):
+    return digest(value).hex()
+
+
+def hash_value(d, length=12):
+    """Short text hash of a value (urlsafe base64 of the digest, first length characters)."""
+    if type(d) in SCALAR_TYPES:
+        return scalar_hash_value(d, length)
+    return base64.urlsafe_b64encode(digest(d)).decode()[:length]
+
+def hash_dict(d):
+    """Hexadecimal hash of a value."""
+    if type(d) in SCALAR_TYPES:
+        return scalar_hash_dict(d)
+    return digest(d).hex()
+
+def hash_values(values, length=12):
+    """hash_value of every value of an iterable."""
+    b64encode = base64.urlsafe_b64encode
+    scalar_types = SCALAR_TYPES
+    return [
+        scalar_hash_value(value, length) if type(value) in scalar_types else b64encode(digest(value)).decode()[:length]
+        for value in values
+    ]
+
+def hash_dicts(values):
+    """hash_dict of every value of an iterable."""
+    scalar_types = SCALAR_TYPES
+    return [scalar_hash_dict(value) if type(value) in scalar_types else digest(value).hex() for value in values]
+
+def hash_value64(value):
+    """64 bits integer hash of a value, for NumPy arrays of hashes."""
+    return int.from_bytes(digest(value)[:8], "little", signed=True)
+
+def cache_info():
+    """Hits and misses of the scalar hash caches."""
+    return scalar_hash_value.cache_info(), scalar_hash_dict.cache_info()
+
+def cache_clear():
+    scalar_hash_value.cache_clear()
+    scalar_hash_dict.cache_clear()
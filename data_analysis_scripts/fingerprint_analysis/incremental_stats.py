@@ -0,0 +1,244 @@
+import os
+import json
+from fingerprint_analysis.columnar import DEVICE_ID_ATTRIBUTE, list_prepared_files, iter_prepared_fingerprints
+from fingerprint_analysis.cleaning_stats import CleaningStats, compute_entropy, compute_unique_values, hash_value
+
+CHECKPOINT_VERSION = 3
+# Fingerprints applied since the last snapshot are appended to the journal of the checkpoint
+JOURNAL_SUFFIX = ".journal"
+
+
+class IncrementalCleaningStats(CleaningStats):
+    """
+    Cleaning statistics kept up to date as fingerprints arrive, persisted between runs.
+
+    The selected fingerprint of a device is its latest one (highest timestamp) and every device having
+    at least 2 fingerprints counts for stability. Applying a fingerprint only touches the attributes
+    of that fingerprint and of its device:
+    - coverage and value counts over all fingerprints,
+    - the value sets of its device, and the change counters of the device attributes,
+    - the latest fingerprint distributions: the previous latest fingerprint of the device is retired.
+
+    The checkpoint is a snapshot of the state (checkpoint_path) and a journal (checkpoint_path + JOURNAL_SUFFIX)
+    of the value hashes of the fingerprints applied after it: saving a batch appends its fingerprints to the
+    journal, and the snapshot is only written again once the journal holds as many fingerprints as the snapshot,
+    so saving costs a constant time per fingerprint on average.
+    """
+    def __init__(self):
+        self.total_fingerprints = 0
+        self.files = set()
+        self.attributes_stats = {}
+        # device id -> number of fingerprints, value hashes per attribute and latest fingerprint
+        self.devices = {}
+        self.changes = {}
+        self.distributions = {}
+        # Fingerprints applied since the last save, and the ones in the journal of the checkpoint
+        self.journal = []
+        self.journal_size = 0
+
+    @property
+    def device_ids(self):
+        return self.devices.keys()
+
+    def apply(self, filename, data):
+        """Add one prepared fingerprint, returns False if it was already applied."""
+        if filename in self.files:
+            return False
+        hashes = {key: hash_value(value) for key, value in data.items()}
+        # Empty values are not counted by the stability and entropy steps
+        empty = [key for key, value in data.items() if not value]
+        return self.apply_hashes(filename, data.get(DEVICE_ID_ATTRIBUTE, ""), data.get("timestamp", 0), hashes, empty)
+
+    def apply_hashes(self, filename, device_id, timestamp, hashes, empty=()):
+        """Add one fingerprint given by the hashes of its values and its attributes with an empty value (a journal entry)."""
+        if filename in self.files:
+            return False
+        self.files.add(filename)
+        self.journal.append([filename, device_id, timestamp, hashes, list(empty)])
+        self.total_fingerprints += 1
+
+        for key, value_hash in hashes.items():
+            stats = self.attributes_stats.get(key)
+            if stats is None:
+                stats = self.attributes_stats[key] = {"coverage": 0, "values": {}}
+            stats["coverage"] += 1
+            stats["values"][value_hash] = stats["values"].get(value_hash, 0) + 1
+        if empty:
+            empty = set(empty)
+            hashed = {key: value_hash for key, value_hash in hashes.items() if key not in empty}
+        else:
+            hashed = hashes
+
+        device = self.devices.get(device_id)
+        if device is None:
+            device = self.devices[device_id] = {"fingerprints": 0, "values": {}, "latest": None}
+        # The change counters depend on the number of fingerprints of the device: replace its contribution
+        if device["fingerprints"] >= 2:
+            self.__update_changes(device, -1)
+        device["fingerprints"] += 1
+        for key, value_hash in hashed.items():
+            device["values"].setdefault(key, set()).add(value_hash)
+        if device["fingerprints"] >= 2:
+            self.__update_changes(device, 1)
+
+        latest = device["latest"]
+        if latest is None or timestamp >= latest["timestamp"]:
+            if latest is not None:
+                self.__update_distributions(latest["values"], -1)
+            self.__update_distributions(hashed, 1)
+            device["latest"] = {"filename": filename, "timestamp": timestamp, "values": hashed}
+        return True
+
+    def apply_delta(self, fingerprints):
+        """Add an iterable of (filename, data) fingerprints, returns the number of new ones."""
+        return sum(1 for filename, data in fingerprints if self.apply(filename, data))
+
+    def apply_folder(self, folder_path, report_every=1000):
+        """Add the prepared fingerprints of folder_path that were not applied yet."""
+        applied = 0
+        new_files = [filename for filename in list_prepared_files(folder_path) if filename not in self.files]
+        for filename, data in iter_prepared_fingerprints(folder_path, new_files):
+            self.apply(filename, data)
+            applied += 1
+            if report_every and applied % report_every == 0:
+                print(f"{applied} -- {filename}")
+        return applied
+
+    def __update_changes(self, device, sign):
+        for key, values in device["values"].items():
+            info = self.changes.get(key)
+            if info is None:
+                info = self.changes[key] = {
+                    "Change_values_Count": 0,
+                    "Change_devices_Count": 0,
+                    "Fingerprint_Count": 0,
+                    "Devices_count": 0
+                }
+            change_count = len(values) - 1
+            info["Change_values_Count"] += sign * change_count
+            if change_count > 0:
+                info["Change_devices_Count"] += sign
+            info["Fingerprint_Count"] += sign * device["fingerprints"]
+            info["Devices_count"] += sign
+
+    def __update_distributions(self, hashed, sign):
+        for key, value_hash in hashed.items():
+            distribution = self.distributions.get(key)
+            if distribution is None:
+                distribution = self.distributions[key] = {"coverage": 0, "values": {}}
+            new_count = distribution["values"].get(value_hash, 0) + sign
+            distribution["coverage"] += sign
+            if new_count:
+                distribution["values"][value_hash] = new_count
+            else:
+                del distribution["values"][value_hash]
+            if not distribution["coverage"]:
+                del self.distributions[key]
+
+    def attribute_changes(self, attributes):
+        return {
+            attribute: self.changes[attribute] for attribute in attributes
+            if attribute in self.changes and self.changes[attribute]["Devices_count"] > 0
+        }
+
+    def is_stable(self, attribute):
+        """(IsStable, IsAllStable) of the stability step, None if no device counts for the attribute."""
+        info = self.attribute_changes([attribute]).get(attribute)
+        if info is None:
+            return None
+        return info["Change_devices_Count"] < info["Devices_count"], info["Change_devices_Count"] == 0
+
+    def entropy(self, attribute):
+        """Shannon and normalized entropy of the attribute over the latest fingerprints, from the integer value counts."""
+        distribution = self.distributions.get(attribute)
+        if distribution is None or not self.devices:
+            return 0.0, 0
+        return compute_entropy(distribution["values"], len(self.devices))
+
+    def entropies(self):
+        """Cardinality, unique values, coverage and entropies of every attribute over the latest fingerprints."""
+        entropies = {}
+        for attribute, distribution in self.distributions.items():
+            entropy, normalized_entropy = self.entropy(attribute)
+            entropies[attribute] = {
+                "Cardinality": len(distribution["values"]),
+                "Unique Values": compute_unique_values(distribution["values"]),
+                "Coverage": distribution["coverage"],
+                "Shannon Entropy": entropy,
+                "Normalized Entropy": normalized_entropy
+            }
+        return entropies
+
+    def save(self, checkpoint_path):
+        """
+        Save the fingerprints applied since the last save: appended to the journal, or with a new snapshot
+        (written through a temporary file, never leaving a truncated checkpoint) once the journal is as large.
+        """
+        journal_path = checkpoint_path + JOURNAL_SUFFIX
+        journal_size = self.journal_size + len(self.journal)
+        if os.path.exists(checkpoint_path) and journal_size < self.total_fingerprints - journal_size:
+            with open(journal_path, 'a') as journal_file:
+                for entry in self.journal:
+                    journal_file.write(json.dumps(entry, separators=(',', ':')) + "\n")
+            self.journal_size = journal_size
+            self.journal = []
+            return
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "total_fingerprints": self.total_fingerprints,
+            "files": sorted(self.files),
+            "attributes_stats": self.attributes_stats,
+            "devices": {
+                device_id: {
+                    "fingerprints": device["fingerprints"],
+                    "values": {key: sorted(values) for key, values in device["values"].items()},
+                    "latest": device["latest"]
+                }
+                for device_id, device in self.devices.items()
+            },
+            "changes": self.changes,
+            "distributions": self.distributions,
+        }
+        with open(checkpoint_path + ".tmp", 'w') as checkpoint_file:
+            json.dump(state, checkpoint_file)
+        os.replace(checkpoint_path + ".tmp", checkpoint_path)
+        # Entries of the snapshot left in the journal by a killed process are skipped when it is read
+        open(journal_path, 'w').close()
+        self.journal_size = 0
+        self.journal = []
+
+    @classmethod
+    def load(cls, checkpoint_path):
+        """State saved in checkpoint_path and its journal, or an empty state if there is no checkpoint yet."""
+        from fingerprint_preparation.record_store import iter_complete_lines, truncate_partial_line
+        stats = cls()
+        if not os.path.exists(checkpoint_path):
+            return stats
+        with open(checkpoint_path, 'r') as checkpoint_file:
+            state = json.load(checkpoint_file)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {state.get('version')} in {checkpoint_path}")
+        stats.total_fingerprints = state["total_fingerprints"]
+        stats.files = set(state["files"])
+        stats.attributes_stats = state["attributes_stats"]
+        stats.devices = {
+            device_id: {
+                "fingerprints": device["fingerprints"],
+                "values": {key: set(values) for key, values in device["values"].items()},
+                "latest": device["latest"]
+            }
+            for device_id, device in state["devices"].items()
+        }
+        stats.changes = state["changes"]
+        stats.distributions = state["distributions"]
+
+        journal_path = checkpoint_path + JOURNAL_SUFFIX
+        if os.path.exists(journal_path):
+            # An entry cut by a killed process is dropped, the next entries are appended after the complete ones
+            truncate_partial_line(journal_path)
+            with open(journal_path, 'r') as journal_file:
+                for line in iter_complete_lines(journal_file):
+                    stats.apply_hashes(*json.loads(line))
+                    stats.journal_size += 1
+        stats.journal = []
+        return stats
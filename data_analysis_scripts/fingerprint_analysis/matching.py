@@ -0,0 +1,228 @@
+"""
+Re-identification of devices: match a prepared fingerprint against the known devices of a corpus.
+
+The index keeps the latest fingerprint of every device over the stable high entropy attributes
+(top_cleaned_all_stable_attribute_entropies.csv), as:
+- an inverted index (attribute, value hash) -> devices having that value,
+- a forward column per attribute, the value hash of every device.
+A query scores the devices sharing its values, an attribute weighting its Normalized Entropy. Its values
+are visited rarest first (shortest posting first): once k candidates are known and a device seen in
+none of the visited postings can no longer reach the k-th score (or min_score), the remaining (common)
+values only update the candidates through the forward columns instead of walking their postings.
+"""
+import os
+import csv
+import json
+import heapq
+from array import array
+import numpy as np
+from fingerprint_analysis.columnar import DEVICE_ID_ATTRIBUTE, iter_prepared_fingerprints
+from fingerprint_analysis.hashing import hash_value64
+
+WEIGHT_COLUMN = "Normalized Entropy"
+# Identifiers are not matched on, a device is re-identified from its other attributes
+EXCLUDED_ATTRIBUTES = (DEVICE_ID_ATTRIBUTE, "uuid", "timestamp")
+# Value hash of the devices not having an attribute
+MISSING_HASH = -(1 << 63)
+# Devices matching less than this share of the weight of a fingerprint are not returned
+MIN_SCORE = 0.5
+META_FILE = "index.json"
+COLUMNS_FILE = "columns.npy"
+
+
+def load_attribute_weights(csv_path, exclude=EXCLUDED_ATTRIBUTES):
+    """Attribute -> Normalized Entropy of an entropies CSV written by the cleaning step."""
+    weights = {}
+    with open(csv_path, mode='r', newline='') as csv_file:
+        for row in csv.DictReader(csv_file):
+            if row["Attribute"] not in exclude:
+                weights[row["Attribute"]] = float(row[WEIGHT_COLUMN])
+    return weights
+
+
+class FingerprintIndex:
+    """
+    Devices indexed by the weighted attributes of their latest fingerprint.
+    Postings are a single device id or an array of device ids, most values belonging to one device.
+    """
+    def __init__(self, weights):
+        self.attributes = list(weights)
+        self.weights = [weights[attribute] for attribute in self.attributes]
+        self.devices = []
+        self.device_index = {}
+        self.timestamps = array('q')
+        self.columns = [array('q') for _ in self.attributes]
+        self.postings = [{} for _ in self.attributes]
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __contains__(self, device_id):
+        return device_id in self.device_index
+
+    def value_hashes(self, fingerprint):
+        """Value hash per attribute of a fingerprint, MISSING_HASH where it has no (or an empty) value."""
+        hashes = []
+        for attribute in self.attributes:
+            value = fingerprint.get(attribute)
+            # Empty values are not counted, like in the cleaning steps
+            hashes.append(hash_value64(value) if value else MISSING_HASH)
+        return hashes
+
+    def add_posting(self, j, value_hash, device):
+        postings = self.postings[j]
+        posting = postings.get(value_hash)
+        if posting is None:
+            postings[value_hash] = device
+        elif isinstance(posting, int):
+            postings[value_hash] = array('q', (posting, device))
+        else:
+            posting.append(device)
+
+    def remove_posting(self, j, value_hash, device):
+        postings = self.postings[j]
+        posting = postings[value_hash]
+        if isinstance(posting, int):
+            del postings[value_hash]
+        else:
+            posting.remove(device)
+            if len(posting) == 1:
+                postings[value_hash] = posting[0]
+
+    def add(self, device_id, fingerprint, timestamp=None):
+        """
+        Insert a device, or replace the indexed fingerprint of a known device if this one is not older.
+        Returns False if an older fingerprint was ignored.
+        """
+        timestamp = int(fingerprint.get("timestamp", 0) if timestamp is None else timestamp)
+        hashes = self.value_hashes(fingerprint)
+        device = self.device_index.get(device_id)
+        if device is None:
+            device = self.device_index[device_id] = len(self.devices)
+            self.devices.append(device_id)
+            self.timestamps.append(timestamp)
+            for j, value_hash in enumerate(hashes):
+                self.columns[j].append(value_hash)
+                if value_hash != MISSING_HASH:
+                    self.add_posting(j, value_hash, device)
+            return True
+        if timestamp < self.timestamps[device]:
+            return False
+        self.timestamps[device] = timestamp
+        for j, value_hash in enumerate(hashes):
+            column = self.columns[j]
+            previous_hash = column[device]
+            if previous_hash == value_hash:
+                continue
+            if previous_hash != MISSING_HASH:
+                self.remove_posting(j, previous_hash, device)
+            if value_hash != MISSING_HASH:
+                self.add_posting(j, value_hash, device)
+            column[device] = value_hash
+        return True
+
+    def query_hashes(self, hashes, k=10, min_score=MIN_SCORE):
+        """Top k (device id, score) of the value hashes of a fingerprint (see query)."""
+        terms = []
+        total_weight = 0.0
+        for j, value_hash in enumerate(hashes):
+            if value_hash == MISSING_HASH:
+                continue
+            total_weight += self.weights[j]
+            posting = self.postings[j].get(value_hash)
+            if posting is not None:
+                terms.append((1 if isinstance(posting, int) else len(posting), j, value_hash, posting))
+        if not terms or total_weight <= 0:
+            return []
+        # Rarest values first
+        terms.sort(key=lambda term: term[0])
+        remaining = sum(self.weights[j] for _, j, _, _ in terms)
+        min_weight = min_score * total_weight
+        scores = {}
+        for _, j, value_hash, posting in terms:
+            weight = self.weights[j]
+            remaining -= weight
+            if weight + remaining < min_weight or (len(scores) >= k and weight + remaining < heapq.nlargest(k, scores.values())[-1]):
+                # No new device can enter the top k: only the candidates are scored
+                column = self.columns[j]
+                for device in scores:
+                    if column[device] == value_hash:
+                        scores[device] += weight
+            elif isinstance(posting, int):
+                scores[posting] = scores.get(posting, 0.0) + weight
+            else:
+                for device in posting:
+                    scores[device] = scores.get(device, 0.0) + weight
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.devices[device], min(score / total_weight, 1.0)) for device, score in best if score >= min_weight]
+
+    def query(self, fingerprint, k=10, min_score=MIN_SCORE):
+        """
+        Top k devices matching a prepared fingerprint, as (device id, score) best first.
+        The score is the weight of the matching attributes over the weight of the attributes of the fingerprint (0 to 1),
+        devices scoring less than min_score are left out. min_score=0 returns the exact top k of every device, but walks
+        the postings of the common values.
+        """
+        return self.query_hashes(self.value_hashes(fingerprint), k, min_score)
+
+    def query_batch(self, fingerprints, k=10, min_score=MIN_SCORE):
+        """query of every fingerprint of an iterable, values shared by several fingerprints are hashed once."""
+        hash_cache = {}
+        results = []
+        for fingerprint in fingerprints:
+            hashes = []
+            for attribute in self.attributes:
+                value = fingerprint.get(attribute)
+                if not value:
+                    hashes.append(MISSING_HASH)
+                    continue
+                # typed like the hashing caches: True, 1 and 1.0 are equal keys but have different hashes
+                key = (attribute, type(value), value) if isinstance(value, (str, int, float)) else None
+                value_hash = hash_cache.get(key) if key is not None else None
+                if value_hash is None:
+                    value_hash = hash_value64(value)
+                    if key is not None:
+                        hash_cache[key] = value_hash
+                hashes.append(value_hash)
+            results.append(self.query_hashes(hashes, k, min_score))
+        return results
+
+    def save(self, output_dir):
+        """Write the index (devices, weights and forward columns), the postings are rebuilt by load."""
+        os.makedirs(output_dir, exist_ok=True)
+        columns = np.empty((len(self.devices), len(self.attributes)), dtype=np.int64)
+        for j, column in enumerate(self.columns):
+            columns[:, j] = np.frombuffer(column, dtype=np.int64)
+        np.save(os.path.join(output_dir, COLUMNS_FILE), columns)
+        with open(os.path.join(output_dir, META_FILE), 'w') as meta_file:
+            json.dump({
+                "weights": dict(zip(self.attributes, self.weights)),
+                "devices": self.devices,
+                "timestamps": list(self.timestamps),
+            }, meta_file)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, META_FILE), 'r') as meta_file:
+            meta = json.load(meta_file)
+        index = cls(meta["weights"])
+        index.devices = meta["devices"]
+        index.device_index = {device_id: device for device, device_id in enumerate(index.devices)}
+        index.timestamps = array('q', meta["timestamps"])
+        columns = np.load(os.path.join(path, COLUMNS_FILE))
+        for j in range(len(index.attributes)):
+            index.columns[j] = array('q', columns[:, j].tobytes())
+            for device, value_hash in enumerate(index.columns[j]):
+                if value_hash != MISSING_HASH:
+                    index.add_posting(j, value_hash, device)
+        return index
+
+
+def build_fingerprint_index(folder_path, entropies_csv, files=None, report_every=100000):
+    """Index of the latest fingerprint of every device of a prepare directory (or record store)."""
+    index = FingerprintIndex(load_attribute_weights(entropies_csv))
+    for count, (filename, data) in enumerate(iter_prepared_fingerprints(folder_path, files), 1):
+        index.add(str(data.get(DEVICE_ID_ATTRIBUTE, "")), data)
+        if report_every and count % report_every == 0:
+            print(f"{count} -- {filename}")
+    return index
@@ -0,0 +1,107 @@
+import hashlib
+import numpy as np
+from fingerprint_analysis.columnar import MISSING
+
+# MinHash functions of the near redundancy mode, and the LSH bands they are split into
+NB_PERMUTATIONS = 128
+NB_BANDS = 32
+
+
+def canonical_labels(codes):
+    """
+    Relabeling invariant form of the partition induced by codes: every row gets the rank of its
+    value by first appearance. Two attributes splitting the rows the same way get equal labels,
+    whatever their values.
+    """
+    _, first_rows, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    order = np.argsort(first_rows, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[inverse.ravel()]
+
+def partition_signature(labels):
+    return hashlib.blake2b(np.ascontiguousarray(labels, dtype=np.int64).tobytes(), digest_size=16).digest()
+
+def partition_codes(matrix, attribute, rows=None, truthy=True):
+    """Codes of attribute over rows, with absent (and falsy if truthy is set) values as a single MISSING value."""
+    codes = np.array(matrix.codes(attribute, rows), dtype=np.int64)
+    codes[~matrix.present(attribute, rows, truthy)] = MISSING
+    return codes
+
+
+def find_redundant_attributes(matrix, attributes, rows=None, truthy=True):
+    """
+    Groups of attributes inducing the same partition of the rows (one fingerprint per device).
+    Partitions are indexed by the hash of their canonical labels, so the search is linear in
+    attributes x rows. Groups keep the order of attributes and only groups of 2 or more are returned.
+    """
+    index = {}
+    for attribute in attributes:
+        labels = canonical_labels(partition_codes(matrix, attribute, rows, truthy))
+        buckets = index.setdefault(partition_signature(labels), [])
+        # Labels are compared on a hash match, a hash collision starts a new group
+        for bucket_labels, group in buckets:
+            if np.array_equal(bucket_labels, labels):
+                group.append(attribute)
+                break
+        else:
+            buckets.append((labels, [attribute]))
+    return [group for buckets in index.values() for _, group in buckets if len(group) > 1]
+
+def remove_redundant_attributes(matrix, attributes, rows=None, truthy=True):
+    """Keep the first attribute of every group of attributes inducing the same partition of the rows."""
+    redundant = set()
+    for group in find_redundant_attributes(matrix, attributes, rows, truthy):
+        redundant.update(group[1:])
+    return [attribute for attribute in attributes if attribute not in redundant]
+
+
+def minhash_signature(labels, seeds):
+    """
+    MinHash of the set of (row, first row of its group) pairs: its Jaccard similarity between two
+    partitions is the share of rows grouped with the same first row by both.
+    """
+    first_rows = np.full(int(labels.max(initial=-1)) + 1, len(labels), dtype=np.int64)
+    np.minimum.at(first_rows, labels, np.arange(len(labels)))
+    elements = np.arange(len(labels), dtype=np.uint64) * np.uint64(len(labels)) + first_rows[labels].astype(np.uint64)
+    signature = np.empty(len(seeds), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for i, (a, b) in enumerate(seeds):
+            # Multiply-add-shift hashing, uint64 products wrap around
+            signature[i] = ((elements * a + b) >> np.uint64(32)).min(initial=np.iinfo(np.uint64).max)
+    return signature
+
+def find_near_redundant_attributes(matrix, attributes, threshold=0.9, rows=None, truthy=True,
+                                   nb_permutations=NB_PERMUTATIONS, nb_bands=NB_BANDS, seed=0):
+    """
+    Pairs of attributes inducing nearly the same partition of the rows, as (attribute, attribute, similarity)
+    with an estimated similarity of at least threshold, most similar first.
+    Candidate pairs come from LSH buckets over MinHash bands, so not every pair of attributes is compared.
+    """
+    rng = np.random.default_rng(seed)
+    # Odd multipliers
+    seeds = [(a | np.uint64(1), b) for a, b in rng.integers(0, np.iinfo(np.uint64).max, size=(nb_permutations, 2), dtype=np.uint64, endpoint=True)]
+    band_size = nb_permutations // nb_bands
+    signatures = {
+        attribute: minhash_signature(canonical_labels(partition_codes(matrix, attribute, rows, truthy)), seeds)
+        for attribute in attributes
+    }
+
+    candidates = set()
+    for band in range(nb_bands):
+        buckets = {}
+        for attribute, signature in signatures.items():
+            buckets.setdefault(signature[band * band_size:(band + 1) * band_size].tobytes(), []).append(attribute)
+        for bucket in buckets.values():
+            for i, first in enumerate(bucket):
+                for second in bucket[i + 1:]:
+                    candidates.add((first, second))
+
+    pairs = []
+    for first, second in candidates:
+        similarity = float(np.mean(signatures[first] == signatures[second]))
+        if similarity >= threshold:
+            pairs.append((first, second, similarity))
+    order = {attribute: i for i, attribute in enumerate(attributes)}
+    pairs.sort(key=lambda pair: (-pair[2], order[pair[0]], order[pair[1]]))
+    return pairs
@@ -0,0 +1,254 @@
+"""
+Fixed memory sketches of the value distribution of an attribute, for corpora whose exact value sets do not fit in RAM.
+
+An AttributeSketch is fed the 64 bits hash of every value and combines:
+- a HyperLogLog: number of distinct values, relative standard error 1.04 / sqrt(2 ** precision),
+- Misra-Gries heavy hitters: counts of the frequent values, each one underestimated by at most `error`,
+  the entropy is estimated from them with the rest of the mass spread over the other distinct values,
+- a bottom-k sample (the sample_size smallest hashes with their exact counts): the share of values seen
+  once, so the number of unique values. Below sample_size distinct values, every statistic is exact.
+Every sketch is mergeable: sketches of partitions of a corpus merge into the sketch of the whole corpus.
+With the default parameters, a sketch takes about 50 kB whatever the number of values.
+"""
+import math
+import heapq
+import base64
+import hashlib
+import numpy as np
+from fingerprint_analysis.hashing import hash_value
+
+MASK64 = (1 << 64) - 1
+HLL_PRECISION = 12
+HEAVY_HITTERS = 64
+SAMPLE_SIZE = 256
+
+
+def sketch_hash(value):
+    """Unsigned 64 bits hash of a value, from the same digest as hash_value."""
+    return int.from_bytes(base64.urlsafe_b64decode(hash_value(value))[:8], "little")
+
+
+def entropy_term(count, total):
+    return -(count / total) * math.log2(count / total) if count > 0 else 0.0
+
+def entropy_of(counts, total):
+    return sum(entropy_term(count, total) for count in counts)
+
+
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, h):
+        index = h >> (64 - self.precision)
+        rest = (h << self.precision) & MASK64
+        rank = 65 - self.precision if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(np.maximum(np.frombuffer(self.registers, dtype=np.uint8), np.frombuffer(other.registers, dtype=np.uint8)).tobytes())
+        return self
+
+    def estimate(self):
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return estimate
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(1 << self.precision)
+
+
+class MisraGries:
+    """
+    Heavy hitters: at most 2k counters, reduced to k by subtracting the (k+1)-th largest count from all of them.
+    A counted value is underestimated by at most error, a value without counter has at most error occurrences.
+    """
+    def __init__(self, k=HEAVY_HITTERS):
+        self.k = k
+        self.counters = {}
+        self.error = 0
+
+    def add(self, h, count=1):
+        self.counters[h] = self.counters.get(h, 0) + count
+        if len(self.counters) > 2 * self.k:
+            self.reduce()
+
+    def reduce(self):
+        if len(self.counters) <= self.k:
+            return
+        threshold = heapq.nlargest(self.k + 1, self.counters.values())[-1]
+        self.error += threshold
+        self.counters = {h: count - threshold for h, count in self.counters.items() if count > threshold}
+
+    def merge(self, other):
+        for h, count in other.counters.items():
+            self.counters[h] = self.counters.get(h, 0) + count
+        self.error += other.error
+        self.reduce()
+        return self
+
+
+class BottomK:
+    """The k smallest hashes seen with their exact counts (a uniform sample of the distinct values)."""
+    def __init__(self, k=SAMPLE_SIZE):
+        self.k = k
+        self.counts = {}
+        # Negated hashes, the largest sampled hash first
+        self.heap = []
+
+    def add(self, h, count=1):
+        counts = self.counts
+        if h in counts:
+            counts[h] += count
+        elif len(counts) < self.k:
+            counts[h] = count
+            heapq.heappush(self.heap, -h)
+        elif h < -self.heap[0]:
+            del counts[-heapq.heapreplace(self.heap, -h)]
+            counts[h] = count
+
+    def merge(self, other):
+        for h, count in other.counts.items():
+            self.add(h, count)
+        return self
+
+    @property
+    def complete(self):
+        """True if every distinct value is in the sample."""
+        return len(self.counts) < self.k
+
+
+class AttributeSketch:
+    """Sketch of the value distribution of an attribute (see the module docstring)."""
+    def __init__(self, precision=HLL_PRECISION, heavy_hitters=HEAVY_HITTERS, sample_size=SAMPLE_SIZE):
+        self.coverage = 0
+        self.hll = HyperLogLog(precision)
+        self.heavy = MisraGries(heavy_hitters)
+        self.sample = BottomK(sample_size)
+
+    def add(self, h):
+        self.coverage += 1
+        self.hll.add(h)
+        self.heavy.add(h)
+        self.sample.add(h)
+
+    def merge(self, other):
+        self.coverage += other.coverage
+        self.hll.merge(other.hll)
+        self.heavy.merge(other.heavy)
+        self.sample.merge(other.sample)
+        return self
+
+    def cardinality(self):
+        """(estimate, standard error) of the number of distinct values."""
+        if self.sample.complete:
+            return float(len(self.sample.counts)), 0.0
+        # There are at most as many distinct values as values
+        estimate = min(max(self.hll.estimate(), float(len(self.sample.counts))), float(self.coverage))
+        return estimate, estimate * self.hll.relative_error
+
+    def __len__(self):
+        """Estimated number of distinct values, like the len() of an exact value set."""
+        return int(round(self.cardinality()[0]))
+
+    def all_distinct(self):
+        """
+        True if no value was seen twice: exact below sample_size distinct values, else from the sample
+        (a uniform sample of the distinct values, none of them seen twice).
+        """
+        return all(count == 1 for count in self.sample.counts.values())
+
+    def unique_values(self):
+        """(estimate, standard error) of the number of values seen once."""
+        counts = self.sample.counts
+        singletons = sum(1 for count in counts.values() if count == 1)
+        if self.sample.complete:
+            return float(singletons), 0.0
+        share = singletons / len(counts)
+        cardinality, cardinality_error = self.cardinality()
+        sampling_error = math.sqrt(share * (1 - share) / len(counts)) * cardinality
+        return share * cardinality, math.hypot(sampling_error, share * cardinality_error)
+
+    def entropy(self, total):
+        """
+        (estimate, low, high) of the Shannon entropy of the counts over total, like compute_entropy.
+        The frequent values are counted by the heavy hitters, the other values are counted like the sampled values
+        that are not heavy hitters. low is a sure bound: the heavy hitters get their largest
+        possible counts and the rest is as concentrated as their error allows. high spreads the rest evenly
+        over the high (+3 standard errors) estimate of the number of other values.
+        """
+        if total <= 0 or self.coverage == 0:
+            return 0.0, 0.0, 0.0
+        if self.sample.complete:
+            entropy = entropy_of(self.sample.counts.values(), total)
+            return entropy, entropy, entropy
+        heavy = self.heavy.counters
+        entropy = entropy_of(heavy.values(), total)
+        rest = self.coverage - sum(heavy.values())
+        if rest <= 0:
+            return entropy, entropy, entropy
+        cardinality, error = self.cardinality()
+        others_high = min(max(cardinality + 3 * error - len(heavy), 1.0), rest)
+        high = entropy + others_high * entropy_term(rest / others_high, total)
+
+        # Values seen at most error times more than counted
+        largest = max(self.heavy.error, 1)
+        left = rest
+        counts = []
+        for count in sorted(heavy.values(), reverse=True):
+            counts.append(count + min(largest, left))
+            left -= min(largest, left)
+        low = entropy_of(counts, total) + (left // largest) * entropy_term(largest, total) + entropy_term(left % largest, total)
+
+        tail = [count for h, count in self.sample.counts.items() if h not in heavy]
+        if tail:
+            # Mass of the other values: their number times the mean count of the sampled ones. The heavy hitters
+            # are undercounted by the same amount (decrements are applied to all the counters), they get the rest.
+            tail_mass = min(max(cardinality - len(heavy), 1.0) * sum(tail) / len(tail), rest)
+            undercount = min((rest - tail_mass) / len(heavy), largest) if heavy else 0
+            tail_mass = rest - undercount * len(heavy)
+            estimate = entropy_of((count + undercount for count in heavy.values()), total) + tail_mass / sum(tail) * entropy_of(tail, total)
+        else:
+            others = min(max(cardinality - len(heavy), 1.0), rest)
+            estimate = entropy + others * entropy_term(rest / others, total)
+        return min(max(estimate, low), high), low, high
+
+    def signature(self):
+        """Digest of the order independent parts of the sketch, equal for equal distributions."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(self.coverage).encode())
+        digest.update(bytes(self.hll.registers))
+        digest.update(repr(sorted(self.sample.counts.items())).encode())
+        return digest.hexdigest()
+
+    def to_dict(self):
+        return {
+            "coverage": self.coverage,
+            "registers": base64.b64encode(bytes(self.hll.registers)).decode(),
+            "heavy": [[h, count] for h, count in self.heavy.counters.items()],
+            "heavy_error": self.heavy.error,
+            "sample": [[h, count] for h, count in self.sample.counts.items()],
+            "sample_size": self.sample.k,
+            "heavy_hitters": self.heavy.k,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        registers = base64.b64decode(state["registers"])
+        sketch = cls(int(math.log2(len(registers))), state["heavy_hitters"], state["sample_size"])
+        sketch.coverage = state["coverage"]
+        sketch.hll.registers = bytearray(registers)
+        sketch.heavy.counters = {h: count for h, count in state["heavy"]}
+        sketch.heavy.error = state["heavy_error"]
+        for h, count in state["sample"]:
+            sketch.sample.add(h, count)
+        return sketch
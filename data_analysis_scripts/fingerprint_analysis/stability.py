@@ -0,0 +1,175 @@
+"""
+Stability of the attributes over time, from the device index of the columnar store (AttributeMatrix.device_index:
+the fingerprints of every device sorted by timestamp).
+
+A DeviceTimeline is the fingerprints of the devices over a time window (the whole corpus by default), as one
+array of rows grouped by device and sorted by timestamp. Every statistic is computed with array operations over
+the codes of an attribute in that order:
+- the change counts of the cleaning step 3 (distinct values per device minus one),
+- transitions: consecutive fingerprints of a device with different values,
+- the days from the first fingerprint of a device to its first transition, and the transitions per day,
+- the latest fingerprint of every device (the selected fingerprints of the cleaning and uniqueness steps).
+Empty values are not counted, like in the cleaning steps. sliding_window_stability repeats it over time windows.
+"""
+import csv
+import numpy as np
+
+DAY_SECONDS = 86400
+# Fingerprints a device needs to count for stability
+MIN_FINGERPRINTS = 2
+
+
+def timestamp_seconds(timestamps):
+    """Timestamps in seconds, prepared timestamps being in milliseconds (or in seconds for old archives)."""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    return np.where(timestamps > 10**10, timestamps // 1000, timestamps)
+
+
+class DeviceTimeline:
+    """
+    Fingerprints of every device between start and end (timestamps, both included, None for no limit), oldest first,
+    among all the rows of the matrix or the given ones. rows are the matrix rows, group the device of every row
+    (index in device_codes) and offsets the first position of every device in rows.
+    """
+    def __init__(self, matrix, start=None, end=None, rows=None):
+        self.matrix = matrix
+        order, offsets = matrix.device_index()
+        timestamp = np.asarray(matrix.timestamp)
+        in_window = np.ones(len(matrix), dtype=bool)
+        if rows is not None:
+            in_window[:] = False
+            in_window[rows] = True
+        if start is not None:
+            in_window &= timestamp >= start
+        if end is not None:
+            in_window &= timestamp <= end
+        order = np.asarray(order)
+        self.rows = order[in_window[order]]
+        # Fingerprints of every device code in the window, devices without any are dropped
+        counts = np.bincount(np.asarray(matrix.device)[self.rows], minlength=len(offsets) - 1)
+        self.device_codes = np.flatnonzero(counts)
+        self.fingerprint_counts = counts[self.device_codes]
+        self.group = np.repeat(np.arange(len(self.device_codes)), self.fingerprint_counts)
+        self.offsets = np.concatenate(([0], np.cumsum(self.fingerprint_counts)))
+        self.seconds = timestamp_seconds(timestamp[self.rows])
+
+    def __len__(self):
+        """Number of devices."""
+        return len(self.device_codes)
+
+    def device_ids(self, devices=None):
+        devices = self.device_codes if devices is None else self.device_codes[devices]
+        return [self.matrix.devices[code] for code in devices]
+
+    def latest_rows(self):
+        """Row of the latest fingerprint of every device."""
+        return self.rows[self.offsets[1:] - 1]
+
+    def latest_files(self):
+        """Latest fingerprint file of every device (the selected fingerprints)."""
+        return [self.matrix.files[row] for row in self.latest_rows()]
+
+    def stability_files(self, min_fingerprints=MIN_FINGERPRINTS):
+        """Device id -> fingerprint files oldest first, of the devices having at least min_fingerprints (the stability fingerprints)."""
+        files = self.matrix.files
+        return {
+            self.matrix.devices[self.device_codes[device]]: [files[row] for row in self.rows[self.offsets[device]:self.offsets[device + 1]]]
+            for device in np.flatnonzero(self.fingerprint_counts >= min_fingerprints)
+        }
+
+    def attribute_stability(self, attribute, min_fingerprints=MIN_FINGERPRINTS):
+        """
+        Stability of an attribute over the devices having at least min_fingerprints, None if none of them has a value:
+        - Change_values_Count, Change_devices_Count, Fingerprint_Count, Devices_count: as in the cleaning step 3,
+        - Transitions_Count: value changes between consecutive fingerprints, Transition_devices_Count: devices having one,
+        - Median_Days_To_First_Change: over the devices having a transition, from their first fingerprint with a value,
+        - Changes_Per_Day: transitions over the days covered by the fingerprints with a value of every device.
+        """
+        eligible = (self.fingerprint_counts >= min_fingerprints)[self.group]
+        present = eligible & self.matrix.present(attribute, self.rows, truthy=True)
+        if not present.any():
+            return None
+        codes = self.matrix.codes(attribute, self.rows)[present].astype(np.int64)
+        group = self.group[present]
+        seconds = self.seconds[present]
+        nb_devices = len(self.device_codes)
+
+        # Rows are grouped by device: first and last position of every device having a value
+        starts = np.flatnonzero(np.concatenate(([True], group[1:] != group[:-1])))
+        ends = np.concatenate((starts[1:], [len(group)])) - 1
+        device_groups = group[starts]
+
+        # Distinct (device, value) pairs, then number of distinct values per device
+        base = self.matrix.cardinality(attribute) + 1
+        pairs = np.sort(group * base + codes)
+        distinct = np.concatenate(([True], pairs[1:] != pairs[:-1]))
+        changes = np.bincount(pairs[distinct] // base, minlength=nb_devices)[device_groups] - 1
+
+        # Consecutive fingerprints of the same device with different values
+        transition_positions = np.flatnonzero((group[1:] == group[:-1]) & (codes[1:] != codes[:-1])) + 1
+        transition_groups = group[transition_positions]
+        first_of_device = np.ones(len(transition_groups), dtype=bool)
+        first_of_device[1:] = transition_groups[1:] != transition_groups[:-1]
+        first_transitions = transition_positions[first_of_device]
+        changed_devices = group[first_transitions]
+        first_positions = np.zeros(nb_devices, dtype=np.int64)
+        first_positions[device_groups] = starts
+        days_to_first_change = (seconds[first_transitions] - seconds[first_positions[changed_devices]]) / DAY_SECONDS
+        covered_days = float((seconds[ends] - seconds[starts]).sum()) / DAY_SECONDS
+        nb_transitions = len(transition_positions)
+
+        return {
+            "Change_values_Count": int(changes.sum()),
+            "Change_devices_Count": int((changes > 0).sum()),
+            "Fingerprint_Count": int(self.fingerprint_counts[device_groups].sum()),
+            "Devices_count": len(device_groups),
+            "Transitions_Count": nb_transitions,
+            "Transition_devices_Count": len(changed_devices),
+            "Median_Days_To_First_Change": float(np.median(days_to_first_change)) if len(changed_devices) else None,
+            "Changes_Per_Day": nb_transitions / covered_days if covered_days > 0 else None,
+        }
+
+    def stability(self, attributes, min_fingerprints=MIN_FINGERPRINTS):
+        """attribute_stability of every attribute of the matrix having a value on the stability devices."""
+        stability = {}
+        for attribute in attributes:
+            if attribute in self.matrix:
+                info = self.attribute_stability(attribute, min_fingerprints)
+                if info is not None:
+                    stability[attribute] = info
+        return stability
+
+
+def sliding_window_stability(matrix, attributes, window_days, step_days=None, min_fingerprints=MIN_FINGERPRINTS):
+    """
+    (window start, window end, stability) of attributes over windows of window_days, every step_days (window_days
+    by default) from the oldest fingerprint. Start and end are timestamps in the unit of the matrix.
+    """
+    timestamp = np.asarray(matrix.timestamp)
+    if len(timestamp) == 0:
+        return []
+    # Window lengths in the unit of the timestamps
+    unit = 1000 if timestamp.max() > 10**10 else 1
+    window = int(window_days * DAY_SECONDS * unit)
+    step = int((step_days or window_days) * DAY_SECONDS * unit)
+    windows = []
+    start, last = int(timestamp.min()), int(timestamp.max())
+    while True:
+        end = start + window - 1
+        windows.append((start, end, DeviceTimeline(matrix, start, end).stability(attributes, min_fingerprints)))
+        if end >= last:
+            return windows
+        start += step
+
+
+def write_stability_csv(file_path, stability):
+    """Writes the stability CSV of the cleaning step 3, followed by the transition statistics."""
+    with open(file_path, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["Attribute", "Total Value Changes", "Total Device Changes","Coverage Fingerprints", "Coverage Devices", "IsStable", "IsAllStable",
+                         "Total Transitions", "Transition Devices", "Median Days To First Change", "Changes Per Day"])
+        for attribute, info in stability.items():
+            stable = info["Change_devices_Count"] < info["Devices_count"]
+            stableAll = info["Change_devices_Count"] == 0
+            writer.writerow([attribute, info["Change_values_Count"], info["Change_devices_Count"], info["Fingerprint_Count"], info["Devices_count"], stable, stableAll,
+                             info["Transitions_Count"], info["Transition_devices_Count"], info["Median_Days_To_First_Change"], info["Changes_Per_Day"]])
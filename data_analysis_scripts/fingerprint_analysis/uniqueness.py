@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from fingerprint_analysis.hashing import hash_dict
+
+
+def refine(groups, codes):
+    """
+    Split the anonymity sets `groups` (group id per row) with one attribute's codes.
+    Returns the new group ids (0..nb_groups-1, in order of first appearance) and the size of every group.
+    """
+    keys = groups.astype(np.int64) * (int(codes.max(initial=0)) + 2) + (codes.astype(np.int64) + 1)
+    _, first_rows, inverse, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+    # Renumber groups by first appearance, so group ids do not depend on code values
+    order = np.argsort(first_rows, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[inverse], counts[order]
+
+def count_unique(groups, codes):
+    """Number of rows alone in their group once `groups` is refined with codes."""
+    keys = groups.astype(np.int64) * (int(codes.max(initial=0)) + 2) + (codes.astype(np.int64) + 1)
+    _, counts = np.unique(keys, return_counts=True)
+    return int(np.count_nonzero(counts == 1))
+
+def combination_values(matrix, groups, group_sizes, columns):
+    """
+    Values of a combination as stored in fingerprints_combinations_stats: the number of fingerprints
+    per hash of the combination's values, most frequent first (pandas value_counts order).
+    """
+    first_rows = np.full(len(group_sizes), len(groups), dtype=np.int64)
+    np.minimum.at(first_rows, groups, np.arange(len(groups)))
+    values = {}
+    for group in np.argsort(-group_sizes, kind="stable"):
+        row = matrix[first_rows[group], columns]
+        values[hash_dict(tuple(str(code) for code in row))] = int(group_sizes[group])
+    return values
+
+
+class UniquenessSearch:
+    """
+    Greedy search of the attribute combinations maximizing the number of unique fingerprints.
+
+    The fingerprints are kept partitioned into anonymity sets (group id per row): a candidate
+    attribute is scored by refining the current partition with its codes only, instead of
+    rehashing the whole combination for every row. Rows already alone in their group can
+    not be split further and are left out of the scoring.
+    """
+    def __init__(self, matrix, attributes):
+        # matrix: rows x attributes integer codes (AttributeMatrix.matrix)
+        self.matrix = np.ascontiguousarray(matrix)
+        self.attributes = list(attributes)
+        self.columns = {attribute: j for j, attribute in enumerate(self.attributes)}
+
+    @classmethod
+    def from_frame(cls, fingerprints_df, attributes):
+        return cls(fingerprints_df[list(attributes)].to_numpy(), attributes)
+
+    def score(self, groups, active, attribute):
+        """Number of unique rows among the active ones after adding attribute."""
+        return count_unique(groups[active], self.matrix[active, self.columns[attribute]])
+
+    def greedy(self, nb_attributes, attribute_pool=None, workers=None, verbose=True):
+        """
+        Returns the fingerprints_combinations_stats of the notebook: for k = 1..nb_attributes,
+        the coverage, the distribution of the combination values and the selected attributes.
+        Like the notebook, the first candidate with the strictly highest count wins a step.
+        """
+        attribute_pool = list(self.attributes if attribute_pool is None else attribute_pool)
+        nb_rows = len(self.matrix)
+        groups = np.zeros(nb_rows, dtype=np.int64)
+        group_sizes = np.array([nb_rows], dtype=np.int64)
+        selected_combo = []
+        fingerprints_combinations_stats = {}
+        executor = ThreadPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+        try:
+            for k in range(1, min(nb_attributes, len(attribute_pool)) + 1):
+                # Rows alone in their group stay unique whatever the next attributes
+                active = group_sizes[groups] > 1
+                already_unique = nb_rows - int(np.count_nonzero(active))
+                candidates = [attr for attr in attribute_pool if attr not in selected_combo]
+                if executor is not None:
+                    scores = list(executor.map(lambda attr: self.score(groups, active, attr), candidates))
+                else:
+                    scores = [self.score(groups, active, attr) for attr in candidates]
+
+                best_attr = None
+                max_unique = 0
+                for attr, unique_count in zip(candidates, scores):
+                    if already_unique + unique_count > max_unique:
+                        max_unique = already_unique + unique_count
+                        best_attr = attr
+                if best_attr is None:
+                    # No candidate makes any fingerprint unique
+                    break
+
+                selected_combo.append(best_attr)
+                groups, group_sizes = refine(groups, self.matrix[:, self.columns[best_attr]])
+                fingerprints_combinations_stats[str(k)] = {
+                    "coverage": nb_rows,
+                    "values": combination_values(self.matrix, groups, group_sizes, [self.columns[attr] for attr in selected_combo]),
+                    "attributes": selected_combo.copy()
+                }
+                if verbose:
+                    print(f"Top {k} attributes having {max_unique} unique values:", selected_combo)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return fingerprints_combinations_stats
+
+
+def greedy_uniqueness_search(fingerprints_df, attribute_pool, nb_attributes, workers=None, verbose=True):
+    """Greedy search over the attribute columns of fingerprints_df (see UniquenessSearch.greedy)."""
+    search = UniquenessSearch.from_frame(fingerprints_df, attribute_pool)
+    return search.greedy(nb_attributes, workers=workers, verbose=verbose)
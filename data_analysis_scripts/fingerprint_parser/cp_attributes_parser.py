@@ -1,4 +1,8 @@
+from fingerprint_parser.instrumentation import parse_failed
+
 class CpAttributeParser:  
+    # Increment when the parsed values change, cached content provider attributes are parsed again
+    VERSION = 1
     SETTINGS_CP_ATTRIBUTES = [
         "content://settings/system/alarm_alert", "content://settings/system/notification_sound", 
         "content://settings/secure", "content://settings/global","content://settings/system",
@@ -21,6 +25,7 @@ class CpAttributeParser:
                 # Just mark it as not empty
                 return 1
         except Exception as e:
+            parse_failed()
             return None
     
     @staticmethod
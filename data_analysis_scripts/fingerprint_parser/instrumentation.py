@@ -0,0 +1,240 @@
+"""
+Opt-in instrumentation of the attribute parsers.
+
+enable() wraps ShellAttributeParser.parse, SdkAttributeParser.parse and CpAttributeParser.parse, and the
+branches they dispatch to (shell fast paths, jc, log scanner, SDK value types), to record per
+(family, attribute key, branch): calls, cumulative time, a latency histogram (for the p99), input size,
+empty results and the exceptions raised or swallowed by the parsers, by type.
+Nothing is wrapped while it is disabled, the parsers only call parse_failed() when they swallow an exception.
+
+Statistics are kept per process: pool workers send collect() to the parent process, which merges them
+into a ParseStats (see fingerprint_preparation.ingestion) and writes them as JSON or CSV.
+"""
+import sys
+import csv
+import json
+import math
+import time
+
+# Latency histogram buckets per power of 2, bucket bounds are 19% apart
+BUCKETS_PER_OCTAVE = 4
+ENABLED = False
+# (family, key, exceptions) of the parse calls in progress, innermost last
+_frames = []
+# (container, name, original) of the wrapped functions
+_originals = []
+
+
+def input_size(value):
+    """Characters of the strings of a raw value (dict keys included), other scalars count for 1."""
+    if isinstance(value, str):
+        return len(value)
+    elif isinstance(value, (list, tuple)):
+        return sum(input_size(item) for item in value)
+    elif isinstance(value, dict):
+        return sum(len(str(k)) + input_size(v) for k, v in value.items())
+    return 0 if value is None else 1
+
+def latency_bucket(ns):
+    return int(math.log2(ns) * BUCKETS_PER_OCTAVE) if ns > 0 else 0
+
+def new_record():
+    return {"calls": 0, "ns": 0, "size": 0, "empty": 0, "exceptions": {}, "histogram": {}}
+
+def count_exception(exceptions, exception):
+    name = type(exception).__name__
+    exceptions[name] = exceptions.get(name, 0) + 1
+
+
+class ParseStats:
+    """
+    Parse statistics per (family, key, branch). The "parse" branch is the whole parse call of an attribute,
+    the other branches are the parts of it that were timed separately.
+    """
+    def __init__(self):
+        self.records = {}
+
+    def record(self, family, key, branch, ns, size, empty, exceptions):
+        record = self.records.get((family, key, branch))
+        if record is None:
+            record = self.records[(family, key, branch)] = new_record()
+        record["calls"] += 1
+        record["ns"] += ns
+        record["size"] += size
+        record["empty"] += empty
+        bucket = latency_bucket(ns)
+        record["histogram"][bucket] = record["histogram"].get(bucket, 0) + 1
+        for name, count in exceptions.items():
+            record["exceptions"][name] = record["exceptions"].get(name, 0) + count
+
+    def to_list(self):
+        """Picklable and JSON serializable records, see merge."""
+        return [
+            {"family": family, "key": key, "branch": branch, **record, "histogram": sorted(record["histogram"].items())}
+            for (family, key, branch), record in self.records.items()
+        ]
+
+    def merge(self, records):
+        """Add the records of another ParseStats (to_list)."""
+        for other in records:
+            record = self.records.get((other["family"], other["key"], other["branch"]))
+            if record is None:
+                record = self.records[(other["family"], other["key"], other["branch"])] = new_record()
+            for field in ("calls", "ns", "size", "empty"):
+                record[field] += other[field]
+            for bucket, count in other["histogram"]:
+                record["histogram"][bucket] = record["histogram"].get(bucket, 0) + count
+            for name, count in other["exceptions"].items():
+                record["exceptions"][name] = record["exceptions"].get(name, 0) + count
+        return self
+
+    @staticmethod
+    def quantile(record, q=0.99):
+        """Upper bound of the q quantile of the latency (seconds), from the histogram."""
+        threshold = q * record["calls"]
+        seen = 0
+        for bucket in sorted(record["histogram"]):
+            seen += record["histogram"][bucket]
+            if seen >= threshold:
+                return 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE) / 1e9
+        return 0.0
+
+    def summary(self):
+        """One row per record, slowest first."""
+        rows = []
+        for (family, key, branch), record in self.records.items():
+            rows.append({
+                "family": family,
+                "key": key,
+                "branch": branch,
+                "calls": record["calls"],
+                "total_seconds": record["ns"] / 1e9,
+                "mean_seconds": record["ns"] / 1e9 / record["calls"],
+                "p99_seconds": self.quantile(record),
+                "input_size": record["size"],
+                "empty_results": record["empty"],
+                "exceptions": sum(record["exceptions"].values()),
+                "exception_types": ";".join(f"{name}:{count}" for name, count in sorted(record["exceptions"].items())),
+            })
+        return sorted(rows, key=lambda row: row["total_seconds"], reverse=True)
+
+    def write(self, path):
+        """Write the summary as CSV if path ends with .csv, else the summary and the records as JSON."""
+        if path.endswith(".csv"):
+            rows = self.summary()
+            with open(path, mode='w', newline='') as csv_file:
+                writer = csv.DictWriter(csv_file, fieldnames=list(rows[0]) if rows else ["family", "key", "branch"])
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(path, 'w') as json_file:
+                json.dump({"summary": self.summary(), "records": self.to_list()}, json_file, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        """ParseStats of a JSON file written by write, to merge runs."""
+        with open(path, 'r') as json_file:
+            return cls().merge(json.load(json_file)["records"])
+
+
+STATS = ParseStats()
+
+
+def parse_failed():
+    """Called by the parsers in their except clauses: counts the exception for the attribute being parsed."""
+    if _frames:
+        count_exception(_frames[-1][2], sys.exc_info()[1])
+
+def instrument_parse(parser, family):
+    function = parser.__dict__["parse"].__func__
+
+    def parse(cls, key, value, *args, **kwargs):
+        exceptions = {}
+        _frames.append((family, key, exceptions))
+        start = time.perf_counter_ns()
+        try:
+            result = function(cls, key, value, *args, **kwargs)
+        finally:
+            ns = time.perf_counter_ns() - start
+            _frames.pop()
+        STATS.record(family, key, "parse", ns, input_size(value), result is None, exceptions)
+        return result
+    return classmethod(parse)
+
+def instrument_branch(function, branch):
+    """Time function as a branch of the attribute being parsed (its last argument is the input)."""
+    def instrumented(*args, **kwargs):
+        if not _frames:
+            return function(*args, **kwargs)
+        family, key, _ = _frames[-1]
+        exceptions = {}
+        _frames.append((family, key, exceptions))
+        result = None
+        start = time.perf_counter_ns()
+        try:
+            result = function(*args, **kwargs)
+            return result
+        except Exception as e:
+            count_exception(exceptions, e)
+            raise
+        finally:
+            ns = time.perf_counter_ns() - start
+            _frames.pop()
+            STATS.record(family, key, branch, ns, input_size(args[-1]) if args else 0, result is None, exceptions)
+    return instrumented
+
+def iter_log_info_list(iter_log_info):
+    """The log scanner is a generator, it is run to completion to be timed."""
+    return lambda log_lines: iter(list(iter_log_info(log_lines)))
+
+def patch(container, name, replacement):
+    if isinstance(container, dict):
+        _originals.append((container, name, container[name]))
+        container[name] = replacement
+    else:
+        _originals.append((container, name, container.__dict__[name] if isinstance(container, type) else getattr(container, name)))
+        setattr(container, name, replacement)
+
+def enable():
+    """Instrument the parsers of this process (no effect if they already are)."""
+    global ENABLED
+    if ENABLED:
+        return
+    from fingerprint_parser import shell_attributes_parser, shell_fast_paths
+    from fingerprint_parser.shell_attributes_parser import ShellAttributeParser
+    from fingerprint_parser.sdk_attributes_parser import SdkAttributeParser
+    from fingerprint_parser.cp_attributes_parser import CpAttributeParser
+
+    patch(ShellAttributeParser, "parse", instrument_parse(ShellAttributeParser, "shell"))
+    patch(SdkAttributeParser, "parse", instrument_parse(SdkAttributeParser, "sdk"))
+    patch(CpAttributeParser, "parse", instrument_parse(CpAttributeParser, "cp"))
+    # Shell outputs: built-in fast paths (their exceptions are fallbacks to jc), jc and the log scanner
+    for name, fast_path in list(shell_fast_paths.FAST_PATHS.items()):
+        patch(shell_fast_paths.FAST_PATHS, name, instrument_branch(fast_path, "fast_path"))
+    patch(shell_fast_paths, "parse_with_jc", instrument_branch(shell_fast_paths.parse_with_jc, "jc"))
+    patch(shell_attributes_parser, "iter_log_info", instrument_branch(iter_log_info_list(shell_attributes_parser.iter_log_info), "log_scanner"))
+    # SDK values by type
+    for value_type, parser in list(SdkAttributeParser._VALUE_PARSERS.items()):
+        patch(SdkAttributeParser._VALUE_PARSERS, value_type, instrument_branch(parser, value_type.__name__))
+    ENABLED = True
+
+def disable():
+    """Restore the parsers, the statistics are kept."""
+    global ENABLED
+    while _originals:
+        container, name, original = _originals.pop()
+        if isinstance(container, dict):
+            container[name] = original
+        else:
+            setattr(container, name, original)
+    ENABLED = False
+
+def reset():
+    global STATS
+    STATS = ParseStats()
+
+def collect():
+    """Records of this process (ParseStats.to_list) since the last collect or reset, then reset."""
+    records = STATS.to_list()
+    reset()
+    return records
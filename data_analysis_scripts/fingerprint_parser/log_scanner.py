@@ -0,0 +1,68 @@
+import re
+
+# Regex patterns for various info, applied in this order on every log line
+LOG_PATTERNS = {
+    "kernel_version": re.compile(r"Linux version ([\d+.]+)", re.IGNORECASE),
+    "compiled_by": re.compile(r"\(([^@)]+@[^)]+)\)", re.IGNORECASE),
+    "compiler": re.compile(r"gcc version ([\d+.x]+)", re.IGNORECASE),
+    "build_date": re.compile(r"#\d+ SMP PREEMPT (.+)", re.IGNORECASE),
+    "command_line": re.compile(r"Command line: (.+)", re.IGNORECASE),
+    "hypervisor": re.compile(r"Hypervisor detected: (\w+)", re.IGNORECASE),
+    "product": re.compile(r"Product: ([\w\s]+)", re.IGNORECASE),
+    "manufacturer": re.compile(r"Manufacturer: ([\w\s]+)", re.IGNORECASE),
+}
+
+# Lowercase literal that every match of the pattern with the same name contains.
+# Patterns are only run on the (few) lines where their anchor shows up: a substring test
+# is an order of magnitude cheaper than a case insensitive regex scan, combined or not.
+LOG_ANCHORS = {
+    "kernel_version": "linux version ",
+    "compiled_by": "@",
+    "compiler": "gcc version ",
+    "build_date": "smp preempt ",
+    "command_line": "command line: ",
+    "hypervisor": "hypervisor detected: ",
+    "product": "product: ",
+    "manufacturer": "manufacturer: ",
+}
+# (name, pattern, anchor) in the order the patterns are applied
+LOG_RULES = [(key, pattern, LOG_ANCHORS[key]) for key, pattern in LOG_PATTERNS.items()]
+
+CPUS_HEADER = "KERNEL supported cpus"
+# Stop capturing cpus if special character or number found
+CPUS_END = re.compile(r'[:\d\-_+]')
+
+
+def iter_log_info(log_lines):
+    """
+    Extracts relevant system and personal information from dmesg like output.
+    Consumes any iterable of lines and yields every detected item once, in order of appearance.
+    """
+    seen = set()
+    capturing_cpus = False
+    for log_line in log_lines:
+        parts = log_line.split("] ",2)
+        if len(parts) != 2:
+            continue
+        line = parts[1].strip()
+        if CPUS_HEADER in line:
+            capturing_cpus = True
+            continue
+        if capturing_cpus:
+            if CPUS_END.search(line):
+                capturing_cpus = False
+            elif line not in seen:
+                seen.add(line)
+                yield line
+            continue
+        lowered = line.lower()
+        # Case insensitive regex matching of non ascii text does not always agree with str.lower()
+        check_anchors = line.isascii()
+        for key, pattern, anchor in LOG_RULES:
+            if check_anchors and anchor not in lowered:
+                continue
+            for match in pattern.findall(line):
+                item = match.strip()
+                if item not in seen:
+                    seen.add(item)
+                    yield item
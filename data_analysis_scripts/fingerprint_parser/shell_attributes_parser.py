@@ -1,9 +1,26 @@
 
 import re
 from datetime import datetime, timedelta
-import jc
+from fingerprint_parser.log_scanner import iter_log_info
+from fingerprint_parser import shell_fast_paths
+from fingerprint_parser.shell_fast_paths import parse_lines
+from fingerprint_parser.instrumentation import parse_failed
+
+# "ls -l" line: permissions, links, owner, group, size, date and name
+LISTING_PATTERN = re.compile(r'(.*)\s+(\d+)\s+(\w+)\s+(\w+)\s+(\d+)\s+(\d{4}-\d{2}-\d{2} \d{2}:\d{2})\s+(.+)')
+
+
+def sorted_values(values):
+    """Items of a set as a sorted list, so that equal sets give equal lists whatever their iteration order."""
+    try:
+        return sorted(values)
+    except TypeError:
+        # Values of different types
+        return sorted(values, key=lambda value: (type(value).__name__, repr(value)))
 
 class ShellAttributeParser:
+    # Increment when the parsed values change, cached shell attributes are parsed again
+    VERSION = 2
     SHELL_ATTRIBUTES = [
         "cpu_information", "memory_information", "device_tree", "storage_information",
         "acpi_battery", "nproc", "lsmod", "lspci", "lsusb", "system_root_structure",
@@ -23,13 +40,17 @@ class ShellAttributeParser:
     "running_processes","hwclock", "tty", "ssty_active", "authentication_logs", "routing_table", "routing_table_n"]
 
     LISTING_SHELL_ATTRIBUTES = ["system_root_structure", "system_typefaces", "ringtones_list", "ringtones_list_ext"]
-    
+    # Parsed values depending on the fingerprint timestamp
+    TIMESTAMP_SHELL_ATTRIBUTES = ["system_uptime"]
+
+    _SHELL_ATTRIBUTES = frozenset(SHELL_ATTRIBUTES)
+
     @classmethod
     def isShellAttribute(cls,key): 
         """
         Check if attribute is shell attribute
         """
-        return key in cls.SHELL_ATTRIBUTES
+        return key in cls._SHELL_ATTRIBUTES
     
     @classmethod
     def parse(cls,key,value,timestamp=None): 
@@ -71,7 +92,25 @@ class ShellAttributeParser:
             else: 
                 return value
         except:
+            parse_failed()
             return None
+
+    @classmethod
+    def check_fast_path(cls,key,value,timestamp=None):
+        """
+        Differential check of the built-in fast paths against jc.
+        Returns the parsed value with and without the fast paths, both must be equal.
+        """
+        enabled = shell_fast_paths.ENABLED
+        try:
+            shell_fast_paths.ENABLED = True
+            fast = cls.parse(key, value, timestamp)
+            shell_fast_paths.ENABLED = False
+            reference = cls.parse(key, value, timestamp)
+        finally:
+            shell_fast_paths.ENABLED = enabled
+        return fast, reference
+
     @staticmethod
     def __is_skipped(value):
         SKIPPED = ["MNC", "FNC", "NULL","UNDEFINED"]
@@ -85,7 +124,7 @@ class ShellAttributeParser:
     # Keep only totals 
     @staticmethod
     def __parse_free(list):
-        list_parsed = jc.parse("free", '\n'.join(list))
+        list_parsed = parse_lines("free", list)
         result = {}
         for item in list_parsed:
             if "type" in item and item["type"] in ["Mem", "Swap"]:
@@ -95,7 +134,7 @@ class ShellAttributeParser:
     
     @staticmethod
     def __parse_meminfo(list):
-        list_parsed = jc.parse("proc-meminfo", '\n'.join(list))
+        list_parsed = parse_lines("proc-meminfo", list)
         result = {}
    
         if "MemTotal" in list_parsed:
@@ -106,7 +145,7 @@ class ShellAttributeParser:
 
     @staticmethod
     def __parse_cpuinfo(_list):
-        list_parsed = jc.parse("proc-cpuinfo", '\n'.join(_list))
+        list_parsed = parse_lines("proc-cpuinfo", _list)
         result = {
             "nproc": len(list_parsed)
         }
@@ -123,7 +162,7 @@ class ShellAttributeParser:
             if len(value) == 1:
                 result[key] = list(value)[0]
             else : 
-                result[key] = str(list(value))
+                result[key] = str(sorted_values(value))
         return result
     @staticmethod
     def __parse_dumpsys(dumpsys_list):
@@ -150,17 +189,17 @@ class ShellAttributeParser:
             if line == "Active UNIX domain sockets (w/o servers)":
                 break 
             active_networks_list.append(line)
-        netstat_parsed = jc.parse("netstat", '\n'.join(active_networks_list))
+        netstat_parsed = parse_lines("netstat", active_networks_list)
         active_netwrok_parsed = set()
         for item in netstat_parsed: 
             if "local_address" in item: 
-                active_netwrok_parsed.add(netstat_parsed["local_address"])
-        return list(active_netwrok_parsed)
+                active_netwrok_parsed.add(item["local_address"])
+        return sorted_values(active_netwrok_parsed)
     
     # Keep only ip @ 
     @staticmethod
     def __parse_network_interfaces(network_list):
-        network_list_parsed = jc.parse("ifconfig", '\n'.join(network_list))
+        network_list_parsed = parse_lines("ifconfig", network_list)
         network_object = set()
         for item in network_list_parsed:
             if isinstance(item, dict): 
@@ -168,68 +207,25 @@ class ShellAttributeParser:
                 ip = item.get("ipv4_addr", "")
                 if name and name.lower() != "lo" and ip:
                     network_object.add(ip)
-        return list(network_object)
+        return sorted_values(network_object)
     
     @staticmethod
     def __parse_dmesg(dmesg_list):
         """
         Extracts relevant system and personal information from dmesg output.
-        Returns a dictionary of detected information.
+        Returns the list of detected information.
         """
-        extracted_info = []
-        
-        # Regex patterns for various info
-        patterns = {
-            "kernel_version": re.compile(r"Linux version ([\d+.]+)", re.IGNORECASE),
-            "compiled_by": re.compile(r"\(([^@)]+@[^)]+)\)", re.IGNORECASE),
-            "compiler": re.compile(r"gcc version ([\d+.x]+)", re.IGNORECASE),
-            "build_date": re.compile(r"#\d+ SMP PREEMPT (.+)", re.IGNORECASE),
-            "command_line": re.compile(r"Command line: (.+)", re.IGNORECASE),
-            "hypervisor": re.compile(r"Hypervisor detected: (\w+)", re.IGNORECASE),
-            "product": re.compile(r"Product: ([\w\s]+)", re.IGNORECASE),
-            "manufacturer": re.compile(r"Manufacturer: ([\w\s]+)", re.IGNORECASE),
-        }
-        
-        capturing_cpus = False
-        
-        i = 0
-        while i < len(dmesg_list):
-            parts = dmesg_list[i].split("] ",2)
-            if len(parts) == 2: 
-                line = parts[1].strip()
-                if "KERNEL supported cpus" in line:
-                    capturing_cpus = True
-                    i += 1 
-                    continue
-                if capturing_cpus:
-                    if re.search(r'[:\d\-_+]', line):  # Stop capturing cpus if special character or number found
-                        capturing_cpus = False
-                    else: 
-                        if line not in extracted_info:
-                            extracted_info.append(line)
-                    i += 1 
-                    continue
-                else: 
-                    for key, pattern in patterns.items():
-                        matches = pattern.findall(line)
-                        for match in matches:
-                            item = match.strip()
-                            if item not in extracted_info:
-                                extracted_info.append(item)
-            i += 1
-        return extracted_info
+        return list(iter_log_info(dmesg_list))
     @staticmethod
     def __parse_df(df_list):
-        df_list_parsed = jc.parse("df", '\n'.join(df_list))
-        result = []
+        df_list_parsed = parse_lines("df", df_list)
+        result = {}
         for item in df_list_parsed:
             if isinstance(item, dict): 
                 filesystem = item.get("filesystem", "")
                 mounted_on = item.get("filesystem", "")
-                line = ' '.join([filesystem,mounted_on])
-                if line not in result: 
-                    result.append(line)
-        return result
+                result[' '.join([filesystem,mounted_on])] = None
+        return list(result)
     @staticmethod  
     def __parse_list(list):
         result = []
@@ -245,7 +241,7 @@ class ShellAttributeParser:
                 continue
             else:
                 # Parse the line using regex
-                match = re.match(r'(.*)\s+(\d+)\s+(\w+)\s+(\w+)\s+(\d+)\s+(\d{4}-\d{2}-\d{2} \d{2}:\d{2})\s+(.+)', item)
+                match = LISTING_PATTERN.match(item)
                 if match:
                     _, _, _, _, _, date, name = match.groups()
                     # Check for symbolic link
@@ -254,7 +250,8 @@ class ShellAttributeParser:
         return result
     @staticmethod
     def __parse_acpi_battery(acpi_list):
-        acpi_object = []
+        # Insertion ordered set of lines
+        acpi_object = {}
         for item in acpi_list: 
             parts = item.split(":")
             if len(parts)>1 :
@@ -262,10 +259,8 @@ class ShellAttributeParser:
                 key = next((type for type in types if type in parts[0].lower()), "")  
                 value = parts[1].strip().split(" ")[0]
                 if key:
-                    line = ' '.join([key,value])
-                    if line not in acpi_object :    
-                        acpi_object.append(line)
-        return acpi_object
+                    acpi_object[' '.join([key,value])] = None
+        return list(acpi_object)
     @staticmethod 
     def __parse_getprop(prop_list):
         parsed_data = {}
@@ -0,0 +1,296 @@
+"""
+Line oriented parsers for the shell commands that were parsed with jc.
+
+Every parser consumes the list of output lines directly and only extracts the fields kept by
+ShellAttributeParser, in the same shape as the jc output. A fast path either returns exactly
+what jc would have returned for these fields or raises FastPathUnsupported: parse_lines() then
+falls back to jc, which is only imported the first time it is needed.
+"""
+import re
+import hashlib
+
+# Set to False to always parse with jc
+ENABLED = True
+
+# Characters str.splitlines() breaks on, lines holding one of them are left to jc
+LINE_BREAKS = re.compile('[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+
+
+class FastPathUnsupported(Exception):
+    """The output is not in a shape handled by the fast path."""
+
+
+def non_empty(lines):
+    return [line for line in lines if line]
+
+# free -m: keep type and total of the Mem and Swap rows
+FREE_TYPES = frozenset(["Mem", "Swap"])
+
+def parse_free(lines):
+    if not lines or not lines[0].strip():
+        raise FastPathUnsupported("no header")
+    headers = ('type ' + lines[0].lower()).split()
+    if headers.count('total') != 1:
+        raise FastPathUnsupported("no total column")
+    total_index = headers.index('total')
+    result = []
+    for line in lines[1:]:
+        row = line.strip().split(None, len(headers) - 1)
+        if not row:
+            raise FastPathUnsupported("blank row")
+        item = {"type": row[0].rstrip(':')}
+        # Totals of the other rows (e.g. "-/+ buffers/cache:") are not kept
+        if item["type"] in FREE_TYPES and len(row) > total_index:
+            total = row[total_index]
+            if not (total.isascii() and total.isdigit()):
+                raise FastPathUnsupported(f"size {total}")
+            item["total"] = int(total)
+        result.append(item)
+    return result
+
+# cat /proc/meminfo: every line is validated like jc does, only totals are kept
+MEMINFO_KEYS = frozenset(["MemTotal", "SwapTotal"])
+
+def parse_meminfo(lines):
+    result = {}
+    if not any(line.strip() for line in lines):
+        return result
+    for line in non_empty(lines):
+        fields = line.replace(':', '').split()
+        if len(fields) < 2:
+            raise FastPathUnsupported(f"line {line!r}")
+        key, val = fields[:2]
+        try:
+            val = int(val)
+        except ValueError:
+            raise FastPathUnsupported(f"value {val}")
+        if key in MEMINFO_KEYS:
+            result[key] = val
+    return result
+
+# cat /proc/cpuinfo: every field is kept, with the same conversions as jc
+def parse_cpuinfo(lines):
+    processors = []
+    processor = {}
+    if not any(line.strip() for line in lines):
+        return processors
+    for line in non_empty(lines):
+        if line.startswith('processor'):
+            if processor:
+                processors.append(processor)
+            processor = {}
+        if ':' not in line:
+            raise FastPathUnsupported(f"line {line!r}")
+        key, val = line.split(':', maxsplit=1)
+        processor[key.strip()] = val.strip()
+    if processor:
+        processors.append(processor)
+
+    for processor in processors:
+        for key, val in processor.items():
+            if val == '':
+                processor[key] = None
+                continue
+            try:
+                processor[key] = int(val)
+                continue
+            except ValueError:
+                pass
+            if val == 'yes' or val == 'no':
+                processor[key] = val == 'yes'
+            elif '.' in val:
+                try:
+                    processor[key] = float(val)
+                except ValueError:
+                    pass
+        try:
+            if 'address sizes' in processor:
+                address_sizes = processor['address sizes'].split()
+                processor['address_size_physical'] = int(address_sizes[0])
+                processor['address_size_virtual'] = int(address_sizes[3])
+            if 'cache size' in processor:
+                cache_size_int, unit = processor['cache size'].split()
+                processor['cache_size_num'] = int(cache_size_int)
+                processor['cache_size_unit'] = unit
+            if 'flags' in processor:
+                processor['flags'] = processor['flags'].split()
+            if 'bugs' in processor:
+                processor['bugs'] = processor['bugs'].split()
+        except (AttributeError, IndexError, ValueError) as error:
+            # Values jc fails on too (e.g. empty flags)
+            raise FastPathUnsupported(str(error))
+    return processors
+
+# df -h: keep the filesystem column, cut out of the table by column positions like jc does
+DF_CONVERTED_COLUMNS = frozenset(["size", "used", "avail", "available", "use%", "capacity", "%iused"])
+DELIMITER = '\u2063'
+
+def parse_df(lines):
+    lines = non_empty(lines)
+    if not any(line.strip() for line in lines):
+        return []
+    header = lines[0].lower().replace('-', '_').replace('mounted on', 'mounted_on')
+    # Filesystem names longer than their column are swapped for a hash of the right size
+    space_count = len(header[10:]) - len(header[10:].lstrip(' '))
+    filesystem_column_length = space_count + 9
+    long_filesystems = {}
+    rows = []
+    for line in lines[1:]:
+        filesystem = line.split()[0]
+        if len(filesystem) > filesystem_column_length:
+            truncated_hash = hashlib.sha256(filesystem.encode('utf-8')).hexdigest()[:filesystem_column_length]
+            long_filesystems[truncated_hash] = filesystem
+            line = line.replace(filesystem, truncated_hash)
+        rows.append(line)
+
+    max_length = max(len(line) for line in [header] + rows)
+    header_text = header + ' ' * (max_length - len(header)) + ' '
+    header_list = header_text.split()
+    if not header_list:
+        raise FastPathUnsupported("blank header")
+    column_ends = {}
+    for i, column in enumerate(header_list[:-1]):
+        column_ends.setdefault(column, []).append(header_text.find(' ' + header_list[i + 1] + ' '))
+
+    result = []
+    for row in rows:
+        row = row + ' ' * (max_length - len(row))
+        for column in reversed(header_list):
+            for end in column_ends.get(column, ()):
+                while end > 0 and not row[end].isspace():
+                    end -= 1
+                row = row[:end] + DELIMITER + row[end + 1:]
+        cells = [cell.strip() or None for cell in row.split(DELIMITER, maxsplit=len(header_list) - 1)]
+        item = dict(zip(header_list, cells))
+        if any(item.get(column, "") is None for column in DF_CONVERTED_COLUMNS):
+            raise FastPathUnsupported("blank size cell")
+        filesystem = item.get('filesystem')
+        result.append({"filesystem": long_filesystems.get(filesystem, filesystem)} if 'filesystem' in item else {})
+    return result
+
+# ifconfig: keep the name and the (last) ipv4 address of each interface, Linux format only
+IFCONFIG_INTERFACE = re.compile(r'''
+    (?P<name>[a-zA-Z0-9:._-]+)\s+
+    Link\sencap:(?P<type>\S+\s?\S+)
+    ''', re.IGNORECASE | re.VERBOSE)
+IFCONFIG_IPV4 = re.compile(r'''
+    inet\saddr:(?P<address>(?:[0-9]{1,3}\.){3}[0-9]{1,3})(\s+
+    Bcast:(?P<broadcast>(?:[0-9]{1,3}\.){3}[0-9]{1,3}))?\s+
+    Mask:(?P<mask>(?:[0-9]{1,3}\.){3}[0-9]{1,3})
+    ''', re.IGNORECASE | re.VERBOSE)
+# Every BSD interface line holds "flags=" and every BSD ipv4 line "inet <digit>"
+IFCONFIG_BSD = re.compile(r'flags=|inet\s\d', re.IGNORECASE)
+
+def parse_ifconfig(lines):
+    result = []
+    name = None
+    ipv4_addr = None
+    for line in non_empty(lines):
+        if IFCONFIG_BSD.search(line):
+            raise FastPathUnsupported("BSD ifconfig")
+        interface_match = IFCONFIG_INTERFACE.search(line)
+        if interface_match:
+            if name is not None:
+                result.append({"name": name, "ipv4_addr": ipv4_addr})
+                ipv4_addr = None
+            name = interface_match.group("name")
+            continue
+        ipv4_match = IFCONFIG_IPV4.search(line)
+        if ipv4_match:
+            ipv4_addr = ipv4_match.group("address")
+    if name is not None:
+        result.append({"name": name, "ipv4_addr": ipv4_addr})
+    return result
+
+# netstat: keep the local address of the Linux "Active Internet connections" section
+NETSTAT_OTHER_SECTIONS = ("Active UNIX", "Active Bluetooth", "Kernel IP routing table", "Kernel Interface table", "Destination ", "Iface ")
+NETSTAT_OTHER_FORMATS = frozenset([
+    'Active Internet connections', 'Active Internet connections (including servers)',
+    'Active Multipath Internet connections', 'Active LOCAL (UNIX) domain sockets',
+    'Registered kernel control modules', 'Active kernel event sockets',
+    'Active kernel control sockets', 'Routing tables',
+])
+
+def normalize_netstat_headers(header):
+    header = header.lower()
+    header = header.replace('local address', 'local_address')
+    header = header.replace('foreign address', 'foreign_address')
+    header = header.replace('pid/program name', 'program_name')
+    header = header.replace('security context', 'security_context')
+    header = header.replace('i-node', ' inode')
+    header = header.replace('-', '_')
+    return header
+
+def netstat_address(headers, tokens, column, check_only=False):
+    """
+    Address of a column, or None if the row is too short.
+    Raises where jc fails to split the address from its port.
+    """
+    index = headers.index(column)
+    # jc splits rows at most len(headers) - 2 times (depending on the state column) and may insert
+    # a missing state at index 5: the last split slot can hold the rest of the line
+    last_slot = len(headers) - 2
+    if index > last_slot or index >= 5 or (index == last_slot and not check_only):
+        raise FastPathUnsupported(f"{column} column")
+    if len(tokens) <= index:
+        return None
+    if ':' not in tokens[index]:
+        raise FastPathUnsupported(f"{column} without port")
+    return tokens[index].rsplit(':', maxsplit=1)[0]
+
+def parse_netstat(lines):
+    lines = non_empty(lines)
+    if not lines:
+        return []
+    if lines[0] in NETSTAT_OTHER_FORMATS or lines[0].startswith('Name  ') or lines[0].startswith('Active Connections'):
+        raise FastPathUnsupported("not a Linux netstat")
+    result = []
+    network = False
+    headers = None
+    for line in lines:
+        if line.startswith('Active Internet'):
+            network = True
+            continue
+        if line.startswith(NETSTAT_OTHER_SECTIONS):
+            raise FastPathUnsupported(line)
+        if line.startswith('Proto'):
+            headers = normalize_netstat_headers(line).split()
+            if 'program_name' in headers or 'local_address' not in headers or 'foreign_address' not in headers:
+                raise FastPathUnsupported(line)
+            continue
+        if network:
+            if headers is None:
+                raise FastPathUnsupported("no header")
+            tokens = line.split()
+            item = {}
+            netstat_address(headers, tokens, 'foreign_address', check_only=True)
+            local_address = netstat_address(headers, tokens, 'local_address')
+            if local_address is not None:
+                item["local_address"] = local_address
+            result.append(item)
+    return result
+
+FAST_PATHS = {
+    "free": parse_free,
+    "proc-meminfo": parse_meminfo,
+    "proc-cpuinfo": parse_cpuinfo,
+    "df": parse_df,
+    "ifconfig": parse_ifconfig,
+    "netstat": parse_netstat,
+}
+
+def parse_with_jc(parser_name, lines):
+    import jc
+    return jc.parse(parser_name, '\n'.join(lines))
+
+def parse_lines(parser_name, lines):
+    """
+    Parse command output lines with the fast path of parser_name, falling back to jc.
+    """
+    fast_path = FAST_PATHS.get(parser_name) if ENABLED else None
+    if fast_path is not None and not any(LINE_BREAKS.search(line) for line in lines):
+        try:
+            return fast_path(lines)
+        except Exception:
+            pass
+    return parse_with_jc(parser_name, lines)
@@ -0,0 +1,4 @@
+from fingerprint_preparation.preparation import preapre_fingerprint, check_device_virtual
+from fingerprint_preparation.ingestion import process_all_fingerprint_folders, extract_and_clean_archives
+from fingerprint_preparation.streaming import iter_data_stream, iter_json_array
+from fingerprint_preparation.virtual_detection import VirtualDeviceDetector, detect_virtual_device
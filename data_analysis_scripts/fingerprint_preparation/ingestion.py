@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fingerprint_preparation.preparation import FAMILIES, preapre_fingerprint, parse_families, assemble_fingerprint, parser_versions
+from fingerprint_preparation.preparation_cache import PreparationCache, payload_hash, versions_stamp
+from fingerprint_preparation.streaming import JsonArrayReader, iter_data_items
+from fingerprint_preparation.record_store import RecordStoreWriter
+from fingerprint_parser import instrumentation
+
+DATA_FILE = "data.json"
+# Every processed archive is recorded here (in order), so that an interrupted run can be resumed
+MANIFEST_FILE = "ingested_archives.txt"
+
+
+class IngestionStats:
+    """
+    Throughput counters of an ingestion run.
+    """
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.archives = 0
+        self.skipped = 0
+        self.prepared = 0
+        self.errors = 0
+        self.archive_bytes = 0
+        self.data_bytes = 0
+        self.min_data_size = float('inf')
+        self.max_data_size = 0
+        self.min_cleaned_data_size = float('inf')
+        self.max_cleaned_data_size = 0
+        # Archives prepared from the cache without parsing, or parsing some families only
+        self.cache_hits = 0
+        self.cache_partial = 0
+
+    def update(self, result):
+        self.archives += 1
+        self.archive_bytes += result["archive_bytes"]
+        self.data_bytes += result["data_bytes"]
+        parsed_families = result.get("parsed_families")
+        if parsed_families is not None:
+            if not parsed_families:
+                self.cache_hits += 1
+            elif len(parsed_families) < len(FAMILIES):
+                self.cache_partial += 1
+        if result["status"] == "prepared":
+            self.prepared += 1
+            self.min_data_size = min(self.min_data_size, result["data_size"])
+            self.max_data_size = max(self.max_data_size, result["data_size"])
+            self.min_cleaned_data_size = min(self.min_cleaned_data_size, result["cleaned_data_size"])
+            self.max_cleaned_data_size = max(self.max_cleaned_data_size, result["cleaned_data_size"])
+        elif result["status"] == "error":
+            self.errors += 1
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    @property
+    def archives_per_second(self):
+        return self.archives / self.elapsed if self.elapsed > 0 else 0
+
+    @property
+    def mb_per_second(self):
+        """Uncompressed data.json megabytes parsed per second."""
+        return self.data_bytes / 1e6 / self.elapsed if self.elapsed > 0 else 0
+
+    def report(self):
+        return (f"{self.archives} archives ({self.prepared} prepared, {self.skipped} skipped, {self.errors} errors) "
+                f"in {self.elapsed:.1f}s -- {self.archives_per_second:.2f} archives/s, "
+                f"{self.mb_per_second:.2f} MB/s ({self.archive_bytes / 1e6:.1f} MB compressed), "
+                f"{self.cache_hits} cached, {self.cache_partial} partially parsed")
+
+
+def prepared_file_name(archive_name):
+    return f"{archive_name.split('.')[0]}.json"
+
+def prepare_cached(archive, info, cleaned_file_name, structure_dir, cache, cached_archive, result):
+    """
+    Prepare the data.json of an open archive through the preparation cache: the payload is hashed
+    (unless its name, CRC and size were seen before) and only its stale parser families are parsed.
+    """
+    if cached_archive is not None and cached_archive[:2] == [info.CRC, info.file_size]:
+        content_hash = cached_archive[2]
+    else:
+        with archive.open(info) as json_file:
+            content_hash = payload_hash(json_file)
+    result["cache"] = [info.CRC, info.file_size, content_hash]
+    families = cache.load(content_hash)
+    stale = cache.stale_families(families)
+    if stale:
+        with archive.open(info) as json_file:
+            families = cache.update(content_hash, families, parse_families(iter_data_items(JsonArrayReader(json_file)), stale))
+    result["parsed_families"] = stale
+    parts = {family: families[family]["entries"] for family in FAMILIES}
+    result["data_size"] = sum(len(entries) for entries in parts.values())
+    return assemble_fingerprint(parts, cleaned_file_name, structure_dir)
+
+def prepare_archive(archive_path, prepare_dir, structure_dir=None, record_store=False, cache_dir=None, cached_archive=None, parse_stats=False):
+    """
+    Worker: prepare a single archive and save the cleaned fingerprint into prepare_dir.
+    Only a small summary is sent back to the parent process, with the cleaned fingerprint
+    when it goes to a record store (the parent is its only writer).
+    With cache_dir, parsed attributes are reused from the preparation cache (cached_archive is
+    the [CRC, size, payload hash] recorded for this archive, if any).
+    With parse_stats, the parsers are instrumented (fingerprint_parser.instrumentation) and their
+    statistics for this archive are sent back with the summary.
+    """
+    cleaned_file_name = prepared_file_name(os.path.basename(archive_path))
+    result = {
+        "archive": archive_path,
+        "status": "missing",
+        "archive_bytes": os.path.getsize(archive_path),
+        "data_bytes": 0,
+        "data_size": 0,
+        "cleaned_data_size": 0,
+    }
+    if parse_stats:
+        instrumentation.enable()
+        instrumentation.reset()
+    try:
+        # data.json is parsed while it is read from the zip member stream, one attribute at a time,
+        # so a worker never holds the whole raw fingerprint
+        with zipfile.ZipFile(archive_path, 'r') as archive:
+            try:
+                info = archive.getinfo(DATA_FILE)
+            except KeyError:
+                return result
+            result["data_bytes"] = info.file_size
+            if cache_dir is not None:
+                cleaned_data = prepare_cached(archive, info, cleaned_file_name, structure_dir, PreparationCache(cache_dir), cached_archive, result)
+            else:
+                with archive.open(info) as json_file:
+                    reader = JsonArrayReader(json_file)
+                    cleaned_data = preapre_fingerprint(iter_data_items(reader), cleaned_file_name, structure_dir)
+                result["data_size"] = reader.count
+        if not cleaned_data:
+            result["status"] = "incomplete"
+            return result
+        if record_store:
+            result["cleaned_data"] = cleaned_data
+        else:
+            # Write to a temporary file first, a killed worker never leaves a truncated fingerprint behind
+            cleaned_file_path = os.path.join(prepare_dir, cleaned_file_name)
+            with open(cleaned_file_path + ".tmp", 'w') as cleaned_file:
+                json.dump(cleaned_data, cleaned_file, indent=4)
+            os.replace(cleaned_file_path + ".tmp", cleaned_file_path)
+        result["status"] = "prepared"
+        result["cleaned_data_size"] = len(cleaned_data)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if parse_stats:
+            result["parse_stats"] = instrumentation.collect()
+    return result
+
+def load_manifest(prepare_dir, stamp=None):
+    """Archives already processed, only those prepared with the parser versions stamp if it is given."""
+    manifest_path = os.path.join(prepare_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return set()
+    done = set()
+    with open(manifest_path, 'r') as manifest:
+        for line in manifest:
+            archive_path, status, line_stamp = (line.rstrip("\n").split("\t") + ["", ""])[:3]
+            # Failed archives are retried on the next run
+            if archive_path and status != "error" and (stamp is None or line_stamp == stamp):
+                done.add(archive_path)
+    return done
+
+def list_archives(directory):
+    """Sorted list of the zip archives of a fingerprints directory."""
+    return [os.path.join(directory, filename) for filename in sorted(os.listdir(directory)) if filename.endswith('.zip')]
+
+def iter_prepared_archives(archive_paths, prepare_dir, structure_dir=None, workers=None, max_pending=None, record_store=False, cache_dir=None, cached_archives=None, parse_stats=False):
+    """
+    Prepare archives over a process pool and yield the worker summaries in input order.
+    At most max_pending archives are in flight, so memory stays bounded whatever the input size.
+    """
+    cached_archives = cached_archives or {}
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for archive_path in archive_paths:
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+            pending.append(executor.submit(
+                prepare_archive, archive_path, prepare_dir, structure_dir, record_store,
+                cache_dir, cached_archives.get(os.path.basename(archive_path)), parse_stats
+            ))
+        while pending:
+            yield pending.popleft().result()
+
+def extract_and_clean_archives(directory, prepare_dir, structure_dir=None, workers=None, max_pending=None, report_every=1000, stats=None, record_store=False, cache_dir=None, parse_stats=None):
+    """
+    Prepare every archive of directory that has not been processed yet.
+    Archives are skipped if their cleaned file exists or if they are recorded in the manifest,
+    results are appended to the manifest in archive order so a run can be stopped and resumed.
+    With record_store, prepare_dir is a record store (fingerprint_preparation.record_store)
+    instead of a directory of JSON files.
+    With cache_dir, parsed attributes are kept in a preparation cache (fingerprint_preparation.preparation_cache)
+    and archives are prepared again when a parser version changes, parsing the changed families only.
+    With parse_stats (a fingerprint_parser.instrumentation.ParseStats), the parse statistics of the workers
+    are merged into it.
+    """
+    os.makedirs(prepare_dir, exist_ok=True)
+    if structure_dir is not None:
+        os.makedirs(structure_dir, exist_ok=True)
+    stats = stats or IngestionStats()
+    stamp = versions_stamp(parser_versions())
+    cache = PreparationCache(cache_dir) if cache_dir is not None else None
+    cached_archives = cache.load_archives() if cache is not None else {}
+    # With a cache, prepared fingerprints are up to date only if the manifest has the current versions
+    done = load_manifest(prepare_dir, stamp if cache is not None else None)
+    store = RecordStoreWriter(prepare_dir) if record_store else None
+
+    archive_paths = []
+    for archive_path in list_archives(directory):
+        cleaned_file_name = prepared_file_name(os.path.basename(archive_path))
+        if cache is not None:
+            prepared = False
+        elif store is not None:
+            prepared = cleaned_file_name in store
+        else:
+            prepared = os.path.exists(os.path.join(prepare_dir, cleaned_file_name))
+        if archive_path in done or prepared:
+            stats.skipped += 1
+            continue
+        archive_paths.append(archive_path)
+
+    archives_file = cache.open_archives() if cache is not None else None
+    try:
+        with open(os.path.join(prepare_dir, MANIFEST_FILE), 'a') as manifest:
+            for result in iter_prepared_archives(archive_paths, prepare_dir, structure_dir, workers, max_pending, record_store, cache_dir, cached_archives, parse_stats is not None):
+                cleaned_data = result.pop("cleaned_data", None)
+                if cleaned_data is not None:
+                    store.write(prepared_file_name(os.path.basename(result["archive"])), cleaned_data)
+                worker_parse_stats = result.pop("parse_stats", None)
+                if worker_parse_stats is not None:
+                    parse_stats.merge(worker_parse_stats)
+                archive_cache = result.pop("cache", None)
+                archive_name = os.path.basename(result["archive"])
+                if archive_cache is not None and cached_archives.get(archive_name) != archive_cache:
+                    cached_archives[archive_name] = archive_cache
+                    archives_file.write(json.dumps([archive_name] + archive_cache) + "\n")
+                stats.update(result)
+                manifest.write(f"{result['archive']}\t{result['status']}\t{stamp}\n")
+                if result["status"] == "error":
+                    print(f"Failed to process '{result['archive']}': {result['error']}")
+                if report_every and stats.archives % report_every == 0:
+                    manifest.flush()
+                    print(stats.report())
+    finally:
+        if store is not None:
+            store.close()
+        if archives_file is not None:
+            archives_file.close()
+    return stats
+
+def process_all_fingerprint_folders(dumps_directory, prepare_dir, structure_dir=None, workers=None, max_pending=None, report_every=1000, record_store=False, cache_dir=None, parse_stats_path=None):
+    """
+    Traverse through the DUMPS directory and process all 'fingerprints/' subdirectories.
+    With parse_stats_path, the parse statistics per attribute are written to it (CSV if it ends with .csv, else JSON).
+    """
+    stats = IngestionStats()
+    parse_stats = instrumentation.ParseStats() if parse_stats_path is not None else None
+    for root, dirs, files in os.walk(dumps_directory):
+        dirs.sort()
+        # Check if the current directory ends with 'fingerprints/'
+        if root.endswith('fingerprints'):
+            print(f"Processing directory: {root}")
+            extract_and_clean_archives(root, prepare_dir, structure_dir, workers, max_pending, report_every, stats, record_store, cache_dir, parse_stats)
+
+    print(stats.report())
+    print("max data size :", stats.max_data_size)
+    print("min data size :", stats.min_data_size)
+    print("max cleaned data size :", stats.max_cleaned_data_size)
+    print("min cleaned data size :", stats.min_cleaned_data_size)
+    if parse_stats is not None:
+        parse_stats.write(parse_stats_path)
+        print(f"Parse statistics written to {parse_stats_path}")
+    return stats
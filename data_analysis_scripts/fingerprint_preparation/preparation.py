@@ -0,0 +1,153 @@
+import os
+import json
+import pickle
+import heapq
+import hashlib
+from fingerprint_parser.shell_attributes_parser import ShellAttributeParser
+from fingerprint_parser.sdk_attributes_parser import SdkAttributeParser
+from fingerprint_parser.cp_attributes_parser import CpAttributeParser
+from fingerprint_preparation.streaming import iter_data_items
+from fingerprint_preparation.virtual_detection import detect_virtual_device
+
+
+def save_json_file(data, file_path):
+    """Helper function to save JSON data to a file."""
+    with open(file_path, 'w') as file:
+        json.dump(data, file, indent=4)
+
+# Hash the sdk structure
+def hash_sdk_structure(l):
+    return hashlib.sha256(pickle.dumps(l)).hexdigest()
+
+def check_device_virtual(data):
+    """
+    Check if the device is virtual (emulator or virtual machine) based on build properties, kernel information and system logs.
+    The indicators are those of fingerprint_preparation.virtual_detection, detect_virtual_device tells which one was found.
+    """
+    return detect_virtual_device(data) is not None
+
+def add_parsed_value(cleaned_data, key, value):
+    """
+    Add a parsed attribute to the cleaned data.
+    Dicts are flattened into "key.subkey" entries and single item lists are unwrapped.
+    """
+    if not value:
+        return
+    # Flatten if is a dict
+    if isinstance(value, dict):
+        for k,v in value.items():
+            cleaned_data[f"{key}.{k}"] = v
+    elif isinstance(value, list):
+        if len(value) == 1:
+            cleaned_data[key] = value[0]
+        else:
+            cleaned_data[key] = value
+    else:
+        cleaned_data[key] = value
+
+# Parser families of the raw attributes, "raw" attributes are kept as extracted
+FAMILIES = ("shell", "sdk", "cp", "raw")
+RAW_VERSION = 1
+
+def parser_versions():
+    """Version of every parser family, a family is parsed again when its version changes."""
+    return {
+        "shell": ShellAttributeParser.VERSION,
+        "sdk": SdkAttributeParser.VERSION,
+        "cp": CpAttributeParser.VERSION,
+        "raw": RAW_VERSION,
+    }
+
+def attribute_family(key):
+    if ShellAttributeParser.isShellAttribute(key):
+        return "shell"
+    elif SdkAttributeParser.isSdkAttribute(key):
+        return "sdk"
+    elif CpAttributeParser.isCpAttribute(key):
+        return "cp"
+    return "raw"
+
+def parse_families(data, families=FAMILIES):
+    """
+    Parse the attributes of the given families of a raw fingerprint (see preapre_fingerprint).
+    Returns family -> [index in data.json, key, parsed value] entries. The entries only depend
+    on data and the parsers, shell attributes depending on the timestamp are parsed by assemble_fingerprint.
+    """
+    parts = {family: [] for family in families}
+    for index, (key, value) in enumerate(iter_data_items(data)):
+        family = attribute_family(key)
+        entries = parts.get(family)
+        if entries is None:
+            continue
+        if family == "shell":
+            if key not in ShellAttributeParser.TIMESTAMP_SHELL_ATTRIBUTES:
+                value = ShellAttributeParser.parse(key, value)
+        elif family == "sdk":
+            value = SdkAttributeParser.parse(key, value)
+        elif family == "cp":
+            value = CpAttributeParser.parse(key, value)
+        entries.append([index, key, value])
+    return parts
+
+def assemble_fingerprint(parts, filename, structure_dir=None):
+    """
+    Build the cleaned fingerprint from the entries of every family (parse_families), in data.json order.
+    Returns an empty dict if the fingerprint is incomplete.
+    The sorted sdk structure is saved into structure_dir when it is given.
+    """
+    cleaned_data = {}
+    is_incomplete = True
+    suffix = ".ANDROID_ID"
+    uuid,timestamp = filename.split("_")
+    timestamp = int(timestamp.split(".")[0])
+    sdk_structure = set()
+    entries = heapq.merge(*[[(index, family, key, value) for index, key, value in parts[family]] for family in FAMILIES])
+    for _, family, key, value in entries:
+        # Mark as complete if a key ends with the required suffix
+        if key.endswith(suffix):
+            is_incomplete = False
+
+        if family == "shell":
+            if key in ShellAttributeParser.TIMESTAMP_SHELL_ATTRIBUTES:
+                value = ShellAttributeParser.parse(key, value, timestamp)
+            if key == "ringtones_list_ext":
+                key = "ringtones_list"
+            add_parsed_value(cleaned_data, key, value)
+        elif family == "sdk":
+            # For SDK attributes, keep the nbSdk and SDK Structure
+            sdk_structure.add(key)
+            add_parsed_value(cleaned_data, key, value)
+        elif family == "cp":
+            add_parsed_value(cleaned_data, key, value)
+        else:
+            cleaned_data[key] = value
+    # Return empty list if no complete fingerprints are found
+    if is_incomplete :
+        return {}
+
+    sdk_structure = sorted(list(sdk_structure))
+    cleaned_data["structureSdk"] = hash_sdk_structure(sdk_structure)
+    cleaned_data["nbSdk"] = len(sdk_structure)
+    cleaned_data["timestamp"] = timestamp
+    cleaned_data["uuid"] = uuid
+    cleaned_data["isDeviceVirtual"] = check_device_virtual(cleaned_data)
+    if "isDeviceRooted" not in cleaned_data:
+        cleaned_data["isDeviceRooted"] = "unknown"
+    if "isDeveloperModeEnabled" not in cleaned_data:
+        cleaned_data["isDeveloperModeEnabled"] = -1 # means unknown
+
+    # save the sdk structure
+    if structure_dir is not None:
+        structure_file_path = os.path.join(structure_dir,filename)
+        save_json_file(sdk_structure,structure_file_path)
+
+    return cleaned_data
+
+def preapre_fingerprint(data, filename, structure_dir=None):
+    """
+    Parse a raw fingerprint: the list of single key dicts stored in data.json, or any iterator
+    of its (key, value) pairs such as fingerprint_preparation.streaming.iter_data_stream.
+    Returns the cleaned fingerprint, or an empty dict if the fingerprint is incomplete.
+    The sorted sdk structure is saved into structure_dir when it is given.
+    """
+    return assemble_fingerprint(parse_families(data), filename, structure_dir)
@@ -0,0 +1,86 @@
+"""
+Content addressed cache of parsed fingerprints, shared by every preparation run.
+
+Entries are keyed by the hash of the data.json payload, so identical uploads are parsed once.
+An entry keeps the parsed attributes of every parser family (shell, sdk, cp, raw) stamped with the
+version of its parser: when a parser version changes, only the attributes of that family are parsed
+again, the other families are reused. The hash of an archive already seen is found from its name,
+CRC and size (archives.jsonl), without reading its payload.
+"""
+import os
+import json
+import hashlib
+from fingerprint_preparation.preparation import FAMILIES, parser_versions
+
+CACHE_VERSION = 1
+ARCHIVES_FILE = "archives.jsonl"
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def payload_hash(stream):
+    """Hash of a binary stream (the data.json zip member)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def versions_stamp(versions):
+    """Text form of the parser versions, recorded in the ingestion manifest."""
+    return ",".join(f"{family}={versions[family]}" for family in FAMILIES)
+
+
+class PreparationCache:
+    def __init__(self, path, versions=None):
+        self.path = path
+        self.versions = parser_versions() if versions is None else versions
+        os.makedirs(os.path.join(path, "objects"), exist_ok=True)
+
+    def entry_path(self, content_hash):
+        return os.path.join(self.path, "objects", content_hash[:2], f"{content_hash}.json")
+
+    def load(self, content_hash):
+        """Cached families of a payload, as family -> {"version", "entries"} (empty if it was never parsed)."""
+        entry_path = self.entry_path(content_hash)
+        if not os.path.exists(entry_path):
+            return {}
+        with open(entry_path, 'r') as entry_file:
+            entry = json.load(entry_file)
+        if entry.get("version") != CACHE_VERSION:
+            return {}
+        return entry["families"]
+
+    def stale_families(self, families):
+        """Families that are missing or were parsed by another version of their parser."""
+        return [
+            family for family in FAMILIES
+            if family not in families or families[family]["version"] != self.versions[family]
+        ]
+
+    def update(self, content_hash, families, parts):
+        """Store the newly parsed families (parse_families output) of a payload next to its cached ones."""
+        for family, entries in parts.items():
+            families[family] = {"version": self.versions[family], "entries": entries}
+        entry_path = self.entry_path(content_hash)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        # Workers may write the same payload at the same time, each one through its own temporary file
+        temporary_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w') as entry_file:
+            json.dump({"version": CACHE_VERSION, "families": families}, entry_file, separators=(',', ':'))
+        os.replace(temporary_path, entry_path)
+        return families
+
+    def load_archives(self):
+        """Archive name -> [CRC, size, payload hash] of the archives already hashed."""
+        archives = {}
+        archives_path = os.path.join(self.path, ARCHIVES_FILE)
+        if os.path.exists(archives_path):
+            with open(archives_path, 'r') as archives_file:
+                for line in archives_file:
+                    if line.endswith("\n"):
+                        name, crc, size, content_hash = json.loads(line)
+                        archives[name] = [crc, size, content_hash]
+        return archives
+
+    def open_archives(self):
+        """Append mode file of archives.jsonl, one [name, CRC, size, payload hash] line per archive."""
+        return open(os.path.join(self.path, ARCHIVES_FILE), 'a')
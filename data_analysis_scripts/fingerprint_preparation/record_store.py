@@ -0,0 +1,205 @@
+"""
+Compact store of prepared fingerprints, an alternative to one indented JSON file per fingerprint.
+
+A store is a directory of:
+- shard files (shard-00000.rec, ...): records appended one after the other, each one a 4 bytes length
+  followed by the zlib compressed JSON [key ids, values] of a fingerprint,
+- keys.jsonl: the attribute names, interned once for the whole store (key id = line number),
+- index.jsonl: one [name, shard, offset, size] line per record, so any fingerprint is read with one seek.
+All files are only appended to: records whose index line was not written (killed process) are ignored,
+and a writer reopening the store first cuts the line a killed writer left unterminated.
+"""
+import os
+import json
+import zlib
+import struct
+
+KEYS_FILE = "keys.jsonl"
+INDEX_FILE = "index.jsonl"
+SHARD_FORMAT = "shard-{:05d}.rec"
+# A new shard is started once the current one reaches this size
+SHARD_SIZE = 1 << 28
+COMPRESSION_LEVEL = 6
+LENGTH = struct.Struct("<I")
+# Bytes read at once when looking for the last line end of a file
+TAIL_BLOCK = 1 << 16
+
+
+def is_record_store(path):
+    return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+def encode_record(data, key_ids, compression_level=COMPRESSION_LEVEL):
+    record = json.dumps([[key_ids[key] for key in data], list(data.values())], ensure_ascii=False, separators=(',', ':'))
+    compressed = zlib.compress(record.encode('utf-8'), compression_level)
+    return LENGTH.pack(len(compressed)) + compressed
+
+def decode_record(compressed, keys):
+    ids, values = json.loads(zlib.decompress(compressed))
+    return {keys[key_id]: value for key_id, value in zip(ids, values)}
+
+def iter_complete_lines(lines_file):
+    """Lines of a JSON lines file, up to a last line cut by a killed writer."""
+    for line in lines_file:
+        if not line.endswith("\n"):
+            break
+        yield line
+
+def truncate_partial_line(file_path):
+    """Cut a JSON lines file after its last line end (nothing if the file does not exist or ends a line)."""
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, 'rb+') as lines_file:
+        end = lines_file.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(position - TAIL_BLOCK, 0)
+            lines_file.seek(start)
+            block = lines_file.read(position - start)
+            line_end = block.rfind(b"\n")
+            if line_end >= 0:
+                position = start + line_end + 1
+                break
+            position = start
+        if position < end:
+            lines_file.truncate(position)
+
+
+class RecordStore:
+    """
+    Read access to a record store: O(1) lookup of a fingerprint by name (prepared file name),
+    sequential iteration in storage order and export to the JSON files of a prepare directory.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.keys = []
+        self.index = {}
+        self._shards = {}
+        self.reload()
+
+    def reload(self):
+        """Read the keys and index lines written since the store was opened."""
+        # Lines cut by a killed writer are ignored
+        with open(os.path.join(self.path, KEYS_FILE), 'r') as keys_file:
+            self.keys = [json.loads(line) for line in iter_complete_lines(keys_file)]
+        with open(os.path.join(self.path, INDEX_FILE), 'r') as index_file:
+            for line in iter_complete_lines(index_file):
+                name, shard, offset, size = json.loads(line)
+                self.index[name] = (shard, offset, size)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def names(self):
+        """Sorted record names, like the sorted file names of a prepare directory."""
+        return sorted(self.index)
+
+    def shard_file(self, shard):
+        shard_file = self._shards.get(shard)
+        if shard_file is None:
+            shard_file = self._shards[shard] = open(os.path.join(self.path, SHARD_FORMAT.format(shard)), 'rb')
+        return shard_file
+
+    def read(self, shard, offset, size):
+        shard_file = self.shard_file(shard)
+        shard_file.seek(offset + LENGTH.size)
+        return decode_record(shard_file.read(size), self.keys)
+
+    def get(self, name):
+        """The fingerprint stored under name, KeyError if there is none."""
+        return self.read(*self.index[name])
+
+    def items(self, names=None):
+        """(name, fingerprint) pairs of names (all records by default), read in storage order."""
+        names = self.index if names is None else [name for name in names if name in self.index]
+        for name in sorted(names, key=self.index.__getitem__):
+            yield name, self.get(name)
+
+    def export_json(self, output_dir, names=None, indent=4):
+        """Write records as the JSON files of a prepare directory, returns the number of written files."""
+        os.makedirs(output_dir, exist_ok=True)
+        count = 0
+        for name, data in self.items(names):
+            with open(os.path.join(output_dir, name), 'w') as json_file:
+                json.dump(data, json_file, indent=indent)
+            count += 1
+        return count
+
+    def close(self):
+        for shard_file in self._shards.values():
+            shard_file.close()
+        self._shards = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RecordStoreWriter:
+    """
+    Appends fingerprints to a record store, resuming an existing one.
+    A record is complete once its index line is written, after its shard bytes and its new keys.
+    """
+    def __init__(self, path, shard_size=SHARD_SIZE, compression_level=COMPRESSION_LEVEL):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.shard_size = shard_size
+        self.compression_level = compression_level
+        self.key_ids = {}
+        self.names = set()
+        # New lines must not be appended to a line cut by a killed writer
+        for lines_file in (KEYS_FILE, INDEX_FILE):
+            truncate_partial_line(os.path.join(path, lines_file))
+        if is_record_store(path):
+            with RecordStore(path) as store:
+                self.key_ids = {key: key_id for key_id, key in enumerate(store.keys)}
+                self.names = set(store.index)
+        self.keys_file = open(os.path.join(path, KEYS_FILE), 'a')
+        self.index_file = open(os.path.join(path, INDEX_FILE), 'a')
+        self.shard = 0
+        while os.path.exists(os.path.join(path, SHARD_FORMAT.format(self.shard + 1))):
+            self.shard += 1
+        self.shard_file = open(os.path.join(path, SHARD_FORMAT.format(self.shard)), 'ab')
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern_keys(self, data):
+        new_keys = [key for key in data if key not in self.key_ids]
+        for key in new_keys:
+            self.key_ids[key] = len(self.key_ids)
+            self.keys_file.write(json.dumps(key, ensure_ascii=False) + "\n")
+        if new_keys:
+            self.keys_file.flush()
+
+    def write(self, name, data):
+        """Append the fingerprint data under name (a later record of the same name replaces it)."""
+        if self.shard_file.tell() >= self.shard_size:
+            self.shard_file.close()
+            self.shard += 1
+            self.shard_file = open(os.path.join(self.path, SHARD_FORMAT.format(self.shard)), 'ab')
+        self.intern_keys(data)
+        record = encode_record(data, self.key_ids, self.compression_level)
+        offset = self.shard_file.tell()
+        self.shard_file.write(record)
+        self.shard_file.flush()
+        self.index_file.write(json.dumps([name, self.shard, offset, len(record) - LENGTH.size], ensure_ascii=False) + "\n")
+        self.index_file.flush()
+        self.names.add(name)
+
+    def close(self):
+        for opened_file in (self.shard_file, self.keys_file, self.index_file):
+            opened_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
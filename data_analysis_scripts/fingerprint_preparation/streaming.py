@@ -0,0 +1,116 @@
+import json
+import codecs
+
+# Bytes read from the stream at a time, more when an element does not fit in the buffer
+CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\n\r"
+# Characters a JSON number can go on with: a number cut before them is decoded shorter ("1e" as 1)
+NUMBER_CHARACTERS = frozenset("0123456789+-.eE")
+
+
+class JsonArrayReader:
+    """
+    Incremental reader of a JSON array from a binary stream: the elements are decoded one at a time,
+    so memory is bounded by the largest element instead of the whole document.
+    """
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        # Bytes read from the stream and elements decoded
+        self.bytes_read = 0
+        self.count = 0
+
+    def fill(self, size):
+        """Read at least size more bytes (less at the end of the stream), dropping what was already decoded."""
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+        chunks = []
+        while size > 0 and not self.eof:
+            chunk = self.stream.read(max(size, self.chunk_size))
+            self.bytes_read += len(chunk)
+            if not chunk:
+                self.eof = True
+                chunks.append(self.decoder.decode(b"", final=True))
+                break
+            chunks.append(self.decoder.decode(chunk))
+            size -= len(chunk)
+        self.buffer += "".join(chunks)
+
+    def next_token(self):
+        """Skip whitespace, returns the next character or "" at the end of the stream."""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                return ""
+            self.fill(self.chunk_size)
+
+    def expect(self, characters):
+        token = self.next_token()
+        if not token or token not in characters:
+            raise ValueError(f"Expecting one of {characters!r} at byte {self.bytes_read}, got {token!r}")
+        self.position += 1
+        return token
+
+    def number_delimited(self, end):
+        """True if a number decoded up to end is complete: something else than a number character follows it in the buffer."""
+        buffer = self.buffer
+        while end < len(buffer) and buffer[end] in NUMBER_CHARACTERS:
+            end += 1
+        return end < len(buffer)
+
+    def decode_element(self):
+        if not self.next_token():
+            raise ValueError(f"Expecting value at byte {self.bytes_read}, got the end of the stream")
+        while True:
+            try:
+                element, end = self.json_decoder.raw_decode(self.buffer, self.position)
+                if self.eof or not isinstance(element, (int, float)) or self.number_delimited(end):
+                    self.position = end
+                    self.count += 1
+                    return element
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Incomplete element: read as much again as what is buffered, so retries stay linear overall
+            self.fill(len(self.buffer) - self.position)
+
+    def __iter__(self):
+        self.expect("[")
+        if self.next_token() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.decode_element()
+            if self.expect(",]") == "]":
+                return
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """Elements of the JSON array of a binary stream, decoded one at a time."""
+    return iter(JsonArrayReader(stream, chunk_size))
+
+def iter_data_items(data):
+    """
+    (key, value) pairs of a raw fingerprint: data.json is a list of single key dicts,
+    either loaded or streamed. Pairs are passed through, so any iterator of pairs is accepted.
+    """
+    for item in data:
+        if isinstance(item, dict):
+            # Contains only one key-value pair
+            for pair in item.items():
+                yield pair
+                break
+        else:
+            yield item
+
+def iter_data_stream(stream, chunk_size=CHUNK_SIZE):
+    """(key, value) pairs of a data.json binary stream (e.g. a zip member), without loading the whole file."""
+    return iter_data_items(iter_json_array(stream, chunk_size))
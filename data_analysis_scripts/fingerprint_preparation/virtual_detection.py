@@ -0,0 +1,141 @@
+"""
+Detection of virtual devices (emulators and virtual machines) from the attributes of a prepared fingerprint.
+
+An indicator is a lowercase text that a value contains, equals or starts with. The indicators of an attribute
+are compiled into a single regex whose alternatives are factored by common prefixes (a trie), so a value is
+scanned once whatever the number of indicators. List and dict values (system logs, kernel information) are not
+turned into their repr: their strings are scanned by chunks of CHUNK_STRINGS strings, and the detection stops at
+the first indicator found. Rules are checked in order: the Build properties first, the logs last.
+Values equal to or starting with an indicator are scalar values (as str), like the Build properties.
+"""
+import re
+from itertools import islice
+
+CONTAINS, EQUALS, PREFIX = "contains", "equals", "prefix"
+# Strings of a list or dict value (log lines) lowercased and searched at once
+CHUNK_STRINGS = 1024
+VIRTUAL_FLAGS = ["vbox", "virtual", "qemu", "vmware", "hypervisor", "kvm", "xen", "bochs", "nox"]
+# Every rule maps attributes to their indicators, a rule matches if every one of its attributes has one of them
+VIRTUAL_INDICATORS = [
+    {"android.os.Build.MANUFACTURER": [(CONTAINS, "genymotion")]},
+    {"android.os.Build.MODEL": [(CONTAINS, "google_sdk"), (CONTAINS, "droid4x"), (CONTAINS, "emulator"), (CONTAINS, "android sdk built for x86")]},
+    {"android.os.Build.HARDWARE": [(EQUALS, "goldfish"), (EQUALS, "vbox86"), (CONTAINS, "nox")]},
+    {"android.os.Build.FINGERPRINT": [(PREFIX, "generic")]},
+    {"android.os.Build.PRODUCT": [(EQUALS, "sdk"), (EQUALS, "google_sdk"), (EQUALS, "sdk_x86"), (EQUALS, "vbox86p"), (CONTAINS, "nox")]},
+    {"android.os.Build.BOARD": [(CONTAINS, "nox")]},
+    {"android.os.Build.BRAND": [(PREFIX, "generic")], "android.os.Build.DEVICE": [(PREFIX, "generic")]},
+    {"kernel_information": [(CONTAINS, "x86"), (CONTAINS, "amd64")]},
+    {"system_logs": [(CONTAINS, flag) for flag in VIRTUAL_FLAGS]},
+]
+
+
+def trie_pattern(texts):
+    """Regex matching any of texts, its alternatives factored by common prefixes."""
+    trie = {}
+    for text in texts:
+        node = trie
+        for char in text:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    def pattern(node):
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A text ending here: the longer ones are optional
+        if "" in node:
+            body = f"(?:{body})?" if len(branches) == 1 else body + "?"
+        return body
+    return pattern(trie)
+
+def compile_indicators(indicators):
+    """
+    Regexes of (kind, text) indicators, searched in lowercase strings: the texts to find in the strings of a value,
+    and the texts a scalar value is equal to or starts with (None if there are none).
+    """
+    patterns = []
+    for kinds, template in (((CONTAINS,), "{}"), ((EQUALS, PREFIX), None)):
+        alternatives = []
+        for kind in kinds:
+            texts = [text for indicator_kind, text in indicators if indicator_kind == kind]
+            if texts:
+                alternatives.append((template or (r"\A(?:{})\Z" if kind == EQUALS else r"\A(?:{})")).format(trie_pattern(texts)))
+        patterns.append(re.compile("|".join(alternatives)) if alternatives else None)
+    return tuple(patterns)
+
+def iter_strings(value):
+    """Strings of a value: the value itself, or the items of lists and the keys and items of dicts, other scalars as str."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            if isinstance(item, str):
+                yield item
+            else:
+                yield from iter_strings(item)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield str(key)
+            yield from iter_strings(item)
+    elif value is not None:
+        yield str(value)
+
+def iter_chunks(value, size=CHUNK_STRINGS):
+    """Lowercase text of the strings of a value, by chunks of size strings separated by newlines."""
+    if isinstance(value, (list, tuple)):
+        for start in range(0, len(value), size):
+            items = value[start:start + size]
+            try:
+                yield "\n".join(items).lower()
+            except TypeError:
+                # Not only strings
+                yield "\n".join(iter_strings(items)).lower()
+        return
+    strings = iter_strings(value)
+    while True:
+        chunk = list(islice(strings, size))
+        if not chunk:
+            return
+        yield "\n".join(chunk).lower()
+
+
+class VirtualDeviceDetector:
+    """Indicator rules (see VIRTUAL_INDICATORS) compiled once, the regexes of every attribute of every rule."""
+    def __init__(self, rules=VIRTUAL_INDICATORS):
+        self.rules = [{attribute: compile_indicators(indicators) for attribute, indicators in rule.items()} for rule in rules]
+
+    @staticmethod
+    def search(patterns, value):
+        """First indicator of an attribute (compile_indicators) found in value, None if there is none."""
+        contains, anchored = patterns
+        if anchored is not None and value is not None and not isinstance(value, (list, tuple, dict)):
+            match = anchored.match(str(value).lower())
+            if match:
+                return match.group(0)
+        if contains is not None:
+            for text in iter_chunks(value):
+                match = contains.search(text)
+                if match:
+                    return match.group(0)
+        return None
+
+    def detect(self, data):
+        """Attribute -> indicator found of the first matching rule, None if the device does not look virtual."""
+        for rule in self.rules:
+            found = {}
+            for attribute, pattern in rule.items():
+                indicator = self.search(pattern, data.get(attribute))
+                if indicator is None:
+                    break
+                found[attribute] = indicator
+            else:
+                return found
+        return None
+
+
+DETECTOR = VirtualDeviceDetector()
+
+
+def detect_virtual_device(data):
+    """Indicators of the first virtual device rule a prepared fingerprint matches (see VirtualDeviceDetector.detect)."""
+    return DETECTOR.detect(data)
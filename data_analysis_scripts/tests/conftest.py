@@ -0,0 +1,14 @@
+import pytest
+from benchmarks.synthetic import generate_corpus
+from fingerprint_preparation.preparation import preapre_fingerprint
+
+
+@pytest.fixture(scope="session")
+def prepared_fingerprints():
+    """(file name, prepared fingerprint) pairs of a small synthetic corpus, 3 fingerprints per device."""
+    fingerprints = []
+    for archive_name, data in generate_corpus(30, 3, seed=3):
+        prepared = preapre_fingerprint(data, archive_name)
+        if prepared:
+            fingerprints.append((archive_name.replace(".zip", ".json"), prepared))
+    return fingerprints
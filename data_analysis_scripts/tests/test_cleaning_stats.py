@@ -0,0 +1,40 @@
+import uuid
+import pytest
+from fingerprint_analysis.cleaning_stats import CleaningStats, ApproximateCleaningStats, remove_redudants_from_attribute_stats
+from fingerprint_analysis.sketches import SAMPLE_SIZE
+
+
+def test_first_redundant_attribute_is_kept():
+    same = {"coverage": 3, "values": {"a": 2, "b": 1}}
+    attribute_stats = {
+        "model": dict(same), "other": {"coverage": 3, "values": {"a": 3}},
+        "device": dict(same), "board": {"coverage": 3, "values": {"b": 1, "a": 2}},
+    }
+    assert list(remove_redudants_from_attribute_stats(attribute_stats)) == ["model", "other"]
+    reordered = {key: attribute_stats[key] for key in ["board", "device", "other", "model"]}
+    assert list(remove_redudants_from_attribute_stats(reordered)) == ["board", "other"]
+
+def test_attribute_changes_is_abstract():
+    with pytest.raises(TypeError):
+        CleaningStats()
+
+def approximate_stats(nb_fingerprints):
+    stats = ApproximateCleaningStats([], {})
+    for index in range(nb_fingerprints):
+        stats.add(f"{index}.json", {
+            "uuid": str(uuid.UUID(int=index * 7919 + 1)),
+            "timestamp": 1700000000000 + index,
+            # One value in ten is seen twice
+            "nearly_unique": index + 1 if index % 10 == 0 else index,
+            "model": f"model-{index % 40}",
+            "constant": "android",
+        })
+    return stats
+
+@pytest.mark.parametrize("nb_fingerprints", [300, 5000])
+def test_approximate_step2_drops_distinct_attributes(nb_fingerprints):
+    assert nb_fingerprints > SAMPLE_SIZE
+    stats = approximate_stats(nb_fingerprints)
+    assert stats.cleaned_attributes() == ["nearly_unique", "model"]
+    for info in stats.attributes_stats.values():
+        assert info["values"].cardinality()[0] <= info["coverage"]
@@ -0,0 +1,24 @@
+import os
+import json
+from fingerprint_analysis.columnar import META_FILE, load_attribute_matrix
+
+
+def write_prepared(folder, fingerprints):
+    folder.mkdir(exist_ok=True)
+    for filename, fingerprint in fingerprints:
+        with open(folder / filename, 'w') as json_file:
+            json.dump(fingerprint, json_file)
+
+def test_store_is_rebuilt_with_new_prepared_files(tmp_path, prepared_fingerprints):
+    prepared, matrix_dir = tmp_path / "prepared", str(tmp_path / "matrix")
+    write_prepared(prepared, prepared_fingerprints[:-5])
+    assert len(load_attribute_matrix(str(prepared), matrix_dir)) == len(prepared_fingerprints) - 5
+    # Unchanged prepared files: the store is reused
+    built = os.stat(os.path.join(matrix_dir, META_FILE)).st_mtime_ns
+    load_attribute_matrix(str(prepared), matrix_dir)
+    assert os.stat(os.path.join(matrix_dir, META_FILE)).st_mtime_ns == built
+
+    write_prepared(prepared, prepared_fingerprints[-5:])
+    matrix = load_attribute_matrix(str(prepared), matrix_dir)
+    assert len(matrix) == len(prepared_fingerprints)
+    assert sorted(matrix.files) == sorted(filename for filename, _ in prepared_fingerprints)
@@ -0,0 +1,22 @@
+from fingerprint_analysis.columnar import value_key
+from fingerprint_analysis.corpus import CompactCorpus
+
+
+def test_views_equal_prepared_fingerprints(prepared_fingerprints):
+    corpus = CompactCorpus()
+    for filename, data in prepared_fingerprints:
+        corpus.add(filename, data)
+    corpus.compact()
+    for row, (filename, data) in enumerate(prepared_fingerprints):
+        assert corpus[row] == data
+        assert list(corpus[row].items()) == list(data.items())
+
+def test_value_ids_ignore_dict_key_order():
+    corpus = CompactCorpus()
+    corpus.add("a.json", {"d": {"x": 1, "y": 2}, "l": ["b", "a"]})
+    corpus.add("b.json", {"d": {"y": 2, "x": 1}, "l": ["a", "b"]})
+    assert corpus[0].codes()["d"] == corpus[1].codes()["d"]
+    assert corpus[0].codes()["l"] != corpus[1].codes()["l"]
+    assert list(corpus[0]["d"]) == ["x", "y"]
+    assert corpus[1]["l"] == ["a", "b"]
+    assert value_key(corpus[1]["d"]) == value_key({"x": 1, "y": 2})
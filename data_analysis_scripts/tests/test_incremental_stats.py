@@ -0,0 +1,47 @@
+import os
+from fingerprint_analysis.cleaning_stats import compute_entropy
+from fingerprint_analysis.incremental_stats import IncrementalCleaningStats, JOURNAL_SUFFIX
+
+
+def apply_batches(checkpoint_path, fingerprints, nb_batches):
+    size = -(-len(fingerprints) // nb_batches)
+    for start in range(0, len(fingerprints), size):
+        stats = IncrementalCleaningStats.load(checkpoint_path)
+        stats.apply_delta(fingerprints[start:start + size])
+        stats.save(checkpoint_path)
+    return IncrementalCleaningStats.load(checkpoint_path)
+
+def state(stats):
+    return (stats.total_fingerprints, stats.files, stats.attributes_stats, stats.devices, stats.changes, stats.distributions)
+
+
+def test_batches_equal_single_batch(tmp_path, prepared_fingerprints):
+    single = apply_batches(str(tmp_path / "single.json"), prepared_fingerprints, 1)
+    batched = apply_batches(str(tmp_path / "batched.json"), prepared_fingerprints, 12)
+    assert state(batched) == state(single)
+    # The last batches were only appended to the journal
+    assert os.path.getsize(str(tmp_path / "batched.json") + JOURNAL_SUFFIX) > 0
+
+def test_entropy_from_counts(prepared_fingerprints):
+    stats = IncrementalCleaningStats()
+    stats.apply_delta(prepared_fingerprints)
+    for attribute, distribution in stats.distributions.items():
+        assert stats.entropy(attribute) == compute_entropy(distribution["values"], len(stats.devices))
+
+def test_cut_journal_entry_is_dropped(tmp_path, prepared_fingerprints):
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    half = len(prepared_fingerprints) // 2
+    apply_batches(checkpoint_path, prepared_fingerprints[:half], 1)
+    stats = IncrementalCleaningStats.load(checkpoint_path)
+    stats.apply_delta(prepared_fingerprints[half:half + 2])
+    stats.save(checkpoint_path)
+    with open(checkpoint_path + JOURNAL_SUFFIX, 'a') as journal_file:
+        journal_file.write('["cut.json", "device"')
+
+    stats = IncrementalCleaningStats.load(checkpoint_path)
+    assert stats.total_fingerprints == half + 2
+    stats.apply_delta(prepared_fingerprints[half + 2:])
+    stats.save(checkpoint_path)
+    expected = IncrementalCleaningStats()
+    expected.apply_delta(prepared_fingerprints)
+    assert state(IncrementalCleaningStats.load(checkpoint_path)) == state(expected)
@@ -0,0 +1,17 @@
+from fingerprint_analysis.matching import FingerprintIndex, DEVICE_ID_ATTRIBUTE
+
+
+def test_query_batch_equals_query(prepared_fingerprints):
+    fingerprints = [fingerprint for _, fingerprint in prepared_fingerprints]
+    attributes = sorted({attribute for fingerprint in fingerprints for attribute in fingerprint})[:20]
+    index = FingerprintIndex({attribute: 1.0 for attribute in attributes})
+    for fingerprint in fingerprints:
+        index.add(fingerprint[DEVICE_ID_ATTRIBUTE], fingerprint)
+    assert index.query_batch(fingerprints) == [index.query(fingerprint) for fingerprint in fingerprints]
+
+def test_query_batch_hashes_equal_values_of_other_types_apart():
+    index = FingerprintIndex({"flag": 1.0})
+    for device_id, value in (("bool", True), ("int", 1), ("float", 1.0)):
+        index.add(device_id, {"flag": value})
+    fingerprints = [{"flag": True}, {"flag": 1}, {"flag": 1.0}]
+    assert [result[0][0] for result in index.query_batch(fingerprints, k=1)] == ["bool", "int", "float"]
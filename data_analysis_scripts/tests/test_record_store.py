@@ -0,0 +1,54 @@
+import os
+from fingerprint_preparation.record_store import RecordStore, RecordStoreWriter, INDEX_FILE, KEYS_FILE, TAIL_BLOCK, truncate_partial_line
+
+
+def write_records(path, records):
+    with RecordStoreWriter(path) as writer:
+        for name, data in records:
+            writer.write(name, data)
+
+def append(path, file_name, text):
+    with open(os.path.join(path, file_name), 'a') as lines_file:
+        lines_file.write(text)
+
+
+def test_records_round_trip(tmp_path):
+    records = [("a.json", {"x": 1, "y": ["b", "a"]}), ("b.json", {"x": 2, "z": {"k": None}})]
+    write_records(tmp_path, records)
+    with RecordStore(tmp_path) as store:
+        assert store.names() == ["a.json", "b.json"]
+        assert list(store.items()) == records
+
+def test_writer_resumes_after_cut_index_line(tmp_path):
+    write_records(tmp_path, [("a.json", {"x": 1}), ("b.json", {"x": 2})])
+    append(tmp_path, INDEX_FILE, '["c.json", 0, 4')
+    with RecordStore(tmp_path) as store:
+        assert store.names() == ["a.json", "b.json"]
+
+    write_records(tmp_path, [("d.json", {"x": 4})])
+    with RecordStore(tmp_path) as store:
+        assert store.names() == ["a.json", "b.json", "d.json"]
+        assert store.get("d.json") == {"x": 4}
+
+def test_writer_resumes_after_cut_keys_line(tmp_path):
+    write_records(tmp_path, [("a.json", {"x": 1})])
+    append(tmp_path, KEYS_FILE, '"new_ke')
+    with RecordStore(tmp_path) as store:
+        assert store.keys == ["x"]
+
+    write_records(tmp_path, [("b.json", {"x": 2, "new_key": "v"})])
+    with RecordStore(tmp_path) as store:
+        assert store.keys == ["x", "new_key"]
+        assert dict(store.items()) == {"a.json": {"x": 1}, "b.json": {"x": 2, "new_key": "v"}}
+
+def test_truncate_partial_line(tmp_path):
+    path = tmp_path / "lines.jsonl"
+    # Cut line longer than the block read from the end
+    path.write_text('[1]\n[2]\n' + '"' + 'x' * (2 * TAIL_BLOCK + 1))
+    truncate_partial_line(path)
+    assert path.read_text() == '[1]\n[2]\n'
+    truncate_partial_line(path)
+    assert path.read_text() == '[1]\n[2]\n'
+    path.write_text('"cut')
+    truncate_partial_line(path)
+    assert path.read_text() == ''
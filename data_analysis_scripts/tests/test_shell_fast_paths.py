@@ -0,0 +1,155 @@
+"""Differential tests of the shell fast paths against jc, on the fields ShellAttributeParser keeps."""
+import random
+import pytest
+from benchmarks.synthetic import device_profile, shell_values
+from fingerprint_parser.shell_attributes_parser import ShellAttributeParser
+from fingerprint_parser.shell_fast_paths import FAST_PATHS, FREE_TYPES, MEMINFO_KEYS, FastPathUnsupported, parse_with_jc
+
+pytest.importorskip("jc")
+
+# Shell attribute parsed by every fast path
+ATTRIBUTES = {
+    "free": "memory_information",
+    "proc-meminfo": "meminfo",
+    "proc-cpuinfo": "cpuinfo",
+    "df": "df",
+    "ifconfig": "network_interfaces",
+    "netstat": "netstat",
+}
+
+def kept_free(items):
+    return [
+        {"type": item["type"], **({"total": item["total"]} if item["type"] in FREE_TYPES and "total" in item else {})}
+        for item in items
+    ]
+
+# Fields of the jc output that the fast paths extract
+KEPT_FIELDS = {
+    "free": kept_free,
+    "proc-meminfo": lambda result: {key: value for key, value in result.items() if key in MEMINFO_KEYS},
+    "proc-cpuinfo": lambda result: result,
+    "df": lambda items: [{"filesystem": item["filesystem"]} if "filesystem" in item else {} for item in items],
+    "ifconfig": lambda items: [{"name": item.get("name"), "ipv4_addr": item.get("ipv4_addr")} for item in items],
+    "netstat": lambda items: [{"local_address": item["local_address"]} if "local_address" in item else {} for item in items],
+}
+
+EDGE_CASES = {
+    "free": [
+        ["              total        used        free      shared  buff/cache   available"],
+        ["             total       used       free     shared    buffers     cached",
+         "Mem:          1897       1843         54          0         19        557",
+         "-/+ buffers/cache:       1266        631",
+         "Swap:          511          0        511"],
+        ["              total        used        free", "Mem:           100", "Swap:"],
+        ["              total        used        free", "Mem:    1.5G    1G   0.5G"],
+        ["              total        used        free", "Mem:    100    50   50   12   13"],
+        ["used free", "Mem: 1 2"],
+    ],
+    "proc-meminfo": [
+        ["MemTotal:        3787120 kB"],
+        ["MemTotal:        3787120"],
+        ["MemTotal:        3787120 kB", "", "SwapTotal:       0 kB"],
+        ["MemTotal:"],
+        ["MemTotal:        abc kB"],
+        ["Hugepagesize:       2048 kB", "SwapTotal:       1048572 kB"],
+    ],
+    "proc-cpuinfo": [
+        ["processor\t: 0"],
+        ["processor\t: 0", "flags\t\t:", "bogomips\t: 38.40", "model name\t: ARMv8 Processor rev 4 (v8l)"],
+        ["processor\t: 0", "fpu\t\t: yes", "wp\t\t: no", "version\t: 1.2.3", "cpu MHz\t\t: 2400.000"],
+        ["processor\t: 0", "address sizes\t: 39 bits physical, 48 bits virtual", "cache size\t: 512 KB",
+         "flags\t\t: fpu vme de", "bugs\t\t: spectre_v1 spectre_v2"],
+        ["Hardware\t: Qualcomm", "Serial\t\t: 0000000000000000"],
+        ["processor\t: 0", "a line without a colon"],
+    ],
+    "df": [
+        ["Filesystem            1K-blocks    Used Available Use% Mounted on"],
+        ["Filesystem      Size  Used Avail Use% Mounted on", "/dev/root       2.9G  2.7G  137M  96% /",
+         "/dev/block/bootdevice/by-name/userdata_very_long_name  110G  3.5G  106G   4% /data"],
+        ["Filesystem      Size  Used Avail Use% Mounted on", "tmpfs           1.8G  1.1M  1.8G   1% /mnt/my storage"],
+        ["Filesystem      Size  Used Avail Use% Mounted on", "tmpfs           1.8G", "/dev/root       2.9G  2.7G  137M  96% /"],
+        ["Filesystem      Size  Used Avail Use% Mounted on", "tmpfs                 1.1M  1.8G   1% /dev"],
+        ["Filesystem               1K-blocks    Used Available Use% Mounted on",
+         "/dev/root                  3030800 2874356    140060  96% / extra columns here"],
+    ],
+    "ifconfig": [
+        ["wlan0     Link encap:Ethernet  HWaddr 02:00:00:00:00:00"],
+        ["wlan0     Link encap:Ethernet  HWaddr 02:00:00:00:00:00", "          UP BROADCAST RUNNING MULTICAST  MTU:1500  Metric:1"],
+        ["dummy0    Link encap:UNSPEC", "          inet addr:10.0.0.1  Mask:255.0.0.0",
+         "rmnet0    Link encap:UNSPEC", "          inet addr:10.1.1.1  Mask:255.255.255.252", "          inet addr:10.1.1.2  Mask:255.255.255.252"],
+        ["en0: flags=8863<UP,BROADCAST,SMART,RUNNING,SIMPLEX,MULTICAST> mtu 1500", "\tinet 192.168.1.2 netmask 0xffffff00 broadcast 192.168.1.255"],
+        ["          inet addr:10.0.0.1  Mask:255.0.0.0"],
+    ],
+    "netstat": [
+        ["Active Internet connections (w/o servers)"],
+        ["Active Internet connections (w/o servers)", "Proto Recv-Q Send-Q Local Address           Foreign Address         State"],
+        ["Active Internet connections (w/o servers)", "Proto Recv-Q Send-Q Local Address           Foreign Address         State",
+         "tcp        0      0 10.0.0.2:41234          142.250.1.1:443         ESTABLISHED",
+         "udp        0      0 10.0.0.2:5353           0.0.0.0:*",
+         "tcp6       0      0 ::ffff:10.0.0.2:43210   ::ffff:142.250.1.1:443  ESTABLISHED"],
+        ["Active Internet connections (w/o servers)", "Proto Recv-Q Send-Q Local Address           Foreign Address         State",
+         "tcp        0      0 10.0.0.2:41234"],
+        ["Active Internet connections (w/o servers)", "Proto Recv-Q Send-Q Local Address           Foreign Address         State",
+         "tcp        0      0 10.0.0.2          142.250.1.1:443         ESTABLISHED"],
+        ["Proto Recv-Q Send-Q Local Address           Foreign Address         State",
+         "tcp        0      0 10.0.0.2:41234          142.250.1.1:443         ESTABLISHED"],
+        ["Active Internet connections (servers and established)",
+         "Proto Recv-Q Send-Q Local Address           Foreign Address         State       PID/Program name",
+         "tcp        0      0 0.0.0.0:5555            0.0.0.0:*               LISTEN      -"],
+    ],
+}
+# Empty and blank outputs of every command
+for cases in EDGE_CASES.values():
+    cases += [[], [""], ["", ""], ["   "]]
+
+
+def representative_outputs(parser_name, nb_devices=8):
+    """Outputs of the synthetic generator, as the parser receives them."""
+    outputs = []
+    for device in range(nb_devices):
+        lines = shell_values(random.Random(device), device_profile(device), 1.0)[ATTRIBUTES[parser_name]]
+        if parser_name == "netstat":
+            lines = lines[:lines.index("Active UNIX domain sockets (w/o servers)")]
+        outputs.append(lines)
+    return outputs
+
+def jc_kept_fields(parser_name, lines):
+    try:
+        return KEPT_FIELDS[parser_name](parse_with_jc(parser_name, lines))
+    except Exception as error:
+        return f"jc failed: {type(error).__name__}"
+
+def cases():
+    params = []
+    for parser_name in FAST_PATHS:
+        for index, lines in enumerate(representative_outputs(parser_name)):
+            params.append(pytest.param(parser_name, lines, id=f"{parser_name}-synthetic-{index}"))
+        for index, lines in enumerate(EDGE_CASES[parser_name]):
+            params.append(pytest.param(parser_name, lines, id=f"{parser_name}-edge-{index}"))
+    return params
+
+
+def test_every_fast_path_is_covered():
+    assert set(EDGE_CASES) == set(FAST_PATHS) == set(ATTRIBUTES)
+
+@pytest.mark.parametrize("parser_name, lines", cases())
+def test_fast_path_equals_jc(parser_name, lines):
+    try:
+        fast = FAST_PATHS[parser_name](lines)
+    except FastPathUnsupported:
+        pytest.skip("declined: parse_lines falls back to jc")
+    assert KEPT_FIELDS[parser_name](fast) == jc_kept_fields(parser_name, lines)
+
+@pytest.mark.parametrize("parser_name, lines", cases())
+def test_parsed_attribute_equals_jc(parser_name, lines):
+    fast, reference = ShellAttributeParser.check_fast_path(ATTRIBUTES[parser_name], lines)
+    assert fast == reference
+
+@pytest.mark.parametrize("parser_name", FAST_PATHS)
+def test_representative_outputs_are_not_declined(parser_name):
+    for lines in representative_outputs(parser_name):
+        FAST_PATHS[parser_name](lines)
+
+def test_unsupported_outputs_are_declined():
+    with pytest.raises(FastPathUnsupported):
+        FAST_PATHS["ifconfig"](EDGE_CASES["ifconfig"][3])
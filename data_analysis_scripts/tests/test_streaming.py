@@ -0,0 +1,65 @@
+import io
+import json
+import random
+import pytest
+from fingerprint_preparation.streaming import iter_json_array, iter_data_stream
+
+DOCUMENTS = [
+    [],
+    [1e5],
+    [1.5, -2.25e-3, 1E+10, 0, -0.0, 123456789012345678901234567890],
+    [1, 22, 333, 4444, 55555],
+    [True, False, None, "", "é", "☃ \U0001F600", "a\"b\\c"],
+    [{"shell.cpuinfo": ["processor : 0", "processor : 1"]}, {"sdk.x": {"y": [1, 2.5, None]}}],
+    [[[]], [{}], [[1.0, [2e-7]]]],
+]
+
+
+def stream(text):
+    return io.BytesIO(text.encode("utf-8"))
+
+def random_value(rng, depth=0):
+    kind = rng.randrange(8 if depth < 3 else 5)
+    if kind == 0:
+        return rng.randint(-10**6, 10**6)
+    if kind == 1:
+        return rng.choice([rng.uniform(-1e6, 1e6), rng.uniform(-1, 1) * 10.0 ** rng.randint(-30, 30), 1e5, 0.5])
+    if kind == 2:
+        return rng.choice([True, False, None])
+    if kind in (3, 4):
+        return "".join(rng.choice("ab é\"\\\n☃") for _ in range(rng.randrange(6)))
+    if kind in (5, 6):
+        return [random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {f"k{index}": random_value(rng, depth + 1) for index in range(rng.randrange(4))}
+
+
+@pytest.mark.parametrize("chunk_size", list(range(1, 17)) + [64, 1 << 16])
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_chunk_sizes(document, chunk_size):
+    for text in (json.dumps(document), json.dumps(document, indent=1, ensure_ascii=False)):
+        assert list(iter_json_array(stream(text), chunk_size)) == document
+
+def test_numbers_cut_by_chunks():
+    for number in ["1e5", "1.5", "-12.5e-3", "12345", "1E+7"]:
+        text = f"[{number}, {number}]"
+        for chunk_size in range(1, len(text) + 1):
+            assert list(iter_json_array(stream(text), chunk_size)) == [json.loads(number)] * 2
+
+def test_random_documents():
+    rng = random.Random(0)
+    for _ in range(300):
+        document = [random_value(rng) for _ in range(rng.randrange(6))]
+        text = json.dumps(document, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 1]))
+        chunk_size = rng.randint(1, 12)
+        assert list(iter_json_array(stream(text), chunk_size)) == document
+
+@pytest.mark.parametrize("text", ["[1.]", "[1e]", "[1,", "[1 2]", '["a"', "{}", ""])
+def test_malformed_documents(text):
+    for chunk_size in (1, 2, 1 << 16):
+        with pytest.raises(ValueError):
+            list(iter_json_array(stream(text), chunk_size))
+
+def test_data_stream_pairs():
+    text = json.dumps([{"a": 1}, {"b": [1e5, "x"]}])
+    for chunk_size in range(1, 8):
+        assert list(iter_data_stream(stream(text), chunk_size)) == [("a", 1), ("b", [1e5, "x"])]